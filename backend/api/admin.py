@@ -225,8 +225,23 @@ class CategoryTeamScoreInline(admin.TabularInline):
     verbose_name = "Team Score"
     verbose_name_plural = "Team Scores"
 
+class TeamMemberFormSet(forms.BaseInlineFormSet):
+    def clean(self):
+        """
+        Reject a member set that another team already has, with one indexed lookup.
+        """
+        super().clean()
+        athlete_ids = [
+            form.cleaned_data['athlete'].pk
+            for form in self.forms
+            if form.cleaned_data.get('athlete') and not form.cleaned_data.get('DELETE')
+        ]
+        if self.instance.has_duplicate(Team.signature_for(athlete_ids)):
+            raise ValidationError("A team with the same members already exists.")
+
 class TeamMemberInline(admin.TabularInline):
     model = TeamMember
+    formset = TeamMemberFormSet
     extra = 1  # Allow adding new athletes to the team
     verbose_name = "Team Member"
     verbose_name_plural = "Team Members"
@@ -714,21 +729,21 @@ class TeamAdmin(admin.ModelAdmin):
         return ", ".join([category.name for category in categories]) if categories else "No Categories Assigned"
     assigned_categories.short_description = "Assigned Categories"
 
-    def save_model(self, request, obj, form, change):
-        """
-        Save the team instance and validate that no duplicate team exists.
-        """
-        # Save the team instance first to ensure it has a primary key
-        super().save_model(request, obj, form, change)
-
-        # Validate that no team with the same set of athletes already exists
-        team_members = set(obj.members.values_list('athlete', flat=True))
-        existing_teams = Team.objects.exclude(pk=obj.pk)
-
-        for team in existing_teams:
-            existing_team_members = set(team.members.values_list('athlete', flat=True))
-            if team_members == existing_team_members:
-                raise ValueError("A team with the same members already exists.")
+    def save_formset(self, request, form, formset, change):
+        """
+        Write all member rows first and refresh the team name and signature once,
+        so intermediate member sets are never checked against other teams.
+        """
+        if formset.model is not TeamMember:
+            return super().save_formset(request, form, formset, change)
+        members = formset.save(commit=False)
+        for member in formset.deleted_objects:
+            member._defer_team_refresh = True
+            member.delete()
+        for member in members:
+            member._defer_team_refresh = True
+            member.save()
+        form.instance.refresh_members()
 
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
@@ -0,0 +1,269 @@
+"""
+Single-elimination bracket engine for fight categories.
+
+A bracket of size N (the next power of two above the number of athletes) is
+laid out with the standard seeding order, so the top seeds get the byes and
+can only meet in the late rounds. Only the matches whose two corners are known
+are created up front: the first round, plus second-round matches between two
+athletes who both had a bye. Later matches are created by advance_winner()
+once both of their feeding matches have a winner.
+
+Generating a bracket costs a fixed number of queries whatever its size: one
+read of the enrollments (plus one of their ratings when seeding by rating),
+two writes for the slots and one bulk insert for the matches. Regenerating
+one deletes the old bracket with one statement per table (delete_bracket),
+also a fixed number.
+"""
+import math
+
+from django.db import transaction
+
+from .cache import bump_table_version
+from .live import publish_matches
+from .models import AthleteRating, Category, CategoryAthlete, ChangeLogEntry, Match, RatingChange, RefereeScore
+from .ratings import schedule_recompute
+
+
+def seeding_order(size):
+    """
+    Return the seeds (1-based) in slot order for a bracket of `size` slots, so
+    that seed 1 and seed 2 can only meet in the final.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def seed_by_grade(enrollments):
+    """
+    Highest grade first; athletes without a grade come last.
+    """
+    def key(enrollment):
+        grade = enrollment.athlete.current_grade
+        return (grade is None, -(grade.rank_order if grade else 0), enrollment.athlete_id)
+    return sorted(enrollments, key=key)
+
+
+def seed_by_rating(enrollments):
+    """
+    Highest rating first (see api.ratings); unrated athletes come last, by grade.
+    """
+    ratings = dict(
+        AthleteRating.objects.filter(athlete_id__in=[enrollment.athlete_id for enrollment in enrollments])
+        .values_list('athlete_id', 'rating')
+    )
+    rated = sorted(
+        (enrollment for enrollment in enrollments if enrollment.athlete_id in ratings),
+        key=lambda enrollment: (-ratings[enrollment.athlete_id], enrollment.athlete_id),
+    )
+    return rated + seed_by_grade([enrollment for enrollment in enrollments if enrollment.athlete_id not in ratings])
+
+
+SEEDINGS = {
+    'grade': seed_by_grade,
+    'rating': seed_by_rating,
+}
+
+
+def match_type_for(round_number, rounds):
+    if round_number == rounds:
+        return 'finals'
+    if round_number == rounds - 1:
+        return 'semi-finals'
+    return 'qualifications'
+
+
+def separate_clubs(slots, seeds):
+    """
+    Best-effort pass that keeps club mates apart in the first round: when both
+    athletes of a pair come from the same club, the lower seed is swapped with
+    the lower seed of the nearest pair where the swap leaves both pairs mixed.
+    Byes are never moved, so the top seeds keep them.
+    """
+    pairs = len(slots) // 2
+
+    def lower(pair):
+        first, second = 2 * pair, 2 * pair + 1
+        return first if seeds[first] > seeds[second] else second
+
+    def clash(pair):
+        red, blue = slots[2 * pair], slots[2 * pair + 1]
+        return red is not None and blue is not None and red.athlete.club_id is not None \
+            and red.athlete.club_id == blue.athlete.club_id
+
+    for pair in range(pairs):
+        if not clash(pair):
+            continue
+        for other in sorted(range(pairs), key=lambda candidate: abs(candidate - pair)):
+            if other == pair or slots[2 * other] is None or slots[2 * other + 1] is None:
+                continue
+            a, b = lower(pair), lower(other)
+            slots[a], slots[b] = slots[b], slots[a]
+            if not clash(pair) and not clash(other):
+                break
+            slots[a], slots[b] = slots[b], slots[a]  # Undo and try the next pair
+
+
+def delete_bracket(matches):
+    """
+    Delete the `matches` queryset with their referee links, referee scores
+    and rating changes, one statement per table, instead of the per-row
+    signals of QuerySet.delete(), and log the deleted rows in one insert.
+    """
+    referee_links = Match.referees.through.objects.filter(match__in=matches)
+    scores = RefereeScore.objects.filter(match__in=matches)
+    rows = list(matches.values_list('pk', 'winner_id'))
+    deleted = {
+        Match: [pk for pk, _ in rows],
+        Match.referees.through: list(referee_links.values_list('pk', flat=True)),
+        RefereeScore: list(scores.values_list('pk', flat=True)),
+    }
+    # Dependent rows first, so no foreign key is left dangling
+    for table_rows in (referee_links, scores, RatingChange.objects.filter(match__in=matches), matches):
+        table_rows._raw_delete(table_rows.db)
+    ChangeLogEntry.record_deletes(deleted)
+    if any(winner_id is not None for _, winner_id in rows):
+        schedule_recompute()  # The rated matches left the history
+    tables = (*deleted, RatingChange)
+    transaction.on_commit(lambda: [bump_table_version(model) for model in tables])
+
+
+def generate_bracket(category, seeding='grade', reset=False):
+    """
+    Seed the enrolled athletes of a fight category into a single-elimination
+    bracket and create the matches that can already be played.
+
+    Raises ValueError if the category is not a fight category, has fewer than
+    two athletes, or already has a bracket (unless `reset` is set, in which
+    case the existing bracket matches are deleted first).
+    """
+    if category.type != 'fight':
+        raise ValueError("Brackets can only be generated for fight categories.")
+    if seeding not in SEEDINGS:
+        raise ValueError(f"Unknown seeding '{seeding}', expected one of: {', '.join(SEEDINGS)}.")
+
+    with transaction.atomic():
+        existing = Match.objects.filter(category=category, round__isnull=False)
+        if existing.exists():
+            if not reset:
+                raise ValueError("The category already has a bracket.")
+            delete_bracket(existing)
+
+        enrollments = list(
+            CategoryAthlete.objects.filter(category=category).select_related('athlete__current_grade')
+        )
+        if len(enrollments) < 2:
+            raise ValueError("At least two athletes are needed for a bracket.")
+
+        ranked = SEEDINGS[seeding](enrollments)
+        size = 2 ** math.ceil(math.log2(len(ranked)))
+        rounds = int(math.log2(size))
+        seeds = seeding_order(size)
+        slots = [ranked[seed - 1] if seed <= len(ranked) else None for seed in seeds]
+        separate_clubs(slots, seeds)
+
+        for index, enrollment in enumerate(slots):
+            if enrollment is not None:
+                enrollment.bracket_slot = index
+        # Clear first so reseeding never collides with the unique slot constraint
+        CategoryAthlete.objects.filter(category=category).update(bracket_slot=None)
+        CategoryAthlete.objects.bulk_update(enrollments, ['bracket_slot'], batch_size=500)
+
+        def new_match(round_number, position, red, blue):
+            match_type = match_type_for(round_number, rounds)
+            return Match(
+                category=category, match_type=match_type, round=round_number, bracket_position=position,
+                red_corner=red.athlete, blue_corner=blue.athlete,
+                name=Match.compose_name(red.athlete, blue.athlete, match_type, category),
+            )
+
+        matches = []
+        byes = {}  # First-round position -> athlete going straight to round two
+        for position in range(size // 2):
+            red, blue = slots[2 * position], slots[2 * position + 1]
+            if red is not None and blue is not None:
+                matches.append(new_match(1, position, red, blue))
+            else:
+                byes[position] = red or blue
+        for position in range(size // 4):
+            if 2 * position in byes and 2 * position + 1 in byes:
+                matches.append(new_match(2, position, byes[2 * position], byes[2 * position + 1]))
+
+        Match.objects.bulk_create(matches, batch_size=500)
+        # Bulk writes send no signals, so bump the table versions, log and publish here
+        transaction.on_commit(lambda: [bump_table_version(model) for model in (Match, CategoryAthlete)])
+        ChangeLogEntry.record(Match, [match.pk for match in matches])
+        ChangeLogEntry.record(CategoryAthlete, [enrollment.pk for enrollment in enrollments])
+        publish_matches(match.pk for match in matches)
+    return matches
+
+
+def advance_winner(match):
+    """
+    Move the winner of a bracket match forward: create the next match once
+    both of its participants are known, or record the podium after the final.
+    """
+    slots = dict(
+        CategoryAthlete.objects.filter(category_id=match.category_id, bracket_slot__isnull=False)
+        .values_list('bracket_slot', 'athlete_id')
+    )
+    if not slots:
+        return
+    # More than half the slots are filled, so the last used slot is in the second half
+    rounds = math.ceil(math.log2(max(slots) + 1))
+    category = Category.objects.get(pk=match.category_id)
+
+    if match.round >= rounds:
+        record_podium(category, match, rounds)
+        return
+
+    next_position = match.bracket_position // 2
+    feeders = (2 * next_position, 2 * next_position + 1)
+    played = {
+        feeder.bracket_position: feeder
+        for feeder in Match.objects.filter(category=category, round=match.round, bracket_position__in=feeders)
+    }
+    participants = []
+    for position in feeders:
+        if position in played:
+            participants.append(played[position].winner_id)
+        elif match.round == 1:  # A bye: the only athlete of the pair goes through
+            participants.append(slots.get(2 * position) or slots.get(2 * position + 1))
+        else:
+            participants.append(None)
+    if None in participants:
+        return
+
+    red_id, blue_id = participants
+    following = Match.objects.filter(
+        category=category, round=match.round + 1, bracket_position=next_position,
+    ).first()
+    if following is None:
+        following = Match(
+            category=category, round=match.round + 1, bracket_position=next_position,
+            match_type=match_type_for(match.round + 1, rounds),
+        )
+    elif following.winner_id is not None or (following.red_corner_id, following.blue_corner_id) == (red_id, blue_id):
+        return  # Already played, or nothing changed
+    following.red_corner_id, following.blue_corner_id = red_id, blue_id
+    following.save()
+
+
+def record_podium(category, final, rounds):
+    """
+    Set the category places from the final: the loser of the final is second
+    and the semi-final loser beaten by the champion is third.
+    """
+    champion = final.winner_id
+    runner_up = final.blue_corner_id if champion == final.red_corner_id else final.red_corner_id
+    third = None
+    if rounds > 1:
+        semi_final = Match.objects.filter(
+            category=category, round=rounds - 1, winner_id=champion,
+        ).only('red_corner_id', 'blue_corner_id').first()
+        if semi_final is not None:
+            third = semi_final.blue_corner_id if champion == semi_final.red_corner_id else semi_final.red_corner_id
+    category.first_place_id, category.second_place_id, category.third_place_id = champion, runner_up, third
+    category.save(update_fields=['first_place', 'second_place', 'third_place', 'modified'])
@@ -0,0 +1,113 @@
+"""
+Table version counters used to key cached API payloads.
+
+Every committed write to a model bumps the version of its table (see
+api.signals). Cached payloads are keyed by the versions of the tables they
+were built from, so they never have to be deleted: a write makes the old
+key unreachable and the next read rebuilds the payload.
+
+The same counters serve as HTTP validators: a response built from a set of
+tables gets an ETag derived from their versions and a Last-Modified from the
+time they were last written, so conditional GETs are answered without a query.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+PAYLOAD_TIMEOUT = 60 * 60 * 24  # Unreachable payloads simply age out
+
+# Apps whose models get a version counter (bumped in api.signals)
+VERSIONED_APPS = {'api', 'landing'}
+
+
+def _version_key(model):
+    return f'table-version:{model._meta.label_lower}'
+
+
+def _modified_key(model):
+    return f'table-modified:{model._meta.label_lower}'
+
+
+def _seed_version(key):
+    """
+    Seed a missing counter from the clock, so a flushed or restarted cache
+    never hands out a version that was already used before.
+    """
+    seed = time.time_ns()
+    cache.add(key, seed, timeout=None)
+    return cache.get(key, seed)
+
+
+def get_table_version(model):
+    """
+    Return the current version of a model's table.
+    """
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        version = _seed_version(key)
+    return version
+
+
+def get_table_versions(*models):
+    """
+    Return the versions of several tables with a single cache round trip.
+    """
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    return tuple(found[key] if key in found else _seed_version(key) for key in keys)
+
+
+def bump_table_version(model):
+    """
+    Invalidate every payload built from a model's table.
+    """
+    key = _version_key(model)
+    cache.set(_modified_key(model), time.time(), timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return _seed_version(key)
+
+
+def table_validators(models, variant=''):
+    """
+    Return `(etag, last_modified)` for a response built from `models`, with a
+    single cache round trip.
+
+    `variant` distinguishes representations that depend on more than the
+    table contents (the user, the current date); Last-Modified is omitted for
+    those because it cannot express the variant.
+
+    HTTP dates have a one-second resolution, so a second write within the
+    second of the first would keep the same date and If-Modified-Since would
+    answer a stale 304. Last-Modified is therefore omitted until the second
+    of the last write is over; until then only the ETag validates.
+    """
+    version_keys = [_version_key(model) for model in models]
+    modified_keys = [_modified_key(model) for model in models]
+    found = cache.get_many(version_keys + modified_keys)
+    versions = [found[key] if key in found else _seed_version(key) for key in version_keys]
+    tag = hashlib.md5(f"{variant}:{':'.join(map(str, versions))}".encode(), usedforsecurity=False).hexdigest()
+    last_modified = None
+    if not variant:
+        now = time.time()
+        for key in modified_keys:
+            if key not in found:
+                # Never written since the cache was flushed: counts as modified now
+                cache.add(key, now, timeout=None)
+                found[key] = cache.get(key, now)
+        modified = max(found[key] for key in modified_keys)
+        if int(modified) < int(now):
+            last_modified = int(modified)
+    return quote_etag(tag), last_modified
+
+
+def versioned_cache_key(prefix, models, *parts):
+    """
+    Build a cache key that changes whenever one of `models` is written to.
+    """
+    versions = get_table_versions(*models)
+    return ':'.join([prefix, *map(str, parts), *map(str, versions)])
@@ -0,0 +1,52 @@
+"""
+Conditional GET support for the API viewsets.
+
+Validators come from the table version counters (see api.cache), so a client
+revalidating an unchanged list or detail gets its 304 before any query runs
+or anything is serialized.
+"""
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import table_validators
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since on list() and retrieve() from the
+    versions of the tables the representation is built from.
+
+    `conditional_models` must name every table the serializer reads, not just
+    the queryset model; it defaults to the queryset model alone.
+    """
+    conditional_actions = ('list', 'retrieve')
+    conditional_models = None
+
+    def get_conditional_models(self):
+        return self.conditional_models or (self.queryset.model,)
+
+    def get_conditional_variant(self, request):
+        """
+        Return a string for representations that depend on more than the
+        table contents (the user, the current date); empty by default.
+        """
+        return ''
+
+    def dispatch(self, request, *args, **kwargs):
+        # self.action is only set once DRF has wrapped the request, so resolve it here
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method not in ('GET', 'HEAD') or action not in self.conditional_actions:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag, last_modified = table_validators(
+            self.get_conditional_models(), self.get_conditional_variant(request),
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.setdefault('Last-Modified', http_date(last_modified))
+        return response
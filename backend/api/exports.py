@@ -0,0 +1,160 @@
+"""
+Streaming CSV / NDJSON exports for staff.
+
+Rows are read with `values_list().iterator()` and written as they arrive, so
+memory use does not depend on the size of the export and the header goes out
+before the first query runs. Pick the format with `?output=csv` (default) or
+`?output=ndjson`.
+"""
+import csv
+import json
+from datetime import date, timedelta
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+
+from .models import AnnualVisa, Athlete, Category, GradeHistory, MedicalVisa
+
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """
+    File-like object that hands back what is written, for csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(request, filename, header, rows):
+    """
+    Build a streaming response from a header and an iterable of row tuples.
+    """
+    output = request.GET.get('output', 'csv')
+    if output not in CONTENT_TYPES:
+        return HttpResponseBadRequest(f"Unknown output '{output}', expected one of: {', '.join(CONTENT_TYPES)}.")
+
+    if output == 'csv':
+        writer = csv.writer(Echo())
+
+        def lines():
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow(row)
+    else:
+        encoder = DjangoJSONEncoder()
+
+        def lines():
+            for row in rows:
+                yield encoder.encode(dict(zip(header, row))) + '\n'
+
+    response = StreamingHttpResponse(lines(), content_type=CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+def latest_visa(model, field):
+    """
+    Subquery for a field of the athlete's most recently issued visa.
+    """
+    return Subquery(
+        model.objects.filter(athlete=OuterRef('pk')).order_by('-issued_date', '-id').values(field)[:1]
+    )
+
+
+@staff_member_required
+def export_athletes(request):
+    """
+    Athlete registry with club, city, grade and the status of the latest visas.
+    """
+    header = [
+        'id', 'first_name', 'last_name', 'date_of_birth', 'club', 'city', 'grade',
+        'is_coach', 'is_referee', 'annual_visa_issued', 'annual_visa_valid',
+        'medical_visa_issued', 'medical_visa_status', 'medical_visa_valid',
+    ]
+    queryset = (
+        Athlete.objects
+        .annotate(
+            annual_visa_issued=latest_visa(AnnualVisa, 'issued_date'),
+            medical_visa_issued=latest_visa(MedicalVisa, 'issued_date'),
+            medical_visa_status=latest_visa(MedicalVisa, 'health_status'),
+        )
+        .order_by('id')
+        .values_list(
+            'id', 'first_name', 'last_name', 'date_of_birth', 'club__name', 'city__name', 'current_grade__name',
+            'is_coach', 'is_referee', 'annual_visa_issued', 'medical_visa_issued', 'medical_visa_status',
+        )
+    )
+    today = date.today()
+
+    def rows():
+        # Same validity windows as AnnualVisa.is_valid and MedicalVisa.is_valid
+        for *athlete, annual_issued, medical_issued, medical_status in queryset.iterator(chunk_size=CHUNK_SIZE):
+            yield (
+                *athlete,
+                annual_issued, annual_issued is not None and today <= annual_issued + timedelta(days=365),
+                medical_issued, medical_status, medical_issued is not None and today <= medical_issued + timedelta(days=180),
+            )
+
+    return stream_rows(request, 'athletes', header, rows())
+
+
+@staff_member_required
+def export_grade_history(request):
+    """
+    Every grade obtained by every athlete.
+    """
+    header = [
+        'id', 'athlete_id', 'first_name', 'last_name', 'grade', 'obtained_date', 'level',
+        'exam_date', 'exam_place', 'technical_director', 'president',
+    ]
+    queryset = GradeHistory.objects.order_by('id').values_list(
+        'id', 'athlete_id', 'athlete__first_name', 'athlete__last_name', 'grade__name', 'obtained_date', 'level',
+        'exam_date', 'exam_place', 'technical_director', 'president',
+    )
+    return stream_rows(request, 'grade_history', header, queryset.iterator(chunk_size=CHUNK_SIZE))
+
+
+@staff_member_required
+def export_results(request):
+    """
+    Podium of every category, one row per place; `?competition=<id>` limits
+    the export to one competition.
+    """
+    header = [
+        'competition_id', 'competition', 'category_id', 'category', 'type', 'gender', 'place',
+        'athlete_id', 'athlete', 'club', 'team_id', 'team',
+    ]
+    queryset = Category.objects.order_by('competition_id', 'id')
+    if request.GET.get('competition'):
+        try:
+            queryset = queryset.filter(competition_id=int(request.GET['competition']))
+        except ValueError:
+            return HttpResponseBadRequest('competition must be an integer id.')
+    places = ('first', 'second', 'third')
+    fields = ['competition_id', 'competition__name', 'id', 'name', 'type', 'gender']
+    for place in places:
+        fields += [
+            f'{place}_place_id', f'{place}_place__first_name', f'{place}_place__last_name', f'{place}_place__club__name',
+            f'{place}_place_team_id', f'{place}_place_team__name',
+        ]
+    queryset = queryset.values_list(*fields)
+
+    def rows():
+        for row in queryset.iterator(chunk_size=CHUNK_SIZE):
+            category, podium = row[:6], row[6:]
+            for index in range(len(places)):
+                athlete_id, first_name, last_name, club, team_id, team = podium[index * 6:(index + 1) * 6]
+                if athlete_id is None and team_id is None:
+                    continue
+                athlete = f'{first_name} {last_name}' if athlete_id is not None else None
+                yield (*category, index + 1, athlete_id, athlete, club, team_id, team)
+
+    return stream_rows(request, 'results', header, rows())
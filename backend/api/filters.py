@@ -0,0 +1,82 @@
+import django_filters
+from django import forms
+from django.db.models import Q
+from .models import Athlete, Match, Team
+
+
+class AthleteFilter(django_filters.FilterSet):
+    """
+    Filter athletes by club, and by id to find the neighbours of an athlete
+    (`?id__gt=` with the default order, `?id__lt=` with `?ordering=-id`).
+    """
+    # Plain ids rather than model choices, which would fetch the club to validate it
+    club = django_filters.NumberFilter(field_name='club')
+
+    class Meta:
+        model = Athlete
+        fields = {'id': ['lt', 'gt']}
+
+
+class TeamFilter(django_filters.FilterSet):
+    """
+    Filter teams by member athlete, category or competition.
+    """
+    athlete_id = django_filters.NumberFilter(field_name='members__athlete', distinct=True)
+    category = django_filters.NumberFilter(field_name='categories', distinct=True)
+    competition = django_filters.NumberFilter(field_name='categories__competition', distinct=True)
+
+    class Meta:
+        model = Team
+        fields = ['athlete_id', 'category', 'competition']
+
+
+class MatchFilterForm(forms.Form):
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('corner') and cleaned_data.get('athlete_id') is None:
+            # On its own `corner` would filter nothing and return every match
+            self.add_error('corner', "corner needs athlete_id.")
+        return cleaned_data
+
+
+class MatchFilter(django_filters.FilterSet):
+    """
+    Filter matches by athlete, category, competition and corner.
+
+    `athlete_id` matches both corners unless `corner` narrows it down to
+    the red corner, the blue corner or the winner; `corner` without
+    `athlete_id` is rejected.
+    """
+    CORNER_CHOICES = [
+        ('red', 'Red Corner'),
+        ('blue', 'Blue Corner'),
+        ('winner', 'Winner'),
+    ]
+
+    athlete_id = django_filters.NumberFilter(method='filter_athlete')
+    corner = django_filters.ChoiceFilter(choices=CORNER_CHOICES, method='filter_corner')
+    category = django_filters.NumberFilter(field_name='category')
+    competition = django_filters.NumberFilter(field_name='category__competition')
+    # Plain ids rather than model choices, which would fetch the athlete to validate it
+    red_corner = django_filters.NumberFilter(field_name='red_corner')
+    blue_corner = django_filters.NumberFilter(field_name='blue_corner')
+    winner = django_filters.NumberFilter(field_name='winner')
+
+    class Meta:
+        model = Match
+        fields = ['athlete_id', 'corner', 'category', 'competition', 'match_type', 'red_corner', 'blue_corner', 'winner']
+        form = MatchFilterForm
+
+    def filter_athlete(self, queryset, name, value):
+        corner = self.form.cleaned_data.get('corner')
+        if corner == 'red':
+            return queryset.filter(red_corner=value)
+        if corner == 'blue':
+            return queryset.filter(blue_corner=value)
+        if corner == 'winner':
+            return queryset.filter(winner=value)
+        return queryset.filter(Q(red_corner=value) | Q(blue_corner=value))
+
+    def filter_corner(self, queryset, name, value):
+        # Applied together with `athlete_id` in filter_athlete
+        return queryset
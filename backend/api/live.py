@@ -0,0 +1,242 @@
+"""
+Live results feed (Server-Sent Events).
+
+Spectator and commentator screens subscribe to `/competition/<id>/live/` and
+get pushed three kinds of events for that competition:
+
+- `match`: a match was created or changed (corners, winner, mat, slot);
+- `scores`: the referee cards of a match changed;
+- `category`: the places of a category changed.
+
+Events are published from model signals (and from the bulk write paths, which
+send no signals) once the transaction commits, through an in-process broker.
+Each event is encoded once and shared by every subscriber, and each
+subscriber has a bounded buffer: a viewer that cannot keep up loses the oldest
+events and gets a `resync` event telling it to reload the full state.
+
+The broker lives in the server process, so all writes and viewers of an event
+day must go through the same process. Under ASGI each viewer is a coroutine
+waiting on an asyncio.Event rather than a thread, which is what lets one
+server hold thousands of open connections.
+"""
+import asyncio
+import functools
+import itertools
+import json
+import threading
+from collections import deque
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+
+from .models import Category, Competition, Match, RefereeScore
+
+BUFFER_SIZE = 256  # Events kept per subscriber before the oldest are dropped
+HEARTBEAT_SECONDS = 15  # Keeps proxies from closing idle connections
+RETRY_MILLISECONDS = 3000  # Reconnection delay suggested to the browser
+
+
+class Subscriber:
+    """
+    One open connection: a bounded queue of encoded events and a way to wake
+    its consumer, either a thread (Condition) or a coroutine (asyncio.Event).
+    """
+
+    def __init__(self, competition_id, loop=None):
+        self.competition_id = competition_id
+        self.events = deque(maxlen=BUFFER_SIZE)
+        self.overflowed = False
+        self.loop = loop
+        self.condition = threading.Condition()
+        self.ready = asyncio.Event() if loop is not None else None
+
+    def push(self, frame):
+        with self.condition:
+            if len(self.events) == self.events.maxlen:
+                self.overflowed = True
+            self.events.append(frame)
+            self.condition.notify()
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.ready.set)
+            except RuntimeError:
+                pass  # The loop is gone with the connection, unsubscribe is on its way
+
+    def drain(self):
+        """
+        Return the pending frames, led by a resync event if some were dropped.
+        """
+        with self.condition:
+            frames = list(self.events)
+            self.events.clear()
+            if self.overflowed:
+                self.overflowed = False
+                frames.insert(0, encode(None, 'resync', {'competition': self.competition_id}))
+        return frames
+
+    def wait(self, timeout):
+        with self.condition:
+            if not self.events:
+                self.condition.wait(timeout)
+
+
+class Broker:
+    """
+    Fan-out of encoded events to the subscribers of each competition.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}  # competition id -> set of Subscriber
+        self.ids = itertools.count(1)
+
+    def subscribe(self, competition_id, loop=None):
+        subscriber = Subscriber(competition_id, loop)
+        with self.lock:
+            self.subscribers.setdefault(competition_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            listeners = self.subscribers.get(subscriber.competition_id, set())
+            listeners.discard(subscriber)
+            if not listeners:
+                self.subscribers.pop(subscriber.competition_id, None)
+
+    def has_subscribers(self, competition_id=None):
+        if competition_id is None:
+            return bool(self.subscribers)
+        return competition_id in self.subscribers
+
+    def publish(self, competition_id, event, data):
+        with self.lock:
+            listeners = list(self.subscribers.get(competition_id, ()))
+        if not listeners:
+            return
+        frame = encode(next(self.ids), event, data)
+        for subscriber in listeners:
+            subscriber.push(frame)
+
+
+broker = Broker()
+
+
+def encode(event_id, event, data):
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines += [f'event: {event}', 'data: ' + json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))]
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+# Publishing. Every helper takes ids, runs after commit and does nothing (not
+# even a query) while nobody is watching.
+
+def after_commit(function):
+    @functools.wraps(function)
+    def publish_after_commit(ids):
+        ids = set(ids)
+        if ids:
+            transaction.on_commit(lambda: broker.has_subscribers() and function(ids))
+    return publish_after_commit
+
+
+@after_commit
+def publish_matches(match_ids):
+    """
+    Send the current state of the given matches.
+    """
+    rows = Match.objects.filter(pk__in=match_ids).values(
+        'id', 'category_id', 'category__competition_id', 'name', 'match_type', 'round', 'bracket_position',
+        'red_corner_id', 'blue_corner_id', 'winner_id', 'mat', 'slot',
+    )
+    for row in rows:
+        competition_id = row.pop('category__competition_id')
+        broker.publish(competition_id, 'match', row)
+
+
+@after_commit
+def publish_scores(match_ids):
+    """
+    Send every referee card of the given matches, one event per match.
+    """
+    cards = {}
+    rows = RefereeScore.objects.filter(match_id__in=match_ids).values(
+        'match_id', 'match__category__competition_id', 'referee_id', 'red_corner_score', 'blue_corner_score', 'winner',
+    ).order_by('match_id', 'referee_id')
+    for row in rows:
+        competition_id = row.pop('match__category__competition_id')
+        cards.setdefault((competition_id, row.pop('match_id')), []).append(row)
+    for (competition_id, match_id), match_cards in cards.items():
+        broker.publish(competition_id, 'scores', {'match': match_id, 'cards': match_cards})
+
+
+@after_commit
+def publish_categories(category_ids):
+    """
+    Send the places of the given categories.
+    """
+    rows = Category.objects.filter(pk__in=category_ids).values(
+        'id', 'competition_id', 'name', 'type',
+        'first_place_id', 'second_place_id', 'third_place_id',
+        'first_place_team_id', 'second_place_team_id', 'third_place_team_id',
+    )
+    for row in rows:
+        broker.publish(row.pop('competition_id'), 'category', row)
+
+
+# Streaming
+
+def preamble():
+    return f'retry: {RETRY_MILLISECONDS}\n\n'.encode()
+
+
+def sync_stream(competition_id):
+    """
+    Thread-per-viewer stream, for WSGI servers and the development server.
+    """
+    subscriber = broker.subscribe(competition_id)
+    try:
+        yield preamble()
+        while True:
+            subscriber.wait(HEARTBEAT_SECONDS)
+            frames = subscriber.drain()
+            yield b''.join(frames) if frames else b': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+async def async_stream(competition_id):
+    """
+    Coroutine-per-viewer stream, used when served over ASGI. Subscribing
+    happens here, on the event loop, since the view itself runs in a worker
+    thread.
+    """
+    subscriber = broker.subscribe(competition_id, loop=asyncio.get_running_loop())
+    try:
+        yield preamble()
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            subscriber.ready.clear()
+            frames = subscriber.drain()
+            yield b''.join(frames) if frames else b': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def competition_live(request, pk):
+    """
+    Server-Sent Events stream of the live results of a competition.
+    """
+    if not Competition.objects.filter(pk=pk).exists():
+        raise Http404('Competition not found')
+
+    stream = async_stream(pk) if isinstance(request, ASGIRequest) else sync_stream(pk)
+
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Let nginx pass events through as they come
+    return response
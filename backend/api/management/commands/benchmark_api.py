@@ -0,0 +1,184 @@
+import json
+import math
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from api.urls import router as api_router
+from landing.urls import router as landing_router
+
+# Plain views (not on a router) answering GET with a finite body
+EXTRA_URL_NAMES = [
+    'landing_page_data',
+    'changes',
+    'medals',
+    'rating-leaderboard',
+    'export-athletes',
+    'export-grade-history',
+    'export-results',
+]
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure query counts, p50/p99 latency and payload size of every api and landing GET endpoint and admin "
+        "changelist against the current database, and write the results as JSON. Run it on a database filled by "
+        "generate_federation; pass --baseline to compare with an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Warm requests per endpoint, after one cold request.")
+        parser.add_argument('--output', help="Write the JSON results to this file instead of stdout.")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to report regressions against.")
+        parser.add_argument('--only', help="Only benchmark URLs containing this text.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Relative p50 slowdown reported as a regression with --baseline (default 0.2 = 20%%).",
+        )
+
+    def handle(self, *args, repeat, output, baseline, only, tolerance, **options):
+        if repeat < 1:
+            raise CommandError("--repeat must be at least 1.")
+        with transaction.atomic():
+            # A throwaway superuser, so staff-only views and the admin are measured too
+            user = User.objects.create_superuser('benchmark-user', password=None)
+            client = Client(HTTP_HOST=self.host())
+            client.force_login(user)
+
+            results = []
+            for url in self.urls():
+                if only and only not in url:
+                    continue
+                results.append(self.measure(client, url, repeat))
+                self.stderr.write(
+                    f"{results[-1]['status']} {url}: {results[-1]['queries']} queries, "
+                    f"p50 {results[-1]['p50_ms']} ms, {results[-1]['bytes']} bytes"
+                )
+            transaction.set_rollback(True)
+
+        report = {
+            'commit': self.commit(),
+            'date': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': repeat,
+            'endpoints': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if output:
+            with open(output, 'w') as file:
+                file.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+        if baseline:
+            self.compare(baseline, results, tolerance)
+
+    def host(self):
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+        return hosts[0] if hosts else 'localhost'
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def urls(self):
+        """
+        List, detail and extra GET action URLs of both routers (details use the
+        first row of the table), the plain GET views, and every admin changelist.
+        """
+        urls = []
+        for router in (api_router, landing_router):
+            for prefix, viewset, basename in router.registry:
+                pk = self.first_pk(viewset)
+                urls.append(reverse(f'{basename}-list'))
+                if pk is not None and hasattr(viewset, 'retrieve'):
+                    urls.append(reverse(f'{basename}-detail', args=[pk]))
+                for extra in viewset.get_extra_actions():
+                    if 'get' not in extra.mapping or (extra.detail and pk is None):
+                        continue
+                    try:
+                        urls.append(reverse(f'{basename}-{extra.url_name}', args=[pk] if extra.detail else []))
+                    except NoReverseMatch:
+                        continue
+        urls += [reverse(name) for name in EXTRA_URL_NAMES]
+        for model in admin.site._registry:
+            urls.append(reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'))
+        return urls
+
+    def first_pk(self, viewset):
+        if viewset.queryset is not None:
+            model = viewset.queryset.model
+        elif viewset.serializer_class is not None:
+            model = viewset.serializer_class.Meta.model
+        else:
+            return None
+        return model._default_manager.order_by('pk').values_list('pk', flat=True).first()
+
+    def request(self, client, url):
+        connection.queries_log.clear()  # The log is capped, and a full log makes the captured count wrong
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+        return response.status_code, len(queries), elapsed * 1000, len(body)
+
+    def measure(self, client, url, repeat):
+        cache.clear()  # The first request builds every cached payload it needs
+        status, cold_queries, cold_ms, size = self.request(client, url)
+        timings, queries = [], cold_queries
+        for _ in range(repeat):
+            status, queries, elapsed, size = self.request(client, url)
+            timings.append(elapsed)
+        return {
+            'url': url,
+            'status': status,
+            'cold_queries': cold_queries,
+            'cold_ms': round(cold_ms, 2),
+            'queries': queries,
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'bytes': size,
+        }
+
+    def compare(self, path, results, tolerance):
+        with open(path) as file:
+            previous = {row['url']: row for row in json.load(file)['endpoints']}
+        regressions = 0
+        for row in results:
+            before = previous.get(row['url'])
+            if before is None:
+                continue
+            notes = []
+            for key in ('cold_queries', 'queries'):
+                if row[key] > before[key]:
+                    notes.append(f"{key} {before[key]} -> {row[key]}")
+            if row['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+                notes.append(f"p50 {before['p50_ms']} -> {row['p50_ms']} ms")
+            if notes:
+                regressions += 1
+                self.stderr.write(self.style.WARNING(f"{row['url']}: {', '.join(notes)}"))
+        if regressions:
+            raise CommandError(f"{regressions} endpoint(s) regressed against {path}.")
+        self.stderr.write(self.style.SUCCESS(f"No regressions against {path}."))
@@ -0,0 +1,44 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.brackets import generate_bracket
+from api.models import Athlete, Category, CategoryAthlete, Club, Competition, Grade
+
+
+class Command(BaseCommand):
+    help = "Time bracket generation for fight categories of several sizes. Nothing is kept in the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[8, 32, 64, 128, 256])
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per size; the best time is reported.")
+
+    def handle(self, *args, sizes, repeat, **options):
+        self.stdout.write(f"{'athletes':>8} {'matches':>8} {'queries':>8} {'best ms':>9}")
+        with transaction.atomic():
+            competition = Competition.objects.create(name='Bracket benchmark', start_date=date.today())
+            grades = [Grade.objects.create(name=f'Benchmark grade {i}', rank_order=i) for i in range(10)]
+            clubs = [Club.objects.create(name=f'Benchmark club {i}') for i in range(16)]
+            for size in sizes:
+                category = Category.objects.create(name=f'Benchmark -{size}', competition=competition, type='fight')
+                athletes = Athlete.objects.bulk_create(
+                    Athlete(
+                        first_name=f'Athlete {i}', last_name='Benchmark', date_of_birth=date(2000, 1, 1),
+                        club=clubs[i % len(clubs)], current_grade=grades[i % len(grades)],
+                    )
+                    for i in range(size)
+                )
+                CategoryAthlete.objects.bulk_create(CategoryAthlete(category=category, athlete=athlete) for athlete in athletes)
+
+                best = None
+                for _ in range(repeat):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        matches = generate_bracket(category, reset=True)
+                        elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(f"{size:>8} {len(matches):>8} {len(queries):>8} {best * 1000:>9.1f}")
+            transaction.set_rollback(True)
@@ -0,0 +1,318 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_table_version
+from api.models import (
+    AnnualVisa, Athlete, Category, CategoryAthlete, CategoryAthleteScore, CategoryTeam, CategoryTeamScore,
+    ChangeLogEntry, City, Club, Competition, FederationRole, Grade, GradeHistory, Match, MedicalVisa,
+    Placement, RefereeScore, Team, TeamMember, Title, TrainingSeminar,
+)
+from api.brackets import match_type_for
+from api.ratings import recompute_ratings
+
+CITIES = [
+    'Alba Iulia', 'Arad', 'Bacau', 'Baia Mare', 'Bistrita', 'Botosani', 'Braila', 'Brasov', 'Bucuresti',
+    'Buzau', 'Calarasi', 'Cluj-Napoca', 'Constanta', 'Craiova', 'Deva', 'Focsani', 'Galati', 'Giurgiu',
+    'Iasi', 'Oradea', 'Piatra Neamt', 'Pitesti', 'Ploiesti', 'Ramnicu Valcea', 'Resita', 'Satu Mare',
+    'Sibiu', 'Slatina', 'Suceava', 'Targoviste', 'Targu Jiu', 'Targu Mures', 'Timisoara', 'Tulcea',
+    'Vaslui', 'Zalau',
+]
+FIRST_NAMES = [
+    'Andrei', 'Alexandru', 'Mihai', 'Stefan', 'Ionut', 'Cristian', 'Gabriel', 'Vlad', 'Radu', 'Bogdan',
+    'Ana', 'Maria', 'Elena', 'Ioana', 'Andreea', 'Cristina', 'Gabriela', 'Alexandra', 'Diana', 'Irina',
+]
+LAST_NAMES = [
+    'Popescu', 'Ionescu', 'Popa', 'Dumitru', 'Stan', 'Stoica', 'Gheorghe', 'Rusu', 'Munteanu', 'Matei',
+    'Constantin', 'Serban', 'Moldovan', 'Lungu', 'Marin', 'Tudor', 'Dinu', 'Ciobanu', 'Ene', 'Molocea',
+]
+CLUB_WORDS = ['Dinamo', 'Olimpia', 'Viitorul', 'Energia', 'Progresul', 'Victoria', 'Unirea', 'Sportul']
+GRADES = [(f'{kyu} Kyu', 'inferior') for kyu in range(10, 0, -1)] + [(f'{dan} Dan', 'superior') for dan in range(1, 6)]
+TITLES = ['Maestru al Sportului', 'Maestru Emerit al Sportului', 'Antrenor Emerit']
+ROLES = ['President', 'Technical Director', 'Referee Commission', 'Coach Commission']
+COMPETITION_NAMES = ['National Championship', 'National Cup', 'Open', 'Grand Prix', 'Youth Championship', 'Masters Cup']
+CATEGORY_TYPES = ['solo', 'fight', 'teams']
+REFEREES_PER_CARD = 3
+TEAM_SIZE = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a synthetic federation: cities, clubs, athletes with grade histories and "
+        "visas, and seasons of competitions with categories, enrollments, teams, matches and referee scores. "
+        "The same --seed always produces the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--athletes', type=int, default=50000)
+        parser.add_argument('--clubs', type=int, default=500)
+        parser.add_argument('--seasons', type=int, default=10)
+        parser.add_argument('--competitions-per-season', type=int, default=6)
+        parser.add_argument('--categories-per-competition', type=int, default=12)
+        parser.add_argument('--category-size', type=int, default=16, help="Average athletes (or teams) per category.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if Athlete.objects.exists():
+            raise CommandError("The database already has athletes; run this on an empty database.")
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.this_year = date.today().year
+        self.first_season = self.this_year - options['seasons'] + 1
+        self.created = {}  # Model -> new primary keys, for the change log
+        self.team_signatures = set()
+
+        with transaction.atomic():
+            self.reference_tables()
+            clubs = self.clubs(options['clubs'])
+            athletes = self.athletes(options['athletes'], clubs)
+            self.grade_histories(athletes)
+            self.visas(athletes)
+            self.coaches(clubs, athletes)
+            self.seminars(athletes)
+            for season in range(self.first_season, self.this_year + 1):
+                for number in range(options['competitions_per_season']):
+                    self.competition(season, number, athletes, options['categories_per_competition'], options['category_size'])
+                self.stdout.write(f"Season {season} done")
+            Placement.refresh(self.created.get(Category, []))  # Places were set with bulk_update
+            recompute_ratings()  # Matches were inserted with bulk_create
+
+            # Bulk inserts send no signals, so log the rows and bump the table versions here
+            for model, ids in self.created.items():
+                ChangeLogEntry.record(model, ids)
+                transaction.on_commit(lambda model=model: bump_table_version(model))
+
+        for model, ids in self.created.items():
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {len(ids)}")
+
+    def insert(self, model, objects):
+        objects = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.created.setdefault(model, []).extend(obj.pk for obj in objects)
+        return objects
+
+    def day_in(self, year):
+        return min(date(year, 1, 1) + timedelta(days=self.random.randrange(365)), date.today())
+
+    def reference_tables(self):
+        self.cities = [City.objects.get_or_create(name=name)[0] for name in CITIES]
+        self.grades = [
+            Grade.objects.get_or_create(name=name, defaults={'rank_order': rank, 'grade_type': grade_type})[0]
+            for rank, (name, grade_type) in enumerate(GRADES, start=1)
+        ]
+        self.titles = [Title.objects.get_or_create(name=name)[0] for name in TITLES]
+        self.roles = [FederationRole.objects.get_or_create(name=name)[0] for name in ROLES]
+
+    def clubs(self, count):
+        return self.insert(Club, [
+            Club(
+                name=f"CS {self.random.choice(CLUB_WORDS)} {city.name} {index}", city=city,
+                mobile_number=f"07{self.random.randrange(10 ** 8):08d}",
+            )
+            for index, city in ((index, self.random.choice(self.cities)) for index in range(count))
+        ])
+
+    def athletes(self, count, clubs):
+        athletes = []
+        for _ in range(count):
+            club = self.random.choice(clubs)
+            born = self.day_in(self.random.randint(1960, self.this_year - 6))
+            # Older athletes tend to hold higher grades
+            mode = min(len(self.grades), (self.this_year - born.year) / 6)
+            grade_index = min(len(self.grades) - 1, int(self.random.triangular(0, len(self.grades), mode)))
+            registered = self.day_in(max(born.year + 6, self.first_season - 5))
+            athletes.append(Athlete(
+                first_name=self.random.choice(FIRST_NAMES), last_name=self.random.choice(LAST_NAMES),
+                date_of_birth=born, club=club, city_id=club.city_id,
+                current_grade=self.grades[grade_index],
+                title=self.random.choice(self.titles) if self.random.random() < 0.01 else None,
+                federation_role=self.random.choice(self.roles) if self.random.random() < 0.002 else None,
+                registered_date=registered, expiration_date=date(self.this_year, 12, 31),
+                is_referee=self.random.random() < 0.02 and born.year < self.this_year - 25,
+            ))
+        return self.insert(Athlete, athletes)
+
+    def grade_histories(self, athletes):
+        grade_rank = {grade.pk: index for index, grade in enumerate(self.grades)}
+        histories = []
+        for athlete in athletes:
+            exam_year = athlete.registered_date.year
+            for grade in self.grades[:grade_rank[athlete.current_grade_id] + 1]:
+                exam_year = min(exam_year + self.random.randint(0, 1), self.this_year)
+                histories.append(GradeHistory(
+                    athlete=athlete, grade=grade, exam_date=self.day_in(exam_year),
+                    exam_place=self.random.choice(self.cities).name,
+                ))
+        self.insert(GradeHistory, histories)
+
+    def visas(self, athletes):
+        annual, medical = [], []
+        for athlete in athletes:
+            for year in range(max(self.first_season, self.this_year - 2), self.this_year + 1):
+                if self.random.random() < 0.7:
+                    issued = self.day_in(year)
+                    annual.append(AnnualVisa(athlete=athlete, issued_date=issued))
+                    medical.append(MedicalVisa(athlete=athlete, issued_date=issued, health_status='approved'))
+        for visa in annual:
+            visa.update_visa_status()  # save() would do it, bulk_create does not
+        self.insert(AnnualVisa, annual)
+        self.insert(MedicalVisa, medical)
+
+    def coaches(self, clubs, athletes):
+        members = {}
+        for athlete in athletes:
+            if athlete.date_of_birth.year < self.this_year - 25:
+                members.setdefault(athlete.club_id, []).append(athlete)
+        links, coach_ids = [], set()
+        for club in clubs:
+            for coach in self.random.sample(members.get(club.pk, []), min(2, len(members.get(club.pk, [])))):
+                links.append(Club.coaches.through(club_id=club.pk, athlete_id=coach.pk))
+                coach_ids.add(coach.pk)
+        self.insert(Club.coaches.through, links)
+        Athlete.objects.filter(pk__in=coach_ids).update(is_coach=True)
+
+    def seminars(self, athletes):
+        for season in range(self.first_season, self.this_year + 1):
+            start = self.day_in(season)
+            seminar = self.insert(TrainingSeminar, [
+                TrainingSeminar(
+                    name=f"National Seminar {season}", start_date=start, end_date=start + timedelta(days=2),
+                    place=self.random.choice(self.cities).name,
+                ),
+            ])[0]
+            attendees = self.random.sample(athletes, min(200, len(athletes)))
+            self.insert(TrainingSeminar.athletes.through, [
+                TrainingSeminar.athletes.through(trainingseminar_id=seminar.pk, athlete_id=athlete.pk) for athlete in attendees
+            ])
+
+    def competition(self, season, number, athletes, category_count, category_size):
+        start = self.day_in(season)
+        competition = self.insert(Competition, [
+            Competition(
+                name=f"{COMPETITION_NAMES[number % len(COMPETITION_NAMES)]} {season}",
+                place=self.random.choice(self.cities).name, start_date=start, end_date=start + timedelta(days=1),
+                mat_count=self.random.randint(2, 6),
+            ),
+        ])[0]
+        referees = [athlete for athlete in athletes if athlete.is_referee and athlete.registered_date.year <= season]
+        categories = self.insert(Category, [
+            Category(
+                name=f"{CATEGORY_TYPES[index % 3].capitalize()} {index + 1}", competition=competition,
+                type=CATEGORY_TYPES[index % 3], gender=self.random.choice(['male', 'female', 'mixt']),
+            )
+            for index in range(category_count)
+        ])
+        placed = []
+        for category in categories:
+            size = max(2, int(self.random.gauss(category_size, category_size / 4)))
+            panel = self.random.sample(referees, min(REFEREES_PER_CARD, len(referees)))
+            if category.type == 'teams':
+                podium = self.team_category(category, athletes, size, panel)
+            else:
+                entrants = self.random.sample(athletes, min(size, len(athletes)))
+                self.insert(CategoryAthlete, [CategoryAthlete(category=category, athlete=athlete) for athlete in entrants])
+                if category.type == 'fight':
+                    podium = self.bracket(category, entrants, panel)
+                else:
+                    podium = self.solo_scores(category, entrants, panel)
+            placed.append((category, podium))
+
+        for category, podium in placed:
+            podium = podium + [None] * (3 - len(podium))
+            if category.type == 'teams':
+                category.first_place_team, category.second_place_team, category.third_place_team = podium[:3]
+            else:
+                category.first_place, category.second_place, category.third_place = podium[:3]
+        Category.objects.bulk_update(
+            categories,
+            ['first_place', 'second_place', 'third_place', 'first_place_team', 'second_place_team', 'third_place_team'],
+            batch_size=self.batch_size,
+        )
+
+    def solo_scores(self, category, entrants, panel):
+        scores, totals = [], {}
+        for athlete in entrants:
+            level = self.random.uniform(5, 9)
+            for referee in panel:
+                score = max(0, min(10, round(self.random.gauss(level, 0.7))))
+                scores.append(CategoryAthleteScore(category=category, athlete=athlete, referee=referee, score=score))
+                totals[athlete] = totals.get(athlete, 0) + score
+        self.insert(CategoryAthleteScore, scores)
+        return sorted(totals, key=totals.get, reverse=True)[:3]
+
+    def team_category(self, category, athletes, size, panel):
+        teams, memberships = [], []
+        for _ in range(size):
+            members = sorted(self.random.sample(athletes, TEAM_SIZE), key=lambda athlete: athlete.pk)
+            signature = Team.signature_for(athlete.pk for athlete in members)
+            if signature in self.team_signatures:
+                continue  # Team member signatures are unique
+            self.team_signatures.add(signature)
+            teams.append(Team(
+                name=" + ".join(f"{athlete.first_name} {athlete.last_name}" for athlete in members),
+                member_signature=signature,
+            ))
+            memberships.append(members)
+        teams = self.insert(Team, teams)
+        self.insert(TeamMember, [
+            TeamMember(team=team, athlete=athlete) for team, members in zip(teams, memberships) for athlete in members
+        ])
+        self.insert(CategoryTeam, [CategoryTeam(category=category, team=team) for team in teams])
+
+        scores, totals = [], {}
+        for team in teams:
+            for referee in panel:
+                score = self.random.randint(4, 10)
+                scores.append(CategoryTeamScore(category=category, team=team, referee=referee, score=score))
+                totals[team] = totals.get(team, 0) + score
+        self.insert(CategoryTeamScore, scores)
+        return sorted(totals, key=totals.get, reverse=True)[:3]
+
+    def bracket(self, category, entrants, panel):
+        """
+        Play a single-elimination bracket out: every match gets a card from
+        each referee of the panel and a winner by majority.
+        """
+        strength = {athlete.pk: self.random.random() for athlete in entrants}
+        rounds = max(1, (len(entrants) - 1).bit_length())
+        contenders = list(entrants)
+        matches, cards, losers = [], [], {}
+        for round_number in range(1, rounds + 1):
+            advancing = contenders[:2 ** rounds // 2 ** round_number * 2 - len(contenders)] if round_number == 1 else []
+            fighting = contenders[len(advancing):]
+            for position in range(len(fighting) // 2):
+                red, blue = fighting[2 * position], fighting[2 * position + 1]
+                match_type = match_type_for(round_number, rounds)
+                match = Match(
+                    category=category, red_corner=red, blue_corner=blue, round=round_number,
+                    bracket_position=position, match_type=match_type,
+                    name=Match.compose_name(red, blue, match_type, category),
+                )
+                red_chance = strength[red.pk] / (strength[red.pk] + strength[blue.pk] or 1)
+                votes = {'red': 0, 'blue': 0}
+                for referee in panel:
+                    corner = 'red' if self.random.random() < red_chance else 'blue'
+                    votes[corner] += 1
+                    cards.append((match, RefereeScore(
+                        referee=referee, winner=corner,
+                        red_corner_score=self.random.randint(0, 10), blue_corner_score=self.random.randint(0, 10),
+                    )))
+                match.winner = red if votes['red'] >= votes['blue'] else blue
+                losers[round_number] = losers.get(round_number, []) + [blue if match.winner is red else red]
+                advancing.append(match.winner)
+                matches.append(match)
+            contenders = advancing
+
+        self.insert(Match, matches)
+        for match, card in cards:
+            card.match = match
+        self.insert(RefereeScore, [card for _, card in cards])
+        self.insert(Match.referees.through, [
+            Match.referees.through(match_id=match.pk, athlete_id=referee.pk) for match in matches for referee in panel
+        ])
+        champion = contenders[0]
+        runner_up = losers[rounds][0] if rounds in losers else None
+        third = losers.get(rounds - 1, [None])[0]
+        return [athlete for athlete in (champion, runner_up, third) if athlete is not None]
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import AthleteRating
+from api.ratings import recompute_pending_ratings, recompute_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay every decided match in chronological order and rewrite the athlete ratings. Run it after "
+        "importing results in bulk; the same matches always give the same ratings. With --pending, only "
+        "replay if a corrected or deleted result requested it (run it from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending', action='store_true', help="Only replay if a corrected or deleted result requested it.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rated = recompute_pending_ratings() if options['pending'] else recompute_ratings()
+        if rated is None:
+            self.stdout.write("Ratings are up to date.")
+            return
+        self.stdout.write(
+            f"Rated {rated} matches for {AthleteRating.objects.count()} athletes "
+            f"in {time.perf_counter() - started:.2f} s."
+        )
@@ -0,0 +1,268 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Counters and histograms are sharded per thread: each thread updates its own
+dict without taking a lock, and a scrape sums the shards. The lock is only
+taken once per thread and metric, when the thread records its first value
+and when it exits, which folds its shard into the totals of finished threads
+so the shards never outnumber the live threads.
+
+Recorded here:
+- requests, latency and queries per request for every view, labelled by
+  view (ViewSetClass.action, admin url name or view function) rather than by
+  path, so the number of series stays bounded (MetricsMiddleware)
+- hits and misses of the payload and reference table caches
+- time spent in the api.signals handlers
+
+Each worker process has its own registry; scrape every worker, or run a
+single process per container.
+"""
+import hmac
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .profiling import view_name
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIGNAL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+registry = []
+
+
+class ShardOwner:
+    """
+    Held in a thread's locals only, so it is freed when the thread exits.
+    """
+
+
+class Metric(ABC):
+    """
+    A metric family whose values are kept in one dict per thread.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._finished = {}  # Shards of exited threads, merged; counters never go down
+        self._shards_lock = threading.Lock()
+        registry.append(self)
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            self._local.owner = owner = ShardOwner()
+            with self._shards_lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self.retire, shard)
+            return shard
+
+    def retire(self, shard):
+        # Runs as the thread exits, once nothing writes to the shard any more
+        with self._shards_lock:
+            self.merge(self._finished, shard)
+            self._shards.remove(shard)
+
+    @abstractmethod
+    def merge(self, totals, shard):
+        """
+        Add the values of `shard` into `totals`.
+        """
+
+    def collect(self):
+        """
+        Return `(labelvalues, value)` pairs summed over the shards.
+        """
+        totals = {}
+        with self._shards_lock:  # A retiring shard is counted once, in _finished or in _shards
+            self.merge(totals, self._finished)
+            for shard in self._shards:
+                self.merge(totals, shard)
+        return totals.items()
+
+    def labels(self, labelvalues, **extra):
+        pairs = [*zip(self.labelnames, labelvalues), *extra.items()]
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labelvalues, value in sorted(self.collect()):
+            lines += self.samples(labelvalues, value)
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        shard = self.shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def merge(self, totals, shard):
+        for labelvalues, value in shard.copy().items():
+            totals[labelvalues] = totals.get(labelvalues, 0) + value
+
+    def samples(self, labelvalues, value):
+        return [f'{self.name}{self.labels(labelvalues)} {number(value)}']
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        shard = self.shard()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then sum and count
+            counts = shard[labelvalues] = [0] * (len(self.buckets) + 3)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def merge(self, totals, shard):
+        for labelvalues, counts in shard.copy().items():
+            total = totals.setdefault(labelvalues, [0] * len(counts))
+            for index, value in enumerate(counts):
+                total[index] += value
+
+    def samples(self, labelvalues, counts):
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, '+Inf'), counts):
+            cumulative += count
+            le = bound if bound == '+Inf' else number(bound)
+            lines.append(f'{self.name}_bucket{self.labels(labelvalues, le=le)} {cumulative}')
+        lines.append(f'{self.name}_sum{self.labels(labelvalues)} {number(counts[-2])}')
+        lines.append(f'{self.name}_count{self.labels(labelvalues)} {counts[-1]}')
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+requests_total = Counter(
+    'http_requests_total', "Requests handled, by view, method and status code.", ('view', 'method', 'status'),
+)
+request_duration = Histogram(
+    'http_request_duration_seconds', "Time to build the response, by view.", ('view',),
+)
+request_queries = Histogram(
+    'http_request_queries', "SQL queries run per request, by view.", ('view',), buckets=QUERY_BUCKETS,
+)
+cache_requests = Counter(
+    'cache_requests_total', "Lookups of cached payloads and reference tables, by cache and result.",
+    ('cache', 'result'),
+)
+signal_duration = Histogram(
+    'signal_handler_duration_seconds', "Time spent in api.signals handlers, by handler.", ('handler',),
+    buckets=SIGNAL_BUCKETS,
+)
+
+
+def record_cache(name, hit):
+    cache_requests.inc(name, 'hit' if hit else 'miss')
+
+
+def timed_handler(handler):
+    """
+    Time a signal handler; apply it below @receiver.
+    """
+    @wraps(handler)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            signal_duration.observe(time.perf_counter() - started, handler.__name__)
+    return timed
+
+
+class QueryCounter:
+    """
+    Connection execute wrapper counting the queries of one request.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Count requests and observe their latency and query count. The latency of
+    a streaming response (the live feed) is the time to its first byte.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = view_name(request)[0] or 'unmatched'  # Unknown paths share one series
+        requests_total.inc(view, request.method, str(response.status_code))
+        request_duration.observe(elapsed, view)
+        request_queries.observe(queries.count, view)
+        return response
+
+
+def exposition():
+    lines = []
+    for metric in registry:
+        lines += metric.expose()
+    return '\n'.join(lines) + '\n'
+
+
+def scraper_allowed(request):
+    if request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    return bool(token) and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode(),
+    )
+
+
+def metrics_view(request):
+    """
+    Serve the registry to staff, or to scrapers allowed by METRICS_ALLOWED_IPS
+    or METRICS_TOKEN.
+    """
+    if not (scraper_allowed(request) or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:30
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_member_signatures(apps, schema_editor):
+    """
+    Compute the signature of every existing team. When several teams already
+    share a member set, only the oldest keeps the signature so the unique index
+    can be created; the others are left null.
+    """
+    Team = apps.get_model('api', 'Team')
+    TeamMember = apps.get_model('api', 'TeamMember')
+
+    members = {}
+    for team_id, athlete_id in TeamMember.objects.values_list('team_id', 'athlete_id').iterator(chunk_size=2000):
+        members.setdefault(team_id, set()).add(athlete_id)
+
+    seen = set()
+    teams = []
+    for team in Team.objects.order_by('id').only('id'):
+        athlete_ids = sorted(members.get(team.pk, ()))
+        signature = hashlib.sha256(','.join(map(str, athlete_ids)).encode()).hexdigest() if athlete_ids else None
+        if signature in seen:
+            signature = None
+        seen.add(signature)
+        team.member_signature = signature
+        teams.append(team)
+    Team.objects.bulk_update(teams, ['member_signature'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_athlete_category_match_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='member_signature',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_member_signatures, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='team',
+            name='member_signature',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_team_member_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoryathlete',
+            name='bracket_slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='bracket_position',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='round',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='categoryathlete',
+            constraint=models.UniqueConstraint(condition=models.Q(('bracket_slot__isnull', False)), fields=('category', 'bracket_slot'), name='unique_bracket_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.UniqueConstraint(condition=models.Q(('round__isnull', False)), fields=('category', 'round', 'bracket_position'), name='unique_bracket_match'),
+        ),
+    ]
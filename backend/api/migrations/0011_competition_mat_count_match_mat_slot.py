@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_match_round_bracket_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='mat_count',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='mat',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='slot',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
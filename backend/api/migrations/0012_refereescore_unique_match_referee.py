@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:35
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def delete_duplicate_referee_scores(apps, schema_editor):
+    """
+    Keep only the latest score card of each referee for a match, so the unique
+    constraint can be created.
+    """
+    RefereeScore = apps.get_model('api', 'RefereeScore')
+    duplicates = (
+        RefereeScore.objects.values('match_id', 'referee_id')
+        .annotate(cards=Count('id'), latest=Max('id'))
+        .filter(cards__gt=1)
+    )
+    for duplicate in list(duplicates):
+        RefereeScore.objects.filter(
+            match_id=duplicate['match_id'], referee_id=duplicate['referee_id'],
+        ).exclude(pk=duplicate['latest']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_competition_mat_count_match_mat_slot'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_referee_scores, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='refereescore',
+            unique_together={('match', 'referee')},
+        ),
+    ]
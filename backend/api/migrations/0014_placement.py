@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ATHLETE_PLACES = ('first_place_id', 'second_place_id', 'third_place_id')
+TEAM_PLACES = ('first_place_team_id', 'second_place_team_id', 'third_place_team_id')
+
+
+def materialize_placements(apps, schema_editor):
+    """
+    Build the placements of every existing category from its place fields.
+    """
+    Athlete = apps.get_model('api', 'Athlete')
+    Category = apps.get_model('api', 'Category')
+    Placement = apps.get_model('api', 'Placement')
+    TeamMember = apps.get_model('api', 'TeamMember')
+
+    clubs = dict(Athlete.objects.values_list('pk', 'club_id'))
+    members = {}
+    for team_id, athlete_id in TeamMember.objects.order_by('id').values_list('team_id', 'athlete_id'):
+        members.setdefault(team_id, []).append(athlete_id)
+
+    placements = []
+    for category in Category.objects.values('pk', 'type', 'competition_id', 'competition__start_date', *ATHLETE_PLACES, *TEAM_PLACES):
+        start_date = category['competition__start_date']
+        common = {
+            'category_id': category['pk'], 'competition_id': category['competition_id'],
+            'season': start_date.year if start_date else None,
+        }
+        for place in (1, 2, 3):
+            if category['type'] == 'teams':
+                team_id = category[TEAM_PLACES[place - 1]]
+                if team_id is not None:
+                    placements += [
+                        Placement(place=place, athlete_id=athlete_id, team_id=team_id, club_id=clubs.get(athlete_id), **common)
+                        for athlete_id in members.get(team_id, [None])
+                    ]
+            elif category[ATHLETE_PLACES[place - 1]] is not None:
+                athlete_id = category[ATHLETE_PLACES[place - 1]]
+                placements.append(Placement(place=place, athlete_id=athlete_id, club_id=clubs.get(athlete_id), **common))
+    Placement.objects.bulk_create(placements, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_changelogentry_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Placement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('place', models.PositiveSmallIntegerField()),
+                ('athlete', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='placements', to='api.athlete')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='placements', to='api.category')),
+                ('club', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='placements', to='api.club')),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='placements', to='api.competition')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='placements', to='api.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['competition', 'club'], name='api_placeme_competi_d496c9_idx'), models.Index(fields=['season', 'club'], name='api_placeme_season_c14bb9_idx')],
+            },
+        ),
+        migrations.RunPython(materialize_placements, migrations.RunPython.noop),
+    ]
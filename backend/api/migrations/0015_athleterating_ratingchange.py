@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_placement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('red_before', models.FloatField()),
+                ('red_after', models.FloatField()),
+                ('blue_before', models.FloatField()),
+                ('blue_after', models.FloatField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_change', to='api.match')),
+                ('winner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.athlete')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AthleteRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField(default=1500)),
+                ('matches', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('gender', models.CharField(choices=[('male', 'Male'), ('female', 'Female'), ('mixt', 'Mixt')], default='mixt', max_length=20)),
+                ('weight_class', models.CharField(blank=True, max_length=10)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('athlete', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating', to='api.athlete')),
+                ('grade', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.grade')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-rating', 'athlete'], name='api_athlete_rating_63c227_idx'), models.Index(fields=['gender', '-rating', 'athlete'], name='api_athlete_gender_554a50_idx'), models.Index(fields=['gender', 'weight_class', '-rating', 'athlete'], name='api_athlete_gender_81f7e0_idx'), models.Index(fields=['weight_class', '-rating', 'athlete'], name='api_athlete_weight__b5dd8e_idx'), models.Index(fields=['grade', '-rating', 'athlete'], name='api_athlete_grade_i_82469a_idx')],
+            },
+        ),
+    ]
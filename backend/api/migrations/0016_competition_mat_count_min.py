@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:17
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def give_every_competition_a_mat(apps, schema_editor):
+    """
+    Competitions saved with no mats could not be scheduled; give them one.
+    """
+    Competition = apps.get_model('api', 'Competition')
+    Competition.objects.filter(mat_count=0).update(mat_count=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_athleterating_ratingchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(give_every_competition_a_mat, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='competition',
+            name='mat_count',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
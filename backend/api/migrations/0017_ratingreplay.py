@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+def create_rating_replay(apps, schema_editor):
+    """
+    The rating writes lock this row, so it has to exist before the first one.
+    """
+    RatingReplay = apps.get_model('api', 'RatingReplay')
+    RatingReplay.objects.bulk_create([RatingReplay(pk=1)], ignore_conflicts=True)  # No signals, no change log entry
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_competition_mat_count_min'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingReplay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested', models.DateTimeField(blank=True, null=True)),
+                ('replayed', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_rating_replay, migrations.RunPython.noop),
+    ]
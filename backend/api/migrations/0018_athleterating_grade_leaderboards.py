@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_ratingreplay'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='athleterating',
+            index=models.Index(fields=['gender', 'grade', '-rating', 'athlete'], name='api_athlete_gender_d1b178_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athleterating',
+            index=models.Index(fields=['weight_class', 'grade', '-rating', 'athlete'], name='api_athlete_weight__411cfc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athleterating',
+            index=models.Index(fields=['gender', 'weight_class', 'grade', '-rating', 'athlete'], name='api_athlete_gender_6a49c3_idx'),
+        ),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+import hashlib
+
+from django.db import models, transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, FloatField, Max, Min, Q, Subquery, Sum, When, Window
+from django.db.models.functions import Cast, Rank
+from django.utils import timezone
 from django.contrib import admin
 from datetime import date, timedelta
 from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from .cache import bump_table_version
 
 # Create your models here.
 
@@ -21,6 +28,9 @@ class Competition(models.Model):
     
     start_date = models.DateField(blank=True, null=True)  # Start date of the competition
     end_date = models.DateField(blank=True, null=True)
+    mat_count = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])  # Mats fought on in parallel (see api.scheduling)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date})"
@@ -68,6 +78,8 @@ class Grade(models.Model):
 
 class Title(models.Model):
     name = models.CharField(max_length=100, unique=True)  # Title name
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -75,6 +87,8 @@ class Title(models.Model):
 
 class FederationRole(models.Model):
     name = models.CharField(max_length=100, unique=True)  # Federation role name
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -130,6 +144,8 @@ class Athlete(models.Model):
     profile_image = models.ImageField(
         upload_to='profile_images/', blank=True, null=True, default='profile_images/default.png'
     )  # Optional profile image with default
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def update_current_grade(self):
         """
@@ -174,6 +190,8 @@ class GradeHistory(models.Model):
     exam_place = models.CharField(max_length=100, blank=True, null=True)  # Place of the exam
     technical_director = models.CharField(max_length=100, blank=True, null=True)  # Technical director of the exam
     president = models.CharField(max_length=100, blank=True, null=True)  # President of the exam
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.grade.name} for {self.athlete.first_name} {self.athlete.last_name} on {self.obtained_date}"
@@ -189,6 +207,8 @@ class MedicalVisa(models.Model):
     athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='medical_visas')
     issued_date = models.DateField(blank=True, null=True)  # Renamed from 'date' to 'issued_date'
     health_status = models.CharField(max_length=10, choices=HEALTH_STATUS_CHOICES, default='denied')  # Dropdown for health status
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
     
     @property
     def is_valid(self):
@@ -217,6 +237,8 @@ class AnnualVisa(models.Model):
     athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='annual_visas')
     issued_date = models.DateField(blank=True, null=True)  # Date when the visa was issued
     visa_status = models.CharField(max_length=15, choices=VISA_STATUS_CHOICES, default='not_available')  # Default status
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     @property
     def is_valid(self):
@@ -255,6 +277,8 @@ class TrainingSeminar(models.Model):
     end_date = models.DateField(blank=True, null=True)
     place = models.CharField(max_length=100)
     athletes = models.ManyToManyField(Athlete, related_name='training_seminars',blank=True, )  # Many-to-Many relationship with Athlete
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date}) at {self.place}"
@@ -266,9 +290,19 @@ class CategoryAthlete(models.Model):
     category = models.ForeignKey('Category', on_delete=models.CASCADE, related_name="enrolled_athletes")
     athlete = models.ForeignKey('Athlete', on_delete=models.CASCADE)
     weight = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)  # Weight in kilograms
+    bracket_slot = models.PositiveSmallIntegerField(blank=True, null=True)  # First-round slot in the fight bracket
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('category', 'athlete')  # Ensure an athlete cannot be added twice to the same category
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'bracket_slot'],
+                condition=Q(bracket_slot__isnull=False),
+                name='unique_bracket_slot',
+            ),
+        ]
 
     def delete(self, *args, **kwargs):
         """
@@ -287,6 +321,8 @@ class CategoryTeam(models.Model):
     """
     category = models.ForeignKey('Category', on_delete=models.CASCADE, related_name='enrolled_teams')
     team = models.ForeignKey('Team', on_delete=models.CASCADE, related_name='enrolled_categories')  # Rename related_name
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('category', 'team')  # Ensure a team cannot be added twice to the same category
@@ -307,7 +343,57 @@ class Team(models.Model):
         blank=True,
         limit_choices_to={'type': 'teams'},  # Only allow categories with type 'teams'
     )
+    member_signature = models.CharField(
+        max_length=64, unique=True, null=True, blank=True, editable=False
+    )  # Hash of the sorted member athlete ids; null while the team is empty, or while a removal left it
+    # with the members of another team (see refresh_members)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def signature_for(athlete_ids):
+        """
+        Return the canonical signature of a set of athlete ids, or None if it is empty.
+        """
+        athlete_ids = sorted(set(athlete_ids))
+        if not athlete_ids:
+            return None
+        return hashlib.sha256(','.join(map(str, athlete_ids)).encode()).hexdigest()
+
+    def has_duplicate(self, signature):
+        """
+        Check whether another team already has exactly these members (one indexed lookup).
+        """
+        return signature is not None and Team.objects.filter(member_signature=signature).exclude(pk=self.pk).exists()
 
+    def refresh_members(self, removed=False):
+        """
+        Recompute the name and member signature from the TeamMember rows, with
+        one read and one update.
+
+        Adding a member that makes the team a duplicate raises ValueError.
+        Removing one never does, so deleting an athlete always succeeds: the
+        team keeps no signature until its members differ again, and the admin
+        form (TeamMemberFormSet) is where such a team is rejected.
+        """
+        members = list(
+            TeamMember.objects.filter(team_id=self.pk).order_by('id')
+            .values_list('athlete_id', 'athlete__first_name', 'athlete__last_name')
+        )
+        signature = Team.signature_for(athlete_id for athlete_id, _, _ in members)
+        if self.has_duplicate(signature):
+            if not removed:
+                raise ValueError("A team with the same members already exists.")
+            signature = None
+        self.name = " + ".join(f"{first_name} {last_name}" for _, first_name, last_name in members)
+        self.member_signature = signature
+        Team.objects.filter(pk=self.pk).update(name=self.name, member_signature=signature, modified=timezone.now())
+        ChangeLogEntry.record(Team, [self.pk])  # update() sends no post_save
+        # Team placements have one row per member
+        placed = Category.objects.filter(
+            Q(first_place_team=self.pk) | Q(second_place_team=self.pk) | Q(third_place_team=self.pk)
+        )
+        Placement.refresh(placed.values_list('pk', flat=True))
 
     def __str__(self):
         return self.name
@@ -319,6 +405,8 @@ class TeamMember(models.Model):
     """
     team = models.ForeignKey('Team', on_delete=models.CASCADE, related_name='members')
     athlete = models.ForeignKey('Athlete', on_delete=models.CASCADE, related_name='team_members')
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('team', 'athlete')  # Ensure an athlete cannot be added twice to the same team
@@ -365,6 +453,8 @@ class Category(models.Model):
         blank=True,
         related_name='categories'
     )  # Each category can be assigned to one group
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
 
     def clean(self):
@@ -379,9 +469,12 @@ class Category(models.Model):
             if len(set(awarded_teams)) != len(awarded_teams):
                 raise ValidationError("The same team cannot be awarded multiple times within the same category.")
 
-            # Ensure teams are enrolled before being awarded
+            # Ensure teams are enrolled before being awarded (one query for all of them)
+            enrolled = set(
+                CategoryTeam.objects.filter(category_id=self.pk, team__in=awarded_teams).values_list('team_id', flat=True)
+            ) if self.pk else set()
             for team in awarded_teams:
-                if team and not self.teams.filter(pk=team.pk).exists():
+                if team.pk not in enrolled:
                     raise ValidationError(f"Team '{team}' must be enrolled in the category to be awarded.")
         elif self.type in ['solo', 'fight']:
             # Validate individuals
@@ -391,9 +484,12 @@ class Category(models.Model):
             if len(set(awarded_athletes)) != len(awarded_athletes):
                 raise ValidationError("The same athlete cannot be awarded multiple times within the same category.")
 
-            # Ensure athletes are enrolled before being awarded
+            # Ensure athletes are enrolled before being awarded (one query for all of them)
+            enrolled = set(
+                CategoryAthlete.objects.filter(category_id=self.pk, athlete__in=awarded_athletes).values_list('athlete_id', flat=True)
+            ) if self.pk else set()
             for athlete in awarded_athletes:
-                if athlete and not CategoryAthlete.objects.filter(category=self, athlete=athlete).exists():
+                if athlete.pk not in enrolled:
                     raise ValidationError(f"Athlete '{athlete}' must be enrolled in the category to be awarded.")
 
 
@@ -401,10 +497,71 @@ class Category(models.Model):
         """
         Calculate total scores for each athlete in the category.
         """
-        athlete_scores = {}
-        for score in self.athlete_scores.all():
-            athlete_scores[score.athlete] = athlete_scores.get(score.athlete, 0) + score.score
-        return athlete_scores
+        totals = dict(self.athlete_scores.values_list('athlete').annotate(total=Sum('score')).order_by())
+        athletes = Athlete.objects.in_bulk(totals)
+        return {athletes[athlete_id]: total for athlete_id, total in totals.items()}
+
+    def calculate_team_scores(self):
+        """
+        Calculate total scores for each team in the category.
+        """
+        totals = dict(self.team_scores.values_list('team').annotate(total=Sum('score')).order_by())
+        teams = Team.objects.in_bulk(totals)
+        return {teams[team_id]: total for team_id, total in totals.items()}
+
+    # Standings are ordered by trimmed mean, then total, then best single score
+    STANDINGS_ORDER = ('trimmed_mean', 'total', 'highest')
+
+    def standings(self):
+        """
+        Rank the athletes (or teams, for a teams category) from the referee
+        scores, aggregated in a single query. The trimmed mean drops one highest
+        and one lowest score when there are more than two judges.
+
+        Each row tells whether it shares its trimmed mean with a neighbour and,
+        if so, which criterion separated them (None if still tied).
+        """
+        if self.type == 'teams':
+            scores, fields = self.team_scores, ('team_id', 'team__name')
+        else:
+            scores, fields = self.athlete_scores, ('athlete_id', 'athlete__first_name', 'athlete__last_name')
+        ordering = [F(field).desc() for field in self.STANDINGS_ORDER]
+        rows = list(
+            scores.values(*fields)
+            .annotate(
+                judges=Count('id'),
+                total=Sum('score'),
+                average=Avg('score', output_field=FloatField()),
+                highest=Max('score'),
+                lowest=Min('score'),
+            )
+            .annotate(
+                trimmed_mean=Case(
+                    When(judges__gt=2, then=ExpressionWrapper(
+                        Cast(F('total') - F('highest') - F('lowest'), FloatField()) / (F('judges') - 2),
+                        output_field=FloatField(),
+                    )),
+                    default=F('average'),
+                    output_field=FloatField(),
+                ),
+            )
+            .annotate(rank=Window(Rank(), order_by=ordering))
+            .order_by(*ordering, fields[0])
+        )
+
+        for index, row in enumerate(rows):
+            neighbours = [rows[i] for i in (index - 1, index + 1) if 0 <= i < len(rows)]
+            tied_rows = [other for other in neighbours if other['trimmed_mean'] == row['trimmed_mean']]
+            row['tied'] = bool(tied_rows)
+            row['tie_break'] = None
+            for other in tied_rows:
+                if other['rank'] == row['rank']:
+                    continue  # Still tied on every criterion
+                # First criterion that differs between the two rows decided the order
+                decided_by = next(key for key in self.STANDINGS_ORDER[1:] if other[key] != row[key])
+                if row['tie_break'] is None or self.STANDINGS_ORDER.index(decided_by) < self.STANDINGS_ORDER.index(row['tie_break']):
+                    row['tie_break'] = decided_by
+        return rows
 
     
     
@@ -440,41 +597,158 @@ class Match(models.Model):
     referees = models.ManyToManyField('Athlete', related_name='refereed_matches', limit_choices_to={'is_referee': True})
     winner = models.ForeignKey('Athlete', on_delete=models.SET_NULL, null=True, blank=True, related_name='won_matches')
     name = models.CharField(max_length=255, blank=True)  # Automatically generated match name
+    round = models.PositiveSmallIntegerField(blank=True, null=True)  # Bracket round, 1 = first round (see api.brackets)
+    bracket_position = models.PositiveSmallIntegerField(blank=True, null=True)  # Position within the round, from 0
+    mat = models.PositiveSmallIntegerField(blank=True, null=True)  # Mat number, from 1 (see api.scheduling)
+    slot = models.PositiveIntegerField(blank=True, null=True)  # Time slot on the competition day, from 0
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
-    def calculate_winner(self):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category', 'round', 'bracket_position'],
+                condition=Q(round__isnull=False),
+                name='unique_bracket_match',
+            ),
+        ]
+
+    # Fields the generated name is built from
+    NAME_FIELDS = ('red_corner_id', 'blue_corner_id', 'match_type', 'category_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the stored name was built from, so save() only rebuilds it when one changes
+        instance._name_inputs = instance.name_inputs()
+        if 'winner_id' in instance.__dict__:
+            instance._saved_winner_id = instance.winner_id  # So only a new result is rated (see api.signals.rate_match)
+        return instance
+
+    def winner_changed(self):
         """
-        Determine the winner based on referee votes.
+        Whether the winner differs from the one last loaded or saved; unknown counts as changed.
+        """
+        return not hasattr(self, '_saved_winner_id') or self._saved_winner_id != self.winner_id
+
+    def name_inputs(self):
+        # Read from __dict__ so a deferred field is not fetched (it then counts as changed)
+        return tuple(self.__dict__.get(field) for field in Match.NAME_FIELDS)
+
+    @staticmethod
+    def format_name(red_first_name, blue_first_name, match_type, category_name):
+        return f"{red_first_name} vs {blue_first_name} ({match_type}) - {category_name}"
+
+    @staticmethod
+    def compose_name(red_corner, blue_corner, match_type, category):
+        return Match.format_name(red_corner.first_name, blue_corner.first_name, match_type, category.name)
+
+    def build_name(self):
+        """
+        Compose the name from the corners and category already loaded on the
+        instance, or else from a single read of the three names.
         """
-        red_votes = self.referee_scores.filter(winner='red').count()
-        blue_votes = self.referee_scores.filter(winner='blue').count()
+        related = [self._meta.get_field(name) for name in ('red_corner', 'blue_corner', 'category')]
+        if all(field.is_cached(self) for field in related):
+            return Match.compose_name(self.red_corner, self.blue_corner, self.match_type, self.category)
+
+        def first_name(athlete_id):
+            return Subquery(Athlete.objects.filter(pk=athlete_id).values('first_name'))
+
+        names = Category.objects.filter(pk=self.category_id).values(
+            'name', red=first_name(self.red_corner_id), blue=first_name(self.blue_corner_id),
+        ).get()
+        return Match.format_name(names['red'], names['blue'], self.match_type, names['name'])
+
+    @staticmethod
+    def vote_tally():
+        """
+        Aggregates counting the referee votes of a match in a single query.
+        """
+        return {
+            'votes': Count('referee_scores'),
+            'red_votes': Count('referee_scores', filter=Q(referee_scores__winner='red')),
+            'blue_votes': Count('referee_scores', filter=Q(referee_scores__winner='blue')),
+        }
+
+    def winner_id_from_votes(self, red_votes, blue_votes):
         if red_votes > blue_votes:
-            return self.red_corner
+            return self.red_corner_id
         elif blue_votes > red_votes:
-            return self.blue_corner
+            return self.blue_corner_id
         return None  # No winner if votes are tied
 
+    def calculate_winner(self):
+        """
+        Determine the winner based on referee votes.
+        """
+        tally = Match.objects.filter(pk=self.pk).aggregate(**Match.vote_tally())
+        winner_id = self.winner_id_from_votes(tally['red_votes'], tally['blue_votes'])
+        if winner_id is None:
+            return None
+        return self.red_corner if winner_id == self.red_corner_id else self.blue_corner
+
     def save(self, *args, **kwargs):
         """
         Override save to calculate the winner based on referee scores or allow manual winner selection.
         """
-        # Save the instance first to ensure it has a primary key
-        if not self.pk:
-            super().save(*args, **kwargs)
-            self.refresh_from_db()  # Reload the instance to ensure it has a primary key
+        # Generate the match name, unless nothing it is built from changed since it was loaded
+        if self.name_inputs() != getattr(self, '_name_inputs', None):
+            self.name = self.build_name()
 
-        # Generate the match name
-        self.name = f"{self.red_corner.first_name} vs {self.blue_corner.first_name} ({self.match_type}) - {self.category.name}"
-
-        # Calculate the winner based on referee scores if they exist
-        if self.pk and self.referee_scores.exists():
-            self.winner = self.calculate_winner()
-        else:
-            # Allow manual winner selection if no referee scores exist
-            if not self.winner:
-                self.winner = None  # Clear the winner if not manually set
+        # Calculate the winner based on referee scores if they exist (a new match has none)
+        if self.pk:
+            tally = Match.objects.filter(pk=self.pk).aggregate(**Match.vote_tally())
+            if tally['votes']:
+                self.winner_id = self.winner_id_from_votes(tally['red_votes'], tally['blue_votes'])
+            # Otherwise keep the manually selected winner
 
-        # Save again to update the winner field and name
         super().save(*args, **kwargs)
+        self._name_inputs = self.name_inputs()
+        self._saved_winner_id = self.winner_id
+
+    @classmethod
+    def recompute_winners(cls, category=None, match_ids=None):
+        """
+        Recompute the winner of every scored match of a category (or of the
+        given matches) with one grouped aggregate and one bulk update. Returns
+        the number of matches changed.
+        """
+        matches = cls.objects.all()
+        if category is not None:
+            matches = matches.filter(category=category)
+        if match_ids is not None:
+            matches = matches.filter(pk__in=match_ids)
+        matches = (
+            matches
+            .annotate(**cls.vote_tally())
+            .filter(votes__gt=0)
+            .only('id', 'category_id', 'red_corner_id', 'blue_corner_id', 'winner_id', 'round', 'bracket_position')
+        )
+        now = timezone.now()
+        changed = []
+        for match in matches:
+            winner_id = match.winner_id_from_votes(match.red_votes, match.blue_votes)
+            if winner_id != match.winner_id:
+                match.winner_id = winner_id
+                match.modified = now
+                changed.append(match)
+        if changed:
+            from .brackets import advance_winner
+            from .live import publish_matches
+            from .ratings import rate_matches
+
+            with transaction.atomic():
+                cls.objects.bulk_update(changed, ['winner', 'modified'], batch_size=500)
+                # bulk_update sends no post_save, so bump the table version, log, publish and advance brackets here
+                transaction.on_commit(lambda: bump_table_version(cls))
+                ChangeLogEntry.record(cls, [match.pk for match in changed])
+                publish_matches(match.pk for match in changed)
+                for match in changed:
+                    if match.round is not None and match.winner_id is not None:
+                        advance_winner(match)
+                transaction.on_commit(lambda: rate_matches([match.pk for match in changed]))
+        return len(changed)
 
     def __str__(self):
         return self.name
@@ -486,6 +760,11 @@ class RefereeScore(models.Model):
     red_corner_score = models.IntegerField(default=0)
     blue_corner_score = models.IntegerField(default=0)
     winner = models.CharField(max_length=10, choices=[('red', 'Red Corner'), ('blue', 'Blue Corner')], null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('match', 'referee')  # One score card per referee and match
 
     def __str__(self):
         return f"Referee: {self.referee.first_name} {self.referee.last_name} - Match: {self.match}"
@@ -499,6 +778,8 @@ class CategoryAthleteScore(models.Model):
     athlete = models.ForeignKey('Athlete', on_delete=models.CASCADE, related_name='category_scores')
     referee = models.ForeignKey('Athlete', on_delete=models.CASCADE, limit_choices_to={'is_referee': True})
     score = models.IntegerField(default=0)  # Score given by the referee
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('category', 'athlete', 'referee')  # Ensure unique scores per referee and athlete
@@ -515,6 +796,8 @@ class CategoryTeamScore(models.Model):
     team = models.ForeignKey('Team', on_delete=models.CASCADE, related_name='category_scores')
     referee = models.ForeignKey('Athlete', on_delete=models.CASCADE, limit_choices_to={'is_referee': True})
     score = models.IntegerField(default=0)  # Score given by the referee
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('category', 'team', 'referee')  # Ensure unique scores per referee and team
@@ -535,8 +818,262 @@ class Group(models.Model):
         on_delete=models.CASCADE,
         related_name='groups'
     )  # Link each group to a specific competition
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.competition.name})"
 
 
+class Placement(models.Model):
+    """
+    One podium place (1-3) in a category, materialized from the Category
+    place fields so medal tables and rankings are indexed reads instead of a
+    scan over every category (see Placement.refresh).
+
+    A team placement has one row per member, each with the member's club:
+    medal counts use distinct categories, so a club is credited once for a
+    team medal however many of its athletes were on the team. The club is
+    the athlete's club when the placement was first recorded, so a later
+    transfer does not move past medals.
+    """
+    MEDALS = ('gold', 'silver', 'bronze')  # Place 1, 2 and 3
+    ATHLETE_PLACES = ('first_place', 'second_place', 'third_place')
+    TEAM_PLACES = ('first_place_team', 'second_place_team', 'third_place_team')
+
+    competition = models.ForeignKey('Competition', on_delete=models.CASCADE, related_name='placements')
+    category = models.ForeignKey('Category', on_delete=models.CASCADE, related_name='placements')
+    season = models.PositiveSmallIntegerField(blank=True, null=True)  # Year the competition started
+    place = models.PositiveSmallIntegerField()
+    athlete = models.ForeignKey(
+        'Athlete', on_delete=models.CASCADE, related_name='placements', blank=True, null=True,
+    )  # Null only for a placed team without members
+    team = models.ForeignKey('Team', on_delete=models.CASCADE, related_name='placements', blank=True, null=True)
+    club = models.ForeignKey('Club', on_delete=models.SET_NULL, related_name='placements', blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['competition', 'club']),
+            models.Index(fields=['season', 'club']),
+        ]
+
+    @classmethod
+    def refresh(cls, category_ids):
+        """
+        Rewrite the placements of the given categories from their place
+        fields with a fixed number of queries, leaving the categories whose
+        placements did not change untouched. Return the ids of the rewritten
+        categories.
+        """
+        categories = list(
+            Category.objects.filter(pk__in=category_ids)
+            .values('pk', 'type', 'competition_id', 'competition__start_date', *cls.ATHLETE_PLACES, *cls.TEAM_PLACES)
+        )
+        existing, kept_clubs = {}, {}
+        for row in cls.objects.filter(category_id__in=[category['pk'] for category in categories]).values_list(
+            'category_id', 'competition_id', 'season', 'place', 'athlete_id', 'team_id', 'club_id',
+        ):
+            existing.setdefault(row[0], set()).add(row[1:])
+            kept_clubs[(row[0], *row[3:6])] = row[6]
+
+        team_ids = {category[field] for category in categories if category['type'] == 'teams' for field in cls.TEAM_PLACES}
+        members = {}
+        for team_id, athlete_id, club_id in (
+            TeamMember.objects.filter(team_id__in=team_ids - {None}).order_by('id')
+            .values_list('team_id', 'athlete_id', 'athlete__club_id')
+        ):
+            members.setdefault(team_id, []).append((athlete_id, club_id))
+        athlete_ids = {category[field] for category in categories if category['type'] != 'teams' for field in cls.ATHLETE_PLACES}
+        clubs = dict(Athlete.objects.filter(pk__in=athlete_ids - {None}).values_list('pk', 'club_id'))
+
+        wanted = {}
+        for category in categories:
+            start_date = category['competition__start_date']
+            prefix = (category['competition_id'], start_date.year if start_date else None)
+            rows = set()
+            for place in (1, 2, 3):
+                if category['type'] == 'teams':
+                    team_id = category[cls.TEAM_PLACES[place - 1]]
+                    placed = [(athlete_id, team_id, club_id) for athlete_id, club_id in members.get(team_id, [(None, None)])]
+                else:
+                    athlete_id = category[cls.ATHLETE_PLACES[place - 1]]
+                    placed = [(athlete_id, None, clubs.get(athlete_id))]
+                for athlete_id, team_id, club_id in placed:
+                    if athlete_id is None and team_id is None:
+                        continue
+                    club_id = kept_clubs.get((category['pk'], place, athlete_id, team_id), club_id)
+                    rows.add((*prefix, place, athlete_id, team_id, club_id))
+            wanted[category['pk']] = rows
+
+        changed = [pk for pk, rows in wanted.items() if rows != existing.get(pk, set())]
+        if changed:
+            cls.objects.filter(category_id__in=changed).delete()
+            cls.objects.bulk_create([
+                cls(
+                    category_id=pk, competition_id=competition_id, season=season, place=place,
+                    athlete_id=athlete_id, team_id=team_id, club_id=club_id,
+                )
+                for pk in changed
+                for competition_id, season, place, athlete_id, team_id, club_id in wanted[pk]
+            ], batch_size=500)
+            # bulk_create sends no post_save, so bump the table version here
+            transaction.on_commit(lambda: bump_table_version(cls))
+        return changed
+
+    @classmethod
+    def medal_counts(cls):
+        """
+        Aggregates counting gold, silver and bronze medals, one per category.
+        """
+        return {
+            medal: Count('category', filter=Q(place=place), distinct=True)
+            for place, medal in enumerate(cls.MEDALS, start=1)
+        }
+
+    @classmethod
+    def medal_table(cls, by_points=False, **filters):
+        """
+        Rank the clubs by medals won in the placements matching `filters`:
+        golds first, then silvers, then bronzes, or by points (3 for gold, 2
+        for silver, 1 for bronze) with `by_points`. Aggregated in one query.
+        """
+        ordering = [F('points').desc()] if by_points else [F(medal).desc() for medal in cls.MEDALS]
+        return list(
+            cls.objects.filter(club__isnull=False, **filters)
+            .values('club_id', 'club__name')
+            .annotate(**cls.medal_counts())
+            .annotate(total=F('gold') + F('silver') + F('bronze'), points=3 * F('gold') + 2 * F('silver') + F('bronze'))
+            .annotate(rank=Window(Rank(), order_by=ordering))
+            .order_by(*ordering, 'club__name')
+        )
+
+    def __str__(self):
+        return f"{self.MEDALS[self.place - 1]} in category #{self.category_id}"
+
+
+class AthleteRating(models.Model):
+    """
+    Elo rating of an athlete from the decided fight matches (see api.ratings).
+
+    Gender, weight class and grade are copied onto the row so that every
+    leaderboard is a range scan of one of the indexes below.
+    """
+    INITIAL_RATING = 1500
+
+    athlete = models.OneToOneField('Athlete', on_delete=models.CASCADE, related_name='rating')
+    rating = models.FloatField(default=INITIAL_RATING)
+    matches = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    gender = models.CharField(
+        max_length=20, choices=Category.GENDER_CHOICES, default='mixt',
+    )  # From the last male or female category fought in, mixt while unknown
+    weight_class = models.CharField(max_length=10, blank=True)  # e.g. '-70' or '+90', from the last weigh-in
+    grade = models.ForeignKey(
+        'Grade', on_delete=models.SET_NULL, related_name='+', blank=True, null=True,
+    )  # The athlete's current grade
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Leaderboards order by rating, then athlete for a stable order of ties
+            models.Index(fields=['-rating', 'athlete']),
+            models.Index(fields=['gender', '-rating', 'athlete']),
+            models.Index(fields=['gender', 'weight_class', '-rating', 'athlete']),
+            models.Index(fields=['weight_class', '-rating', 'athlete']),
+            models.Index(fields=['grade', '-rating', 'athlete']),
+            models.Index(fields=['gender', 'grade', '-rating', 'athlete']),
+            models.Index(fields=['weight_class', 'grade', '-rating', 'athlete']),
+            models.Index(fields=['gender', 'weight_class', 'grade', '-rating', 'athlete']),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete_id}: {self.rating:.0f}"
+
+
+class RatingChange(models.Model):
+    """
+    The rating update applied for one match, kept so that a corrected result
+    can be detected and the rating history shown.
+    """
+    match = models.OneToOneField('Match', on_delete=models.CASCADE, related_name='rating_change')
+    winner = models.ForeignKey('Athlete', on_delete=models.CASCADE, related_name='+')  # Winner the update was computed for
+    red_before = models.FloatField()
+    red_after = models.FloatField()
+    blue_before = models.FloatField()
+    blue_after = models.FloatField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Rating change for match #{self.match_id}"
+
+
+class RatingReplay(models.Model):
+    """
+    The single row (pk=1) coordinating the rating writes (see api.ratings).
+
+    Every rating update starts by writing to it, which holds its row lock
+    (the database write lock on SQLite) until the transaction ends, so a
+    replay of the history and the incremental updates never interleave.
+    `requested` is set, in the transaction of a corrected or deleted
+    result, while a replay is due.
+    """
+    requested = models.DateTimeField(blank=True, null=True)
+    replayed = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Rating replay requested {self.requested}" if self.requested else "Ratings up to date"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    One write to an api table, for the delta sync feed (/changes/).
+
+    Entries are filled by the post_save, delete and m2m_changed signals (the
+    rows of one delete(), cascades included, in one insert), and by
+    ChangeLogEntry.record() on the bulk write paths that send no signals. The id is the sync cursor: a client stores the last one it saw
+    and asks for everything after it.
+
+    Entries are written in the transaction of the change they log, so ids
+    follow the order of the writes, not of the commits: a transaction still
+    open can commit a lower id after a higher one was served. The feed
+    therefore stops at a gap in the ids until it settles (see api.views.changes).
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+    ]
+
+    model = models.CharField(max_length=100)  # Model name in the api app, e.g. 'athlete' or 'club_coaches'
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    changed = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    @classmethod
+    def record(cls, model, ids, action=UPSERT):
+        """
+        Log a write to the given rows in the current transaction, so the
+        entries commit or roll back with the write itself.
+        """
+        entries = [cls(model=model._meta.model_name, object_id=pk, action=action) for pk in set(ids)]
+        if entries:
+            cls.objects.bulk_create(entries, batch_size=500)
+
+    @classmethod
+    def record_deletes(cls, deleted):
+        """
+        Log the rows removed by one delete, `{model: ids}`, with a single insert.
+        """
+        entries = [
+            cls(model=model._meta.model_name, object_id=pk, action=cls.DELETE)
+            for model, ids in deleted.items() for pk in set(ids)
+        ]
+        if entries:
+            cls.objects.bulk_create(entries, batch_size=500)
+
+    def __str__(self):
+        return f"{self.action} {self.model} #{self.object_id}"
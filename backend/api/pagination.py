@@ -0,0 +1,23 @@
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page number pagination for the small and medium tables.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination for the large tables (athletes, matches, grade history).
+
+    Pages are fetched with `WHERE id > cursor` on the primary key index, so the
+    cost of a page does not depend on how deep into the table it is.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
@@ -0,0 +1,223 @@
+"""
+Sampling request profiler, safe to leave on in production.
+
+ProfilingMiddleware profiles a random share of requests (PROFILING_SAMPLE_RATE,
+off by default). For each sampled request it records:
+- the view and route
+- the SQL query count, and how many of those repeat an SQL statement already
+  run in the request (an N+1 loop shows up as a high duplicate count)
+- DB time and serializer time, where serializer time excludes the queries run
+  lazily while serializing
+- total time and response size
+
+Queries are counted with a connection execute wrapper, so DEBUG does not need
+to be on. Serializer time is measured by wrapping the DRF serializer `data`
+properties only while a sampled request is in flight. Samples go to an
+in-process ring buffer that staff can read at /profiling/, and to one JSON log
+line each on the `api.profiling` logger. Requests that are not sampled only
+pay for one random() call.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework import serializers
+
+logger = logging.getLogger('api.profiling')
+
+BUFFER_SIZE = 2000  # Samples kept in memory, oldest dropped first
+
+samples = deque(maxlen=BUFFER_SIZE)
+samples_lock = threading.Lock()
+current_profile = ContextVar('current_profile', default=None)
+
+# Sampled requests in flight, the serializer `data` properties stay wrapped while any is
+serializer_timing_users = 0
+serializer_timing_lock = threading.Lock()
+SERIALIZER_CLASSES = (serializers.Serializer, serializers.ListSerializer)
+
+
+class Profile:
+    """
+    Measurements of one sampled request.
+    """
+
+    def __init__(self):
+        self.statements = Counter()
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Connection execute wrapper: time every query and remember its SQL
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.statements[sql] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicate_count(self):
+        return self.query_count - len(self.statements)
+
+
+def timed(data_property):
+    """
+    Wrap a serializer `data` property so the outermost call made during a
+    sampled request adds its time (less DB time) to the profile.
+    """
+    def data(self):
+        profile = current_profile.get()
+        if profile is None or profile.serializing:
+            return data_property.fget(self)
+        profile.serializing = True
+        started, db_before = time.perf_counter(), profile.db_seconds
+        try:
+            return data_property.fget(self)
+        finally:
+            profile.serializing = False
+            profile.serializer_seconds += time.perf_counter() - started - (profile.db_seconds - db_before)
+    data.wrapped = data_property
+    return property(data)
+
+
+@contextmanager
+def serializer_timing():
+    """
+    Wrap the serializer `data` properties for the duration of a sampled
+    request. The first sampled request in flight installs the wrappers and
+    the last one restores the DRF properties, so requests served while
+    nothing is sampled run the serializers untouched.
+    """
+    global serializer_timing_users
+    with serializer_timing_lock:
+        if serializer_timing_users == 0:
+            for serializer_class in SERIALIZER_CLASSES:
+                serializer_class.data = timed(serializer_class.__dict__['data'])
+        serializer_timing_users += 1
+    try:
+        yield
+    finally:
+        with serializer_timing_lock:
+            serializer_timing_users -= 1
+            if serializer_timing_users == 0:
+                for serializer_class in SERIALIZER_CLASSES:
+                    serializer_class.data = serializer_class.__dict__['data'].fget.wrapped
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    actions = getattr(match.func, 'actions', None)  # Set on viewset views
+    view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if view_class is not None and actions:
+        view = f"{view_class.__name__}.{actions.get(request.method.lower(), request.method.lower())}"
+    elif match.namespace == 'admin':
+        view = match.view_name  # e.g. admin:api_athlete_changelist, one per model page
+    else:
+        view = match._func_path
+    return view, match.route
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        profile = Profile()
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(serializer_timing())
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        elapsed = time.perf_counter() - started
+
+        view, route = view_name(request)
+        sample = {
+            'time': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'route': route,
+            'status': response.status_code,
+            'queries': profile.query_count,
+            'duplicate_queries': profile.duplicate_count,
+            'db_ms': round(profile.db_seconds * 1000, 2),
+            'serializer_ms': round(profile.serializer_seconds * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            'bytes': None if response.streaming else len(response.content),
+        }
+        with samples_lock:
+            samples.append(sample)
+        logger.info(json.dumps(sample, separators=(',', ':')))
+        return response
+
+
+def summarize(rows):
+    """
+    Per-view aggregates, slowest total time first.
+    """
+    by_view = {}
+    for row in rows:
+        by_view.setdefault(row['view'] or row['path'], []).append(row)
+    summary = []
+    for view, view_rows in by_view.items():
+        totals = sorted(row['total_ms'] for row in view_rows)
+        summary.append({
+            'view': view,
+            'samples': len(view_rows),
+            'mean_ms': round(sum(totals) / len(totals), 2),
+            'p95_ms': totals[min(len(totals) - 1, int(len(totals) * 0.95))],
+            'mean_queries': round(sum(row['queries'] for row in view_rows) / len(view_rows), 1),
+            'max_duplicate_queries': max(row['duplicate_queries'] for row in view_rows),
+            'mean_db_ms': round(sum(row['db_ms'] for row in view_rows) / len(view_rows), 2),
+            'mean_serializer_ms': round(sum(row['serializer_ms'] for row in view_rows) / len(view_rows), 2),
+        })
+    summary.sort(key=lambda row: row['mean_ms'] * row['samples'], reverse=True)
+    return summary
+
+
+@staff_member_required
+def profiling_samples(request):
+    """
+    The sampled requests in the ring buffer, newest first, with per-view
+    aggregates. Narrow them down with `?view=` (e.g. CategoryViewSet.list).
+    """
+    with samples_lock:
+        rows = list(samples)
+    view = request.GET.get('view')
+    if view:
+        rows = [row for row in rows if row['view'] == view]
+    try:
+        limit = int(request.GET.get('limit', 100))
+    except ValueError:
+        limit = 100
+    return JsonResponse({
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0),
+        'summary': summarize(rows),
+        'samples': rows[::-1][:limit],
+    })
@@ -0,0 +1,229 @@
+"""
+Elo ratings of fighters, from the winners of their matches.
+
+Every decided match moves the two corners' ratings towards its result:
+the winner gains what the loser drops, scaled by how surprising the result
+was. New athletes move faster (K_PROVISIONAL for their first
+PROVISIONAL_MATCHES matches) so they reach their level quickly.
+
+Ratings are kept up to date incrementally: rate_matches() applies each
+newly decided match once, in the order results come in, and records the
+update as a RatingChange. A result corrected or deleted after it was rated
+cannot be undone in place, so it requests a replay instead
+(schedule_recompute). recompute_ratings() replays the whole history in
+competition order and is deterministic: the same matches always give the
+same ratings. It is too slow to run in a request, so it runs out of band:
+`manage.py recompute_ratings --pending` runs a requested replay (run it
+from cron), and `manage.py recompute_ratings` runs one after importing
+results in bulk.
+
+Both kinds of update hold the lock on the RatingReplay row for their whole
+transaction, so a replay never misses a match rated while it ran, nor
+overwrites its rating.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_table_version
+from .models import Athlete, AthleteRating, CategoryAthlete, Match, RatingChange, RatingReplay
+
+K = 20
+K_PROVISIONAL = 40
+PROVISIONAL_MATCHES = 30
+
+# Upper limits of the weight classes in kilograms; heavier athletes are '+90'
+WEIGHT_CLASSES = (50, 55, 60, 65, 70, 75, 80, 85, 90)
+
+# Competitions by date, then bracket rounds, then the schedule
+CHRONOLOGICAL_ORDER = (
+    F('category__competition__start_date').asc(nulls_last=True),
+    'category__competition_id',
+    F('round').asc(nulls_first=True),
+    F('slot').asc(nulls_last=True),
+    'id',
+)
+MATCH_FIELDS = ('id', 'category_id', 'category__gender', 'red_corner_id', 'blue_corner_id', 'winner_id')
+RATING_FIELDS = ['rating', 'matches', 'wins', 'gender', 'weight_class', 'grade', 'modified']
+
+
+def weight_class(weight):
+    for limit in WEIGHT_CLASSES:
+        if weight <= limit:
+            return f'-{limit}'
+    return f'+{WEIGHT_CLASSES[-1]}'
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def k_factor(rating):
+    return K_PROVISIONAL if rating.matches < PROVISIONAL_MATCHES else K
+
+
+def play(ratings, match, weights):
+    """
+    Apply one decided match to `ratings` (athlete id -> AthleteRating, new
+    athletes are added) and return the RatingChange describing it.
+    """
+    red, blue = (
+        ratings.setdefault(athlete_id, AthleteRating(athlete_id=athlete_id))
+        for athlete_id in (match['red_corner_id'], match['blue_corner_id'])
+    )
+    change = RatingChange(
+        match_id=match['id'], winner_id=match['winner_id'], red_before=red.rating, blue_before=blue.rating,
+    )
+    red_score = 1.0 if match['winner_id'] == red.athlete_id else 0.0
+    red_expected = expected_score(red.rating, blue.rating)
+    red_k, blue_k = k_factor(red), k_factor(blue)
+    red.rating += red_k * (red_score - red_expected)
+    blue.rating += blue_k * (red_expected - red_score)
+    red.wins += red_score == 1.0
+    blue.wins += red_score == 0.0
+    for rating in (red, blue):
+        rating.matches += 1
+        if match['category__gender'] != 'mixt':
+            rating.gender = match['category__gender']
+        weight = weights.get((match['category_id'], rating.athlete_id))
+        if weight is not None:
+            rating.weight_class = weight_class(weight)
+    change.red_after, change.blue_after = red.rating, blue.rating
+    return change
+
+
+def playable(match):
+    # A winner who is not in either corner cannot be rated
+    return match['winner_id'] in (match['red_corner_id'], match['blue_corner_id'])
+
+
+def lock_ratings(**fields):
+    """
+    Take the ratings lock until the current transaction ends, by writing
+    `fields` (or nothing new) to the RatingReplay row.
+    """
+    if not RatingReplay.objects.filter(pk=1).update(**(fields or {'id': F('id')})):
+        RatingReplay.objects.create(pk=1, **fields)  # The row is created by a migration, but not after a flush
+
+
+def save_ratings(ratings, changes):
+    """
+    Upsert the ratings with their current grades, and the rating changes.
+    """
+    athlete_ids = list(ratings)
+    for start in range(0, len(athlete_ids), 500):  # Chunked to stay under the query parameter limit
+        chunk = athlete_ids[start:start + 500]
+        for athlete_id, grade_id in Athlete.objects.filter(pk__in=chunk).values_list('pk', 'current_grade_id'):
+            ratings[athlete_id].grade_id = grade_id
+    AthleteRating.objects.bulk_create(
+        ratings.values(), update_conflicts=True, unique_fields=['athlete'], update_fields=RATING_FIELDS, batch_size=500,
+    )
+    RatingChange.objects.bulk_create(
+        changes, update_conflicts=True, unique_fields=['match'],
+        update_fields=['winner', 'red_before', 'red_after', 'blue_before', 'blue_after'], batch_size=500,
+    )
+    # bulk_create sends no post_save, so bump the table versions here
+    transaction.on_commit(lambda: bump_table_version(AthleteRating))
+    transaction.on_commit(lambda: bump_table_version(RatingChange))
+
+
+def unrated_matches(match_ids):
+    """
+    Read the given matches in chronological order. Return those decided but
+    not rated yet, and whether any was rated for a winner it no longer has.
+    """
+    matches = list(
+        Match.objects.filter(pk__in=match_ids).order_by(*CHRONOLOGICAL_ORDER)
+        .values(*MATCH_FIELDS, 'rating_change__winner_id')
+    )
+    corrected = any(match['rating_change__winner_id'] not in (None, match['winner_id']) for match in matches)
+    return [match for match in matches if match['rating_change__winner_id'] is None and playable(match)], corrected
+
+
+def rate_matches(match_ids):
+    """
+    Apply the rating updates of the given matches that were decided since
+    they were last rated, with a fixed number of queries. A match whose
+    rated winner changed schedules a full recompute instead.
+
+    Called once the match writes are committed, so a rolled back result is
+    never rated and the match transaction is not made any longer. The
+    ratings lock is only taken when there is something to rate.
+    """
+    matches, corrected = unrated_matches(match_ids)
+    if not (matches or corrected):
+        return
+    with transaction.atomic():
+        lock_ratings()
+        matches, corrected = unrated_matches(match_ids)  # Again under the lock, another call may have rated them
+        if corrected:
+            schedule_recompute()
+            return
+        if not matches:
+            return
+
+        athlete_ids = {match[corner] for match in matches for corner in ('red_corner_id', 'blue_corner_id')}
+        ratings = {
+            rating.athlete_id: rating
+            for rating in AthleteRating.objects.select_for_update().filter(athlete_id__in=athlete_ids)
+        }
+        weights = {
+            (category_id, athlete_id): weight
+            for category_id, athlete_id, weight in CategoryAthlete.objects.filter(
+                category_id__in={match['category_id'] for match in matches}, athlete_id__in=athlete_ids,
+                weight__isnull=False,
+            ).values_list('category_id', 'athlete_id', 'weight')
+        }
+        changes = [play(ratings, match, weights) for match in matches]
+        save_ratings(ratings, changes)
+
+
+def recompute_ratings():
+    """
+    Replay every decided match in chronological order and rewrite all
+    ratings and rating changes. Returns the number of matches rated.
+
+    Elo is sequential (each match starts from the ratings the previous ones
+    left), so the replay is one pass over the history held in memory,
+    between one read of the matches and bulk writes of the results, both
+    under the ratings lock.
+    """
+    with transaction.atomic():
+        # Clears the request: a correction made meanwhile waits for the lock, then requests another replay
+        lock_ratings(requested=None, replayed=timezone.now())
+        matches = Match.objects.filter(winner__isnull=False).order_by(*CHRONOLOGICAL_ORDER).values(*MATCH_FIELDS)
+        weights = {
+            (category_id, athlete_id): weight
+            for category_id, athlete_id, weight in CategoryAthlete.objects.filter(
+                weight__isnull=False, category__type='fight',
+            ).values_list('category_id', 'athlete_id', 'weight')
+        }
+        ratings = {}
+        changes = [play(ratings, match, weights) for match in matches if playable(match)]
+
+        save_ratings(ratings, changes)
+        rated_matches = {change.match_id for change in changes}
+        stale_changes = set(RatingChange.objects.values_list('match_id', flat=True)) - rated_matches
+        RatingChange.objects.filter(match_id__in=stale_changes).delete()
+        stale_ratings = set(AthleteRating.objects.values_list('athlete_id', flat=True)) - set(ratings)
+        AthleteRating.objects.filter(athlete_id__in=stale_ratings).delete()
+    return len(changes)
+
+
+def schedule_recompute():
+    """
+    Request a replay of the ratings in the current transaction, so the
+    request commits or rolls back with the correction that needs it.
+    However many corrections request one, the next replay serves them all.
+    """
+    lock_ratings(requested=timezone.now())
+
+
+def recompute_pending_ratings():
+    """
+    Replay the ratings if a replay was requested. Returns the number of
+    matches rated, or None if the ratings were up to date.
+    """
+    if not RatingReplay.objects.filter(pk=1, requested__isnull=False).exists():
+        return None
+    return recompute_ratings()
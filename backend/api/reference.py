@@ -0,0 +1,53 @@
+"""
+Per-process cache of the small lookup tables (cities, grades, titles,
+federation roles, groups).
+
+Each worker keeps the rows in memory and reloads them only when the table
+version in the shared cache moves (see api.cache), so list endpoints and
+serializer validation resolve these rows without touching the database.
+"""
+from .cache import get_table_versions
+from .metrics import record_cache
+from .models import Category, City, FederationRole, Grade, Group, Title
+
+
+class ReferenceTable:
+    """
+    A lookup table cached in process memory and keyed by its table version.
+    """
+
+    def __init__(self, get_queryset, depends_on=()):
+        self.get_queryset = get_queryset
+        self.model = get_queryset().model
+        self.depends_on = tuple(depends_on)
+        self._state = (None, {})
+
+    def load(self):
+        """
+        Return `(version, rows)` where rows maps primary keys to instances,
+        in queryset order. Rows are shared between requests: treat them as
+        read-only.
+        """
+        version = get_table_versions(self.model, *self.depends_on)
+        state = self._state
+        record_cache(f'reference:{self.model._meta.model_name}', state[0] == version)
+        if state[0] != version:
+            state = (version, {obj.pk: obj for obj in self.get_queryset()})
+            self._state = state  # Swapped atomically, no lock needed
+        return state
+
+    def rows(self):
+        return self.load()[1]
+
+    def get(self, pk):
+        return self.rows().get(pk)
+
+
+cities = ReferenceTable(lambda: City.objects.order_by('name'))
+grades = ReferenceTable(lambda: Grade.objects.order_by('id'))
+titles = ReferenceTable(lambda: Title.objects.order_by('id'))
+federation_roles = ReferenceTable(lambda: FederationRole.objects.order_by('id'))
+groups = ReferenceTable(
+    lambda: Group.objects.select_related('competition').prefetch_related('categories').order_by('id'),
+    depends_on=(Category,),
+)
@@ -0,0 +1,135 @@
+"""
+Multi-mat match scheduler.
+
+A competition runs on `Competition.mat_count` mats in consecutive time slots.
+Every pending match (no winner yet) gets a `(mat, slot)` pair such that no
+mat holds two matches in a slot, and an athlete has at least `rest` free slots
+between two matches (so is never on two mats at once). Matches are placed
+greedily, earliest slot first, in bracket round order, so a round is fought
+before the next one wherever the rest intervals allow it.
+
+Scheduling is incremental by default: matches that already have a slot keep
+it and only the unscheduled ones (typically matches a bracket just created
+after a result) are fitted around them. Planning is one read and a handful
+of UPDATEs (one per mat and per slot), whatever the number of matches.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_table_version
+from .live import publish_matches
+from .models import ChangeLogEntry, Match
+
+DEFAULT_REST_SLOTS = 1
+
+
+class Timetable:
+    """
+    Mat occupancy per slot and the slots taken by each athlete.
+    """
+
+    def __init__(self, mat_count, rest):
+        if mat_count < 1:
+            # With no mat every slot is full and earliest_fit() would never return
+            raise ValueError("A competition needs at least one mat to be scheduled.")
+        self.mat_count = mat_count
+        self.rest = rest
+        self.mats = defaultdict(set)  # slot -> mats in use
+        self.athletes = defaultdict(set)  # athlete id -> slots
+        self.first_open = 0
+
+    def book(self, match, mat, slot):
+        self.mats[slot].add(mat)
+        self.athletes[match.red_corner_id].add(slot)
+        self.athletes[match.blue_corner_id].add(slot)
+
+    def athlete_free(self, athlete_id, slot):
+        taken = self.athletes[athlete_id]
+        return not any(other in taken for other in range(slot - self.rest, slot + self.rest + 1))
+
+    def earliest_fit(self, match, from_slot):
+        """
+        Return the first `(mat, slot)` at or after `from_slot` where a mat is
+        free and both athletes are rested.
+        """
+        # Slots before the first one with a free mat are full for every match
+        while len(self.mats[self.first_open]) >= self.mat_count:
+            self.first_open += 1
+        slot = max(from_slot, self.first_open)
+        while not self.fits(match, slot):
+            slot += 1
+        mat = next(mat for mat in range(1, self.mat_count + 1) if mat not in self.mats[slot])
+        return mat, slot
+
+    def fits(self, match, slot):
+        return (
+            len(self.mats[slot]) < self.mat_count
+            and self.athlete_free(match.red_corner_id, slot)
+            and self.athlete_free(match.blue_corner_id, slot)
+        )
+
+
+def schedule_competition(competition, rest=DEFAULT_REST_SLOTS, replan=False):
+    """
+    Assign a mat and a time slot to every pending match of a competition and
+    return the number of matches whose placement changed. Raises ValueError
+    for a competition without mats.
+
+    Finished matches keep their slots, and new placements start after the
+    last finished slot. With `replan`, every pending match is placed again;
+    otherwise only the unscheduled ones are.
+    """
+    matches = list(
+        Match.objects.filter(category__competition=competition)
+        .only('id', 'category_id', 'red_corner_id', 'blue_corner_id', 'winner_id', 'round', 'bracket_position', 'mat', 'slot')
+    )
+    finished_slots = [match.slot for match in matches if match.winner_id is not None and match.slot is not None]
+    from_slot = max(finished_slots) + 1 if finished_slots else 0
+
+    timetable = Timetable(competition.mat_count, rest)
+    pending = []
+    for match in matches:
+        if match.slot is None and match.winner_id is not None:
+            continue  # Decided without ever being scheduled
+        keep = match.slot is not None and (match.winner_id is not None or (not replan and match.slot >= from_slot))
+        if keep:
+            timetable.book(match, match.mat, match.slot)
+        else:
+            pending.append(match)
+
+    pending.sort(key=lambda match: (match.round or 0, match.category_id, match.bracket_position or 0, match.id))
+    changed = []
+    for match in pending:
+        mat, slot = timetable.earliest_fit(match, from_slot)
+        timetable.book(match, mat, slot)
+        if (match.mat, match.slot) != (mat, slot):
+            match.mat, match.slot = mat, slot
+            changed.append(match)
+
+    if changed:
+        save_placements(changed)
+    return len(changed)
+
+
+def save_placements(matches):
+    """
+    Write new placements with one UPDATE per mat and one per slot. A full plan
+    has far fewer mats and slots than matches, and plain UPDATEs are much
+    cheaper to build than bulk_update's per-row CASE expressions.
+    """
+    by_mat, by_slot = defaultdict(list), defaultdict(list)
+    for match in matches:
+        by_mat[match.mat].append(match.pk)
+        by_slot[match.slot].append(match.pk)
+    now = timezone.now()  # update() skips auto_now, and modified feeds the conditional GETs
+    with transaction.atomic():
+        for mat, ids in by_mat.items():
+            Match.objects.filter(pk__in=ids).update(mat=mat, modified=now)
+        for slot, ids in by_slot.items():
+            Match.objects.filter(pk__in=ids).update(slot=slot, modified=now)
+        # update() sends no post_save, so bump the table version, log and publish here
+        transaction.on_commit(lambda: bump_table_version(Match))
+        ChangeLogEntry.record(Match, [match.pk for match in matches])
+        publish_matches(match.pk for match in matches)
@@ -1,41 +1,160 @@
+from django.db import transaction
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, Q
 from rest_framework import serializers
 from .models import *
+from . import live, reference
+from .cache import bump_table_version
+
+
+class ReferencePrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field resolved from a cached reference table (see api.reference)
+    instead of one query per validated field.
+    """
+
+    def __init__(self, reference_table=None, **kwargs):
+        self.reference_table = reference_table
+        if not kwargs.get('read_only'):
+            kwargs.setdefault('queryset', reference_table.model._default_manager.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = self.reference_table.get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+class SparseFieldsMixin:
+    """
+    `?fields=` and `?expand=` support for model serializers.
+
+    The view passes the requested names as sets in the serializer context
+    (see context_from_query): `fields` drops every other field, and `expand`
+    nests the listed relations (from `expandable_fields`) instead of returning
+    their ids. Without `expand`, the relations in `default_expand` are nested.
+    Writes never use the context, so input always takes ids.
+
+    optimize_queryset() turns the same selection into only(),
+    select_related() and prefetch_related(), so unrequested columns and
+    relations are never read.
+    """
+    expandable_fields = {}  # Field name -> serializer of the nested object
+    default_expand = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+    @property
+    def expanded(self):
+        expand = self.context.get('expand')
+        return (set(self.default_expand) if expand is None else expand) & set(self.fields)
+
+    @staticmethod
+    def requested_names(query_params, key):
+        value = query_params.get(key)
+        if value is None:
+            return None
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    @classmethod
+    def context_from_query(cls, query_params):
+        """
+        Read `fields` and `expand` from the query string, rejecting unknown names.
+        """
+        fields = cls.requested_names(query_params, 'fields')
+        expand = cls.requested_names(query_params, 'expand')
+        errors = {}
+        unknown = fields - set(cls().fields) if fields else set()
+        if unknown:
+            errors['fields'] = [f"Unknown field: {name}." for name in sorted(unknown)]
+        unknown = expand - set(cls.expandable_fields) if expand else set()
+        if unknown:
+            errors['expand'] = [f"Cannot expand: {name}." for name in sorted(unknown)]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return {'fields': fields, 'expand': expand}
+
+    @classmethod
+    def expanded_models(cls, query_params):
+        """
+        Models of the relations nested by a query string, unknown names ignored.
+        """
+        expand = cls.requested_names(query_params, 'expand')
+        names = set(cls.default_expand) if expand is None else expand
+        return tuple(
+            cls.expandable_fields[name].Meta.model for name in sorted(names) if name in cls.expandable_fields
+        )
+
+    def optimize_queryset(self, queryset):
+        model = self.Meta.model
+        columns, joins, prefetches = [], [], []
+        for name, field in self.fields.items():
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return queryset  # Computed field: keep every column
+            nested = self.expandable_fields[name] if name in self.expanded else None
+            if model_field.many_to_many:
+                related = model_field.related_model.objects.only(*(nested.Meta.fields if nested else ['pk']))
+                prefetches.append(Prefetch(model_field.name, queryset=related))
+                continue
+            columns.append(model_field.name)
+            if nested:
+                joins.append(model_field.name)
+                columns += [f'{model_field.name}__{column}' for column in nested.Meta.fields]
+        return queryset.select_related(*joins).prefetch_related(*prefetches).only(*columns)
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        for name in self.expanded:
+            nested = self.expandable_fields[name]
+            related = getattr(instance, self.fields[name].source)
+            if related is None:
+                representation[name] = None
+            elif hasattr(related, 'all'):
+                representation[name] = nested(related.all(), many=True).data
+            else:
+                representation[name] = nested(related).data
+        return representation
 
 class CitySerializer(serializers.ModelSerializer):
     class Meta:
         model = City
         fields = ['id', 'name']
 
-class ClubSerializer(serializers.ModelSerializer):
-    city = serializers.PrimaryKeyRelatedField(queryset=City.objects.all())  # Accept city ID only
+class ClubSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Club
+        fields = ['id', 'name']
+
+class CoachSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Athlete
+        fields = ['id', 'first_name', 'last_name']
+
+class ClubSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    city = ReferencePrimaryKeyRelatedField(reference.cities)  # Accept city ID only
     coaches = serializers.PrimaryKeyRelatedField(many=True, required=False, queryset=Athlete.objects.filter(is_coach=True))  # Include coaches
 
+    # The full city object and coach details are returned unless ?expand= says otherwise
+    expandable_fields = {'city': CitySerializer, 'coaches': CoachSerializer}
+    default_expand = ('city', 'coaches')
+
     class Meta:
         model = Club
         fields = ['id', 'name', 'address', 'mobile_number', 'website', 'coaches', 'city', 'logo']
 
-    def to_representation(self, instance):
-        """Customize the output to include the full city object and coaches."""
-        representation = super().to_representation(instance)
-        if instance.city:
-            representation['city'] = {
-                'id': instance.city.id,
-                'name': instance.city.name
-            }
-        else:
-            representation['city'] = None  # Handle cases where city is None
-
-        # Include full coach details
-        representation['coaches'] = [
-            {
-                'id': coach.id,
-                'first_name': coach.first_name,
-                'last_name': coach.last_name
-            }
-            for coach in instance.coaches.all()
-        ]
-        return representation
-
 class CompetitionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Competition
@@ -43,24 +162,6 @@ class CompetitionSerializer(serializers.ModelSerializer):
         depth = 1  # This will include the related clubs in the output
 
 
-class AthleteSerializer(serializers.ModelSerializer):
-    club = serializers.PrimaryKeyRelatedField(queryset=Club.objects.all(), allow_null=True)  # Accept club ID only
-    city = serializers.PrimaryKeyRelatedField(queryset=City.objects.all(), allow_null=True)  # Accept city ID only
-    current_grade = serializers.PrimaryKeyRelatedField(queryset=Grade.objects.all(), allow_null=True)  # Accept grade ID only
-    federation_role = serializers.PrimaryKeyRelatedField(queryset=FederationRole.objects.all(), allow_null=True)  # Accept role ID only
-    title = serializers.PrimaryKeyRelatedField(queryset=Title.objects.all(), allow_null=True)  # Accept title ID only
-
-
-    class Meta:
-        model = Athlete
-        fields = '__all__'
-        depth = 1  # This will include related objects in the output
-        extra_kwargs = {
-            'first_name': {'required': True},
-            'last_name': {'required': True},
-            'date_of_birth': {'required': True},
-        }
-
 class TitleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Title
@@ -76,6 +177,31 @@ class GradeSerializer(serializers.ModelSerializer):
         model = Grade
         fields = ['id', 'name']
 
+class AthleteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    club = serializers.PrimaryKeyRelatedField(queryset=Club.objects.all(), allow_null=True)  # Accept club ID only
+    city = ReferencePrimaryKeyRelatedField(reference.cities, allow_null=True)  # Accept city ID only
+    current_grade = ReferencePrimaryKeyRelatedField(reference.grades, allow_null=True)  # Accept grade ID only
+    federation_role = ReferencePrimaryKeyRelatedField(reference.federation_roles, allow_null=True)  # Accept role ID only
+    title = ReferencePrimaryKeyRelatedField(reference.titles, allow_null=True)  # Accept title ID only
+
+    expandable_fields = {
+        'club': ClubSummarySerializer,
+        'city': CitySerializer,
+        'current_grade': GradeSerializer,
+        'federation_role': FederationRoleSerializer,
+        'title': TitleSerializer,
+    }
+
+    class Meta:
+        model = Athlete
+        fields = '__all__'
+        depth = 1  # This will include related objects in the output
+        extra_kwargs = {
+            'first_name': {'required': True},
+            'last_name': {'required': True},
+            'date_of_birth': {'required': True},
+        }
+
 class GradeHistorySerializer(serializers.ModelSerializer):
     athlete = serializers.PrimaryKeyRelatedField(queryset=Athlete.objects.all())  # Accept athlete ID only
     grade = serializers.PrimaryKeyRelatedField(queryset=Grade.objects.all())  # Accept grade ID only
@@ -157,8 +283,12 @@ class MatchSerializer(serializers.ModelSerializer):
             'referees',
             'winner',
             'winner_name',  # Dynamically determine the winner name
+            'round',
+            'bracket_position',
+            'mat',
+            'slot',
         ]
-        read_only_fields = ['name', 'category_name', 'red_corner_full_name', 'red_corner_club_name', 'blue_corner_full_name', 'blue_corner_club_name']
+        read_only_fields = ['name', 'category_name', 'red_corner_full_name', 'red_corner_club_name', 'blue_corner_full_name', 'blue_corner_club_name', 'round', 'bracket_position', 'mat', 'slot']
 
     def get_red_corner_full_name(self, obj):
         """Get the full name of the red corner athlete."""
@@ -174,9 +304,11 @@ class MatchSerializer(serializers.ModelSerializer):
 
     def get_winner_name(self, obj):
         """Determine the winner name dynamically."""
-        if obj.winner == obj.red_corner:
+        if obj.winner_id is None:
+            return None
+        if obj.winner_id == obj.red_corner_id:
             return self.get_red_corner_full_name(obj)
-        elif obj.winner == obj.blue_corner:
+        elif obj.winner_id == obj.blue_corner_id:
             return self.get_blue_corner_full_name(obj)
         return None  # No winner
 
@@ -263,4 +395,518 @@ class GroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = Group
         fields = ['id', 'name', 'competition', 'categories']
-        read_only_fields = ['id']
\ No newline at end of file
+        read_only_fields = ['id']
+
+class CompetitionAthleteSerializer(serializers.ModelSerializer):
+    """Athlete entry of the competition document, with the club name inlined."""
+    club_name = serializers.CharField(source='club.name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = Athlete
+        fields = ['id', 'first_name', 'last_name', 'club', 'club_name']
+
+
+class CompetitionCategoryAthleteSerializer(serializers.ModelSerializer):
+    athlete = CompetitionAthleteSerializer(read_only=True)
+
+    class Meta:
+        model = CategoryAthlete
+        fields = ['athlete', 'weight']
+
+
+class CompetitionTeamSerializer(serializers.ModelSerializer):
+    members = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Team
+        fields = ['id', 'name', 'members']
+
+    def get_members(self, obj):
+        return [CompetitionAthleteSerializer(member.athlete).data for member in obj.members.all()]
+
+
+class CompetitionMatchSerializer(MatchSerializer):
+    """Match entry of the competition document; the category is implied by the parent."""
+
+    class Meta(MatchSerializer.Meta):
+        fields = [field for field in MatchSerializer.Meta.fields if field not in ('category', 'category_name')]
+
+
+class CompetitionCategorySerializer(serializers.ModelSerializer):
+    group_name = serializers.CharField(source='group.name', read_only=True, allow_null=True)
+    enrolled_athletes = CompetitionCategoryAthleteSerializer(many=True, read_only=True)
+    teams = CompetitionTeamSerializer(many=True, read_only=True)
+    matches = CompetitionMatchSerializer(many=True, read_only=True)
+    placements = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'type', 'gender', 'group', 'group_name', 'enrolled_athletes', 'teams', 'matches', 'placements']
+
+    def get_placements(self, obj):
+        """Return the awarded athletes or teams keyed by place."""
+        if obj.type == 'teams':
+            awarded = [obj.first_place_team, obj.second_place_team, obj.third_place_team]
+            return {
+                place: {'id': team.id, 'name': team.name} if team else None
+                for place, team in zip(('first', 'second', 'third'), awarded)
+            }
+        awarded = [obj.first_place, obj.second_place, obj.third_place]
+        return {
+            place: {'id': athlete.id, 'name': f"{athlete.first_name} {athlete.last_name}"} if athlete else None
+            for place, athlete in zip(('first', 'second', 'third'), awarded)
+        }
+
+
+class CompetitionFullSerializer(serializers.ModelSerializer):
+    """
+    Denormalized competition document: groups, categories, enrolled athletes,
+    teams, matches and placements in one payload.
+    """
+    groups = serializers.SerializerMethodField()
+    categories = CompetitionCategorySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Competition
+        fields = ['id', 'name', 'place', 'start_date', 'end_date', 'groups', 'categories']
+
+    def get_groups(self, obj):
+        return [{'id': group.id, 'name': group.name} for group in obj.groups.all()]
+
+
+def placement(category, athlete=None, team=None):
+    """Return the place (1-3) awarded in a category, or None."""
+    if team is not None:
+        awarded = [category.first_place_team_id, category.second_place_team_id, category.third_place_team_id]
+        key = team.id
+    else:
+        awarded = [category.first_place_id, category.second_place_id, category.third_place_id]
+        key = athlete.id
+    return awarded.index(key) + 1 if key in awarded else None
+
+
+class AthleteProfileSerializer(AthleteSerializer):
+    """
+    Everything the athlete profile page shows, built from a bounded set of
+    queries (see AthleteViewSet.get_profile_queryset).
+    """
+    club_name = serializers.CharField(source='club.name', read_only=True, allow_null=True)
+    city_name = serializers.CharField(source='city.name', read_only=True, allow_null=True)
+    current_grade_name = serializers.CharField(source='current_grade.name', read_only=True, allow_null=True)
+    federation_role_name = serializers.CharField(source='federation_role.name', read_only=True, allow_null=True)
+    title_name = serializers.CharField(source='title.name', read_only=True, allow_null=True)
+    grade_history = serializers.SerializerMethodField()
+    annual_visas = AnnualVisaSerializer(many=True, read_only=True)
+    medical_visas = MedicalVisaSerializer(many=True, read_only=True)
+    training_seminars = serializers.SerializerMethodField()
+    results = serializers.SerializerMethodField()
+    matches = serializers.SerializerMethodField()
+
+    class Meta(AthleteSerializer.Meta):
+        fields = '__all__'
+
+    def get_grade_history(self, obj):
+        return [
+            {
+                'id': entry.id,
+                'grade': entry.grade_id,
+                'grade_name': entry.grade.name,
+                'level': entry.level,
+                'obtained_date': entry.obtained_date,
+                'exam_date': entry.exam_date,
+                'exam_place': entry.exam_place,
+                'technical_director': entry.technical_director,
+                'president': entry.president,
+            }
+            for entry in obj.grade_history.all()
+        ]
+
+    def get_training_seminars(self, obj):
+        return [
+            {
+                'id': seminar.id,
+                'name': seminar.name,
+                'start_date': seminar.start_date,
+                'end_date': seminar.end_date,
+                'place': seminar.place,
+            }
+            for seminar in obj.training_seminars.all()
+        ]
+
+    def get_results(self, obj):
+        """Solo, fight and team results with the place obtained."""
+        results = {'solo': [], 'fight': [], 'teams': []}
+        for enrollment in obj.categoryathlete_set.all():
+            category = enrollment.category
+            if category.type not in ('solo', 'fight'):
+                continue
+            results[category.type].append({
+                'category': category.id,
+                'category_name': category.name,
+                'competition': category.competition_id,
+                'competition_name': category.competition.name,
+                'weight': enrollment.weight,
+                'place': placement(category, athlete=obj),
+            })
+        for membership in obj.team_members.all():
+            team = membership.team
+            for category in team.categories.all():
+                results['teams'].append({
+                    'team': team.id,
+                    'team_name': team.name,
+                    'category': category.id,
+                    'category_name': category.name,
+                    'competition': category.competition_id,
+                    'competition_name': category.competition.name,
+                    'place': placement(category, team=team),
+                })
+        return results
+
+    def get_matches(self, obj):
+        """Matches with the opponent's name and club and the outcome for this athlete."""
+        matches = Match.objects.filter(
+            Q(red_corner=obj) | Q(blue_corner=obj)
+        ).select_related(
+            'category__competition', 'red_corner__club', 'blue_corner__club'
+        ).order_by('id')
+        rows = []
+        for match in matches:
+            is_red = match.red_corner_id == obj.id
+            opponent = match.blue_corner if is_red else match.red_corner
+            rows.append({
+                'id': match.id,
+                'category': match.category_id,
+                'category_name': match.category.name,
+                'competition': match.category.competition_id,
+                'competition_name': match.category.competition.name,
+                'match_type': match.match_type,
+                'corner': 'red' if is_red else 'blue',
+                'opponent': opponent.id,
+                'opponent_name': f"{opponent.first_name} {opponent.last_name}",
+                'opponent_club': opponent.club.name if opponent.club else None,
+                'winner': match.winner_id,
+                'won': None if match.winner_id is None else match.winner_id == obj.id,
+            })
+        return rows
+
+
+class CategoryAthleteEnrollmentListSerializer(serializers.ListSerializer):
+    """
+    Validate a batch of enrollments with a fixed number of queries and write
+    it in one transaction. Errors are returned per row, in payload order.
+    """
+
+    def to_internal_value(self, data):
+        rows = super().to_internal_value(data)
+        errors = self.find_conflicts(rows)
+        if errors:
+            raise serializers.ValidationError([errors.get(index, {}) for index in range(len(rows))])
+        return rows
+
+    def find_conflicts(self, rows):
+        category_ids = {row['category'] for row in rows}
+        athlete_ids = {row['athlete'] for row in rows}
+        category_types = dict(Category.objects.filter(pk__in=category_ids).values_list('id', 'type'))
+        known_athletes = set(Athlete.objects.filter(pk__in=athlete_ids).values_list('id', flat=True))
+        enrolled = set(
+            CategoryAthlete.objects.filter(category_id__in=category_ids, athlete_id__in=athlete_ids)
+            .values_list('category_id', 'athlete_id')
+        )
+
+        errors = {}
+        seen = set()
+        for index, row in enumerate(rows):
+            pair = (row['category'], row['athlete'])
+            row_errors = {}
+            if row['category'] not in category_types:
+                row_errors['category'] = ['Category does not exist.']
+            elif category_types[row['category']] == 'teams':
+                row_errors['category'] = ['Athletes cannot be enrolled individually in a teams category.']
+            if row['athlete'] not in known_athletes:
+                row_errors['athlete'] = ['Athlete does not exist.']
+            if pair in enrolled:
+                row_errors['non_field_errors'] = ['Athlete is already enrolled in this category.']
+            elif pair in seen:
+                row_errors['non_field_errors'] = ['Duplicate enrollment in this request.']
+            seen.add(pair)
+            if row_errors:
+                errors[index] = row_errors
+        return errors
+
+    def create(self, validated_data):
+        enrollments = [
+            CategoryAthlete(category_id=row['category'], athlete_id=row['athlete'], weight=row.get('weight'))
+            for row in validated_data
+        ]
+        with transaction.atomic():
+            CategoryAthlete.objects.bulk_create(enrollments, batch_size=500)
+            # bulk_create sends no post_save, so bump the table version and log the rows here
+            transaction.on_commit(lambda: bump_table_version(CategoryAthlete))
+            ChangeLogEntry.record(CategoryAthlete, [enrollment.pk for enrollment in enrollments])
+        return enrollments
+
+
+class CategoryAthleteEnrollmentSerializer(serializers.Serializer):
+    """
+    One row of a bulk enrollment: ids only, so validating a row costs no query.
+    """
+    category = serializers.IntegerField(min_value=1)
+    athlete = serializers.IntegerField(min_value=1)
+    weight = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, required=False, allow_null=True)  # Weigh-in in kilograms
+
+    class Meta:
+        list_serializer_class = CategoryAthleteEnrollmentListSerializer
+
+    def to_representation(self, instance):
+        return {'category': instance.category_id, 'athlete': instance.athlete_id, 'weight': instance.weight}
+
+
+class CategoryStandingSerializer(serializers.Serializer):
+    """
+    One row of Category.standings(): the competitor, its score aggregates and tie information.
+    """
+    rank = serializers.IntegerField()
+    athlete = serializers.SerializerMethodField()
+    team = serializers.SerializerMethodField()
+    judges = serializers.IntegerField()
+    total = serializers.IntegerField()
+    average = serializers.FloatField()
+    trimmed_mean = serializers.FloatField()
+    highest = serializers.IntegerField()
+    lowest = serializers.IntegerField()
+    tied = serializers.BooleanField()
+    tie_break = serializers.CharField(allow_null=True)
+
+    def get_athlete(self, row):
+        if 'athlete_id' not in row:
+            return None
+        return {'id': row['athlete_id'], 'first_name': row['athlete__first_name'], 'last_name': row['athlete__last_name']}
+
+    def get_team(self, row):
+        if 'team_id' not in row:
+            return None
+        return {'id': row['team_id'], 'name': row['team__name']}
+
+
+class MedalTableRowSerializer(serializers.Serializer):
+    """
+    One row of Placement.medal_table(): a club with its medals, points and rank.
+    """
+    rank = serializers.IntegerField()
+    club = serializers.SerializerMethodField()
+    gold = serializers.IntegerField()
+    silver = serializers.IntegerField()
+    bronze = serializers.IntegerField()
+    total = serializers.IntegerField()
+    points = serializers.IntegerField()
+
+    def get_club(self, row):
+        return {'id': row['club_id'], 'name': row['club__name']}
+
+
+class PlacementSerializer(serializers.ModelSerializer):
+    competition_name = serializers.CharField(source='competition.name', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    team_name = serializers.CharField(source='team.name', read_only=True, allow_null=True)
+
+    class Meta:
+        model = Placement
+        fields = [
+            'id', 'competition', 'competition_name', 'category', 'category_name', 'season', 'place',
+            'athlete', 'team', 'team_name', 'club',
+        ]
+
+
+class ClubPlacementSerializer(PlacementSerializer):
+    athlete_name = serializers.SerializerMethodField()
+
+    class Meta(PlacementSerializer.Meta):
+        fields = PlacementSerializer.Meta.fields + ['athlete_name']
+
+    def get_athlete_name(self, obj):
+        return f"{obj.athlete.first_name} {obj.athlete.last_name}" if obj.athlete else None
+
+
+class ClubStatsSerializer(serializers.ModelSerializer):
+    """
+    A club with the athlete and annual visa counts annotated by ClubViewSet.stats.
+    """
+    athlete_count = serializers.IntegerField()
+    valid_visa_count = serializers.IntegerField()
+    expired_visa_count = serializers.IntegerField()
+
+    class Meta:
+        model = Club
+        fields = ['id', 'name', 'athlete_count', 'valid_visa_count', 'expired_visa_count']
+
+
+class RatingLeaderboardSerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='athlete.first_name', read_only=True)
+    last_name = serializers.CharField(source='athlete.last_name', read_only=True)
+    club_name = serializers.CharField(source='athlete.club.name', read_only=True, allow_null=True)
+    grade_name = serializers.CharField(source='grade.name', read_only=True, allow_null=True)
+    rating = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AthleteRating
+        fields = [
+            'athlete', 'first_name', 'last_name', 'club_name', 'rating', 'matches', 'wins',
+            'gender', 'weight_class', 'grade', 'grade_name',
+        ]
+
+    def get_rating(self, obj):
+        return round(obj.rating, 1)
+
+
+class RefereeScoreRowSerializer(serializers.Serializer):
+    match = serializers.IntegerField(min_value=1)
+    referee = serializers.IntegerField(min_value=1)
+    red_corner_score = serializers.IntegerField(default=0)
+    blue_corner_score = serializers.IntegerField(default=0)
+    winner = serializers.ChoiceField(choices=['red', 'blue'], required=False, allow_null=True, default=None)
+
+
+class AthleteScoreRowSerializer(serializers.Serializer):
+    category = serializers.IntegerField(min_value=1)
+    athlete = serializers.IntegerField(min_value=1)
+    referee = serializers.IntegerField(min_value=1)
+    score = serializers.IntegerField(default=0)
+
+
+class TeamScoreRowSerializer(serializers.Serializer):
+    category = serializers.IntegerField(min_value=1)
+    team = serializers.IntegerField(min_value=1)
+    referee = serializers.IntegerField(min_value=1)
+    score = serializers.IntegerField(default=0)
+
+
+class ScoreBatchSerializer(serializers.Serializer):
+    """
+    A batch of score cards from the judge tablets. Rows are identified by
+    (match, referee) or (category, athlete/team, referee), so sending a card
+    again overwrites it instead of adding a second one.
+
+    Validation runs a fixed number of set-based queries, and saving upserts
+    each kind of score with one bulk statement.
+    """
+    MAX_ROWS = 5000
+
+    referee_scores = RefereeScoreRowSerializer(many=True, required=False, max_length=MAX_ROWS)
+    athlete_scores = AthleteScoreRowSerializer(many=True, required=False, max_length=MAX_ROWS)
+    team_scores = TeamScoreRowSerializer(many=True, required=False, max_length=MAX_ROWS)
+
+    def validate(self, attrs):
+        referee_rows = attrs.get('referee_scores', [])
+        athlete_rows = attrs.get('athlete_scores', [])
+        team_rows = attrs.get('team_scores', [])
+
+        category_ids = {row['category'] for row in athlete_rows + team_rows}
+        referee_ids = {row['referee'] for row in referee_rows + athlete_rows + team_rows}
+        known_matches = set(
+            Match.objects.filter(pk__in={row['match'] for row in referee_rows}).values_list('id', flat=True)
+        ) if referee_rows else set()
+        category_types = dict(
+            Category.objects.filter(pk__in=category_ids).values_list('id', 'type')
+        ) if category_ids else {}
+        referees = set(
+            Athlete.objects.filter(pk__in=referee_ids, is_referee=True).values_list('id', flat=True)
+        ) if referee_ids else set()
+        enrolled_athletes = set(
+            CategoryAthlete.objects.filter(category_id__in=category_ids, athlete_id__in={row['athlete'] for row in athlete_rows})
+            .values_list('category_id', 'athlete_id')
+        ) if athlete_rows else set()
+        enrolled_teams = set(
+            CategoryTeam.objects.filter(category_id__in=category_ids, team_id__in={row['team'] for row in team_rows})
+            .values_list('category_id', 'team_id')
+        ) if team_rows else set()
+
+        def check_referee(row, row_errors):
+            if row['referee'] not in referees:
+                row_errors['referee'] = ['Referee does not exist.']
+
+        def check_category(row, row_errors, teams):
+            category_type = category_types.get(row['category'])
+            if category_type is None:
+                row_errors['category'] = ['Category does not exist.']
+            elif (category_type == 'teams') != teams:
+                row_errors['category'] = ['Team scores belong to teams categories and athlete scores to the others.']
+
+        errors = {}
+        for key, rows in (('referee_scores', referee_rows), ('athlete_scores', athlete_rows), ('team_scores', team_rows)):
+            row_errors_list = []
+            for row in rows:
+                row_errors = {}
+                check_referee(row, row_errors)
+                if key == 'referee_scores':
+                    if row['match'] not in known_matches:
+                        row_errors['match'] = ['Match does not exist.']
+                elif key == 'athlete_scores':
+                    check_category(row, row_errors, teams=False)
+                    if 'category' not in row_errors and (row['category'], row['athlete']) not in enrolled_athletes:
+                        row_errors['athlete'] = ['Athlete is not enrolled in this category.']
+                else:
+                    check_category(row, row_errors, teams=True)
+                    if 'category' not in row_errors and (row['category'], row['team']) not in enrolled_teams:
+                        row_errors['team'] = ['Team is not enrolled in this category.']
+                row_errors_list.append(row_errors)
+            if any(row_errors_list):
+                errors[key] = row_errors_list
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    @staticmethod
+    def last_per_key(rows, *key):
+        # A card sent twice in one batch counts once, the last one wins
+        return list({tuple(row[field] for field in key): row for row in rows}.values())
+
+    def create(self, validated_data):
+        referee_rows = self.last_per_key(validated_data.get('referee_scores', []), 'match', 'referee')
+        athlete_rows = self.last_per_key(validated_data.get('athlete_scores', []), 'category', 'athlete', 'referee')
+        team_rows = self.last_per_key(validated_data.get('team_scores', []), 'category', 'team', 'referee')
+
+        referee_scores = [
+            RefereeScore(
+                match_id=row['match'], referee_id=row['referee'], winner=row['winner'],
+                red_corner_score=row['red_corner_score'], blue_corner_score=row['blue_corner_score'],
+            )
+            for row in referee_rows
+        ]
+        athlete_scores = [
+            CategoryAthleteScore(category_id=row['category'], athlete_id=row['athlete'], referee_id=row['referee'], score=row['score'])
+            for row in athlete_rows
+        ]
+        team_scores = [
+            CategoryTeamScore(category_id=row['category'], team_id=row['team'], referee_id=row['referee'], score=row['score'])
+            for row in team_rows
+        ]
+        with transaction.atomic():
+            RefereeScore.objects.bulk_create(
+                referee_scores, batch_size=500, update_conflicts=True, unique_fields=['match', 'referee'],
+                update_fields=['red_corner_score', 'blue_corner_score', 'winner', 'modified'],
+            )
+            CategoryAthleteScore.objects.bulk_create(
+                athlete_scores, batch_size=500, update_conflicts=True,
+                unique_fields=['category', 'athlete', 'referee'], update_fields=['score', 'modified'],
+            )
+            CategoryTeamScore.objects.bulk_create(
+                team_scores, batch_size=500, update_conflicts=True,
+                unique_fields=['category', 'team', 'referee'], update_fields=['score', 'modified'],
+            )
+            # Winners once per affected match; standings are aggregated on read
+            winners_updated = Match.recompute_winners(match_ids={row['match'] for row in referee_rows}) if referee_rows else 0
+
+            # bulk_create sends no post_save, so bump the table versions, log and publish here
+            written = {RefereeScore: referee_scores, CategoryAthleteScore: athlete_scores, CategoryTeamScore: team_scores}
+            written = {model: scores for model, scores in written.items() if scores}
+            transaction.on_commit(lambda: [bump_table_version(model) for model in written])
+            for model, scores in written.items():
+                ChangeLogEntry.record(model, [score.pk for score in scores])
+            live.publish_scores(row['match'] for row in referee_rows)
+
+        return {
+            'referee_scores': len(referee_rows),
+            'athlete_scores': len(athlete_rows),
+            'team_scores': len(team_rows),
+            'winners_updated': winners_updated,
+        }
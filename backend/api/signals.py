@@ -1,40 +1,191 @@
-from django.db.models.signals import m2m_changed, post_save, pre_delete
+from functools import lru_cache
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import DO_NOTHING, Exists, OuterRef
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from .brackets import advance_winner
+from .cache import VERSIONED_APPS, bump_table_version
+from .metrics import timed_handler
+from .live import publish_categories, publish_matches, publish_scores
+from .ratings import rate_matches, schedule_recompute
+from .scheduling import schedule_competition
 from .models import *
 
+
+@timed_handler
+def bump_api_table_version(sender, **kwargs):
+    """
+    Invalidate cached payloads built from an api or landing table once the write is committed.
+    """
+    transaction.on_commit(lambda: bump_table_version(sender))
+
+
+@receiver(m2m_changed)
+@timed_handler
+def bump_api_m2m_table_version(sender, instance, action, model, **kwargs):
+    """
+    Invalidate cached payloads when a many-to-many relation between api models changes.
+    """
+    if sender._meta.app_label == 'api' and action.startswith('post_'):
+        def bump():
+            for changed in {sender, type(instance), model}:
+                bump_table_version(changed)
+        transaction.on_commit(bump)
+
+
+@timed_handler
+def log_api_save(sender, instance, **kwargs):
+    """
+    Record a saved row in the change log used by the delta sync feed.
+    """
+    ChangeLogEntry.record(sender, [instance.pk])
+
+
+@timed_handler
+def collect_api_delete(sender, instance, origin=None, **kwargs):
+    """
+    Note a row that delete() is about to remove. Every pre_delete of a
+    delete() call, cascades included, is sent before its first post_delete,
+    so the rows are gathered on the object delete() was called on and logged
+    together by log_api_deletes.
+    """
+    if origin is None:  # A Collector used directly, log the row on its own
+        ChangeLogEntry.record(sender, [instance.pk], ChangeLogEntry.DELETE)
+        return
+    origin.__dict__.setdefault('_deleted_rows', {}).setdefault(sender, []).append(instance.pk)
+
+
+@timed_handler
+def log_api_deletes(sender, origin=None, **kwargs):
+    """
+    On the first post_delete of a delete() call, log all the rows it removes
+    with one insert, and invalidate the tables it touched.
+    """
+    deleted = origin.__dict__.pop('_deleted_rows', None) if origin is not None else None
+    if not deleted:
+        return
+    ChangeLogEntry.record_deletes(deleted)
+    touched = {table for model in deleted for table in (model, *signalless_dependents(model))}
+    transaction.on_commit(lambda: [bump_table_version(table) for table in touched])
+
+
+@lru_cache(maxsize=None)
+def signalless_dependents(model):
+    """
+    The unlogged api tables (placements, ratings) whose rows a delete of
+    `model` removes or updates without sending them signals.
+    """
+    return tuple({
+        relation.related_model for relation in model._meta.related_objects
+        if relation.related_model in UNLOGGED_MODELS and relation.on_delete is not DO_NOTHING
+    })
+
+
+# Placements and ratings are left out of the change log: clients derive them from categories and matches.
+# Receivers are connected per table so that deletes of the others keep Django's fast path.
+UNLOGGED_MODELS = (ChangeLogEntry, Placement, AthleteRating, RatingChange, RatingReplay)
+LOGGED_MODELS = [
+    model for model in django_apps.get_app_config('api').get_models(include_auto_created=True)
+    if model not in UNLOGGED_MODELS
+]
+for model in LOGGED_MODELS:
+    post_save.connect(log_api_save, sender=model)
+    pre_delete.connect(collect_api_delete, sender=model)
+    post_delete.connect(log_api_deletes, sender=model)  # Also bumps the table versions
+for app_label in VERSIONED_APPS:
+    for model in django_apps.get_app_config(app_label).get_models():
+        post_save.connect(bump_api_table_version, sender=model)
+        if app_label != 'api':
+            post_delete.connect(bump_api_table_version, sender=model)
+
+
+def through_row_ids(through, instance, model, pk_set):
+    """
+    Ids of the rows of a many-to-many table linking `instance` to the `model`
+    objects in `pk_set` (to all of them when `pk_set` is None).
+    """
+    source = next(field.name for field in through._meta.fields if field.related_model is type(instance))
+    target = next(field.name for field in through._meta.fields if field.related_model is model and field.name != source)
+    rows = through.objects.filter(**{source: instance.pk})
+    if pk_set is not None:
+        rows = rows.filter(**{f'{target}__in': pk_set})
+    return list(rows.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed)
+@timed_handler
+def log_api_m2m_change(sender, instance, action, model, pk_set, **kwargs):
+    """
+    Record the many-to-many rows added by add() and set(), which insert them
+    in bulk without post_save. remove() and clear() delete the rows through
+    a queryset, which log_api_deletes records.
+    """
+    if sender._meta.app_label == 'api' and action == 'post_add':
+        ChangeLogEntry.record(sender, through_row_ids(sender, instance, model, pk_set))
+
+
 @receiver(m2m_changed, sender=Club.coaches.through)
-def update_is_coach(sender, instance, action, pk_set, **kwargs):
+@timed_handler
+def update_is_coach(sender, instance, action, reverse, pk_set, **kwargs):
     """
     Signal to update the is_coach field in Athlete when the coaches field in Club is modified.
+
+    Works on the whole pk_set with update(), which sends no post_save, so
+    update_club_coaches is not re-entered for every coach.
     """
-    if action in ['post_add', 'post_remove']:
-        for athlete_id in pk_set:
-            athlete = Athlete.objects.get(pk=athlete_id)
-            if action == 'post_add':
-                if not athlete.is_coach:  # Prevent unnecessary updates
-                    athlete.is_coach = True
-                    athlete.save()
-            elif action == 'post_remove':
-                # Check if the athlete is still a coach for other clubs
-                if not athlete.coached_clubs.exists() and athlete.is_coach:
-                    athlete.is_coach = False
-                    athlete.save()
+    if action == 'pre_clear' and not reverse:
+        # pk_set is None on clear, so remember the coaches before the rows go
+        instance._cleared_coach_ids = set(sender.objects.filter(club=instance).values_list('athlete_id', flat=True))
+        return
+    if action not in ['post_add', 'post_remove', 'post_clear']:
+        return
+
+    if reverse:  # Changed from the Athlete side, pk_set holds club ids
+        athlete_ids = {instance.pk}
+    elif action == 'post_clear':
+        athlete_ids = instance.__dict__.pop('_cleared_coach_ids', set())
+    else:
+        athlete_ids = pk_set
+    if not athlete_ids:
+        return
+
+    if action == 'post_add':
+        is_coach = True
+        updated = Athlete.objects.filter(pk__in=athlete_ids, is_coach=False).update(is_coach=True)
+    else:
+        # Only athletes left without any coached club stop being coaches
+        is_coach = False
+        updated = Athlete.objects.filter(pk__in=athlete_ids, is_coach=True).exclude(
+            Exists(sender.objects.filter(athlete=OuterRef('pk')))
+        ).update(is_coach=False)
+
+    if updated:
+        if reverse and instance.is_coach != is_coach:
+            instance.is_coach = is_coach  # Keep the in-memory athlete in line with the row
+        transaction.on_commit(lambda: bump_table_version(Athlete))
+        ChangeLogEntry.record(Athlete, athlete_ids)
 
 @receiver(post_save, sender=Athlete)
+@timed_handler
 def update_club_coaches(sender, instance, **kwargs):
     """
     Signal to update the coaches field in Club when the is_coach field in Athlete is modified.
     """
-    # Prevent recursion by checking if the athlete is already in the club's coaches
+    if instance.club_id is None:
+        return
+    # Work on the through rows directly: no club fetch and no m2m_changed round trip
+    coaching = Club.coaches.through.objects.filter(club_id=instance.club_id, athlete_id=instance.pk)
     if instance.is_coach:
-        if instance.club and not instance.club.coaches.filter(pk=instance.pk).exists():
-            instance.club.coaches.add(instance)
+        if not coaching.exists():
+            Club.coaches.through.objects.create(club_id=instance.club_id, athlete_id=instance.pk)
     else:
-        if instance.club and instance.club.coaches.filter(pk=instance.pk).exists():
-            instance.club.coaches.remove(instance)
+        coaching.delete()
 
 @receiver(post_save, sender=GradeHistory)
+@timed_handler
 def update_current_grade(sender, instance, **kwargs):
     """
     Signal to update the current_grade field in Athlete when a new GradeHistory is created.
@@ -44,6 +195,7 @@ def update_current_grade(sender, instance, **kwargs):
     athlete.save()
 
 @receiver(m2m_changed, sender=Category.teams.through)
+@timed_handler
 def sync_category_and_team(sender, instance, action, reverse, pk_set, **kwargs):
     """
     Synchronize the relationship between Category and Team.
@@ -67,17 +219,14 @@ def sync_category_and_team(sender, instance, action, reverse, pk_set, **kwargs):
                     category.teams.remove(instance)
 
 @receiver(post_save, sender=Team)
+@timed_handler
 def validate_and_assign_places(sender, instance, **kwargs):
     """
     Validate team members and assign places after the team is saved.
     """
     # Validate that no team with the same set of athletes already exists
-    team_members = instance.members.all()
-    existing_teams = Team.objects.exclude(pk=instance.pk)
-
-    for team in existing_teams:
-        if set(team.members.values_list('athlete', flat=True)) == set(team_members.values_list('athlete', flat=True)):
-            raise ValueError("A team with the same members already exists.")
+    if instance.has_duplicate(instance.member_signature):
+        raise ValueError("A team with the same members already exists.")
 
     # Automatically assign the team's awarded place to its members
     if instance.categories.filter(first_place_team=instance).exists():
@@ -87,14 +236,115 @@ def validate_and_assign_places(sender, instance, **kwargs):
     elif instance.categories.filter(third_place_team=instance).exists():
         instance.assign_team_place_to_members("3rd Place")
 
-@receiver(post_save, sender=TeamMember)
+@receiver([post_save, post_delete], sender=TeamMember)
+@timed_handler
 def update_team_name(sender, instance, **kwargs):
     """
-    Update the team name based on its members after a TeamMember is saved.
+    Update the team name and member signature after a TeamMember is saved or deleted.
+    """
+    if getattr(instance, '_defer_team_refresh', False):
+        return  # The caller refreshes the team once all members are written (see TeamAdmin)
+    Team(pk=instance.team_id).refresh_members(removed=kwargs['signal'] is post_delete)
+    transaction.on_commit(lambda: bump_table_version(Team))  # update() sends no post_save
+
+@receiver(post_save, sender=Match)
+@timed_handler
+def advance_bracket_winner(sender, instance, **kwargs):
+    """
+    Move the winner of a bracket match to the next round once it is known.
     """
-    team = instance.team
-    member_names = [f"{member.athlete.first_name} {member.athlete.last_name}" for member in team.members.all()]
-    team.name = " + ".join(member_names)
-    team.save(update_fields=['name'])  # Save only the updated name field
+    if instance.round is not None and instance.winner_id is not None:
+        advance_winner(instance)
 
+@receiver(post_save, sender=Match)
+@timed_handler
+def schedule_new_match(sender, instance, created, **kwargs):
+    """
+    Fit a newly created match (e.g. the next bracket round) into the schedule of
+    its competition, once the competition has one.
+    """
+    if not created or instance.slot is not None:
+        return
+    competition = instance.category.competition
+    if competition.mat_count < 1:
+        return  # Cannot be scheduled until the competition has mats
+
+    def schedule():
+        if Match.objects.filter(category__competition=competition, slot__isnull=False).exists():
+            schedule_competition(competition)
+    transaction.on_commit(schedule)
+
+@receiver(post_save, sender=Match)
+@timed_handler
+def publish_match(sender, instance, **kwargs):
+    """
+    Push the new state of a match to the live feed of its competition.
+    """
+    publish_matches([instance.pk])
+
+@receiver([post_save, post_delete], sender=RefereeScore)
+@timed_handler
+def publish_referee_score(sender, instance, **kwargs):
+    """
+    Push the referee cards of a match to the live feed when one changes.
+    """
+    publish_scores([instance.match_id])
 
+@receiver(post_save, sender=Category)
+@timed_handler
+def publish_category(sender, instance, **kwargs):
+    """
+    Push the places of a category to the live feed.
+    """
+    publish_categories([instance.pk])
+
+@receiver(post_save, sender=Category)
+@timed_handler
+def refresh_category_placements(sender, instance, **kwargs):
+    """
+    Keep the materialized placements of a category in step with its place fields.
+    """
+    Placement.refresh([instance.pk])
+
+@receiver(post_save, sender=Competition)
+@timed_handler
+def refresh_competition_placements(sender, instance, created, **kwargs):
+    """
+    Move the placements of a competition to another season when its start date changes.
+    """
+    if not created:
+        Placement.refresh(instance.categories.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Match)
+@timed_handler
+def rate_match(sender, instance, created, **kwargs):
+    """
+    Update the ratings of both corners once a new or corrected result is committed.
+    """
+    if instance.winner_changed() and not (created and instance.winner_id is None):
+        transaction.on_commit(lambda: rate_matches([instance.pk]))
+
+@receiver(post_delete, sender=Match)
+@timed_handler
+def recompute_ratings_without_match(sender, instance, origin=None, **kwargs):
+    """
+    Deleting a decided match takes it out of the rating history, which needs a
+    replay; one request serves all the matches of a delete() call.
+    """
+    if instance.winner_id is None:
+        return
+    if origin is not None:
+        if origin.__dict__.get('_replay_requested'):
+            return
+        origin.__dict__['_replay_requested'] = True
+    schedule_recompute()
+
+@receiver(post_save, sender=Athlete)
+@timed_handler
+def update_rating_grade(sender, instance, **kwargs):
+    """
+    Keep the grade copied onto the athlete's rating (for the grade leaderboards) current.
+    """
+    AthleteRating.objects.filter(athlete_id=instance.pk).exclude(grade_id=instance.current_grade_id).update(
+        grade_id=instance.current_grade_id,
+    )
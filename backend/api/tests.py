@@ -1,3 +1,1344 @@
+import json
+from io import StringIO
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import reference
+from .brackets import generate_bracket
+from .cache import bump_table_version
+from .live import BUFFER_SIZE, broker
+from .models import (
+    AnnualVisa,
+    Athlete,
+    AthleteRating,
+    Category,
+    CategoryAthlete,
+    CategoryAthleteScore,
+    CategoryTeam,
+    ChangeLogEntry,
+    City,
+    Club,
+    Competition,
+    Grade,
+    GradeHistory,
+    Group,
+    Match,
+    MedicalVisa,
+    RatingChange,
+    RatingReplay,
+    RefereeScore,
+    Team,
+    TeamMember,
+    TrainingSeminar,
+)
+from .ratings import rate_matches
+from .scheduling import schedule_competition
+from .serializers import AthleteSerializer
+
+
+class FilterTests(TestCase):
+    """
+    Teams and matches filter by athlete, category, competition and corner,
+    each filter at the list's usual query count.
+    """
+
+    def setUp(self):
+        self.cup, self.league = Competition.objects.create(name='Cup'), Competition.objects.create(name='League')
+        self.fight = Category.objects.create(name='Fight', competition=self.cup, type='fight')
+        self.other = Category.objects.create(name='Fight', competition=self.league, type='fight')
+        self.teams = Category.objects.create(name='Teams', competition=self.cup, type='teams')
+        self.a, self.b, self.c = [
+            Athlete.objects.create(first_name=name, last_name='Test', date_of_birth=date(2000, 1, 1)) for name in 'ABC'
+        ]
+        self.ab = Match.objects.create(category=self.fight, red_corner=self.a, blue_corner=self.b, winner=self.b)
+        self.ca = Match.objects.create(
+            category=self.other, red_corner=self.c, blue_corner=self.a, winner=self.c, match_type='finals',
+        )
+        self.team = Team.objects.create()
+        TeamMember.objects.create(team=self.team, athlete=self.a)
+        CategoryTeam.objects.create(category=self.teams, team=self.team)
+        self.empty_team = Team.objects.create()
+
+    def match_ids(self, params):
+        # page + referees
+        with self.assertNumQueries(2):
+            response = self.client.get('/match/', params)
+        return {row['id'] for row in response.json()['results']}
+
+    def team_ids(self, params):
+        # count + page + categories + members + member athletes
+        with self.assertNumQueries(5):
+            response = self.client.get('/team/', params)
+        return {row['id'] for row in response.json()['results']}
+
+    def test_match_filters(self):
+        self.assertEqual(self.match_ids({'athlete_id': self.a.pk}), {self.ab.pk, self.ca.pk})
+        self.assertEqual(self.match_ids({'athlete_id': self.a.pk, 'corner': 'red'}), {self.ab.pk})
+        self.assertEqual(self.match_ids({'athlete_id': self.a.pk, 'corner': 'blue'}), {self.ca.pk})
+        self.assertEqual(self.match_ids({'athlete_id': self.c.pk, 'corner': 'winner'}), {self.ca.pk})
+        self.assertEqual(self.match_ids({'category': self.fight.pk}), {self.ab.pk})
+        self.assertEqual(self.match_ids({'competition': self.league.pk}), {self.ca.pk})
+        self.assertEqual(self.match_ids({'match_type': 'finals'}), {self.ca.pk})
+        self.assertEqual(self.match_ids({'red_corner': self.c.pk}), {self.ca.pk})
+        self.assertEqual(self.match_ids({'blue_corner': self.b.pk}), {self.ab.pk})
+        self.assertEqual(self.match_ids({'winner': self.b.pk}), {self.ab.pk})
+
+    def test_corner_needs_an_athlete(self):
+        response = self.client.get('/match/', {'corner': 'blue'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('corner', response.json())
+
+    def test_team_filters(self):
+        self.assertEqual(self.team_ids({'athlete_id': self.a.pk}), {self.team.pk})
+        self.assertEqual(self.team_ids({'category': self.teams.pk}), {self.team.pk})
+        self.assertEqual(self.team_ids({'competition': self.cup.pk}), {self.team.pk})
+        self.assertEqual(self.team_ids({}), {self.team.pk, self.empty_team.pk})
+
+    def test_athlete_filters(self):
+        club = Club.objects.create(name='CS Iasi')
+        Athlete.objects.filter(pk__in=[self.a.pk, self.c.pk]).update(club=club)
+
+        def athlete_ids(params):
+            with self.assertNumQueries(1):
+                response = self.client.get('/athlete/', {'fields': 'id', **params})
+            return [row['id'] for row in response.json()['results']]
+
+        self.assertEqual(athlete_ids({'club': club.pk}), [self.a.pk, self.c.pk])
+        self.assertEqual(athlete_ids({'search': 'B'}), [self.b.pk])
+        # The neighbours of an athlete, as the profile page steps through them
+        self.assertEqual(athlete_ids({'id__gt': self.a.pk, 'page_size': 1}), [self.b.pk])
+        self.assertEqual(athlete_ids({'id__lt': self.c.pk, 'ordering': '-id', 'page_size': 1}), [self.b.pk])
+
+
+class PaginationTests(TestCase):
+    """
+    The large tables page with a cursor, the others with page numbers, and
+    the small reference tables are plain lists. A page holds at most 500 rows.
+    """
+
+    def test_cursor_pages(self):
+        athletes = Athlete.objects.bulk_create(
+            Athlete(first_name='Athlete', last_name=str(index), date_of_birth=date(2000, 1, 1)) for index in range(501)
+        )
+        grade = Grade.objects.create(name='1 Dan', rank_order=10)
+        category = Category.objects.create(name='Fight', competition=Competition.objects.create(name='Cup'), type='fight')
+        Match.objects.create(category=category, red_corner=athletes[0], blue_corner=athletes[1])
+        GradeHistory.objects.create(athlete=athletes[0], grade=grade, obtained_date=date(2020, 1, 1))
+        for url in ('/athlete/', '/match/', '/grade-history/'):
+            page = self.client.get(url).json()
+            self.assertEqual(set(page), {'next', 'previous', 'results'}, url)
+
+        page = self.client.get('/athlete/', {'page_size': 1000, 'fields': 'id'}).json()
+        self.assertEqual(len(page['results']), 500)
+        page = self.client.get(page['next']).json()
+        self.assertEqual([row['id'] for row in page['results']], [athletes[-1].pk])
+        self.assertIsNone(page['next'])
+
+    def test_cursor_pages_only_order_by_id(self):
+        athletes = Athlete.objects.bulk_create(
+            Athlete(first_name='Athlete', last_name=str(index), date_of_birth=date(2000, 1, 1)) for index in range(3)
+        )
+        category = Category.objects.create(name='Fight', competition=Competition.objects.create(name='Cup'), type='fight')
+        grade = Grade.objects.create(name='1 Dan', rank_order=10)
+        for year, match_type in enumerate(('finals', 'qualifications', 'semi-finals'), start=2020):
+            Match.objects.create(category=category, red_corner=athletes[0], blue_corner=athletes[1], match_type=match_type)
+            GradeHistory.objects.create(athlete=athletes[2], grade=grade, obtained_date=date(year, 1, 1))
+        for url, field in (('/match/', 'match_type'), ('/grade-history/', 'obtained_date')):
+            # A non-unique column would let the cursor skip or repeat rows, so it is ignored
+            ids = [row['id'] for row in self.client.get(url, {'ordering': f'-{field}'}).json()['results']]
+            self.assertEqual(ids, sorted(ids), url)
+            ids = [row['id'] for row in self.client.get(url, {'ordering': '-id'}).json()['results']]
+            self.assertEqual(ids, sorted(ids, reverse=True), url)
+
+    def test_page_number_pages(self):
+        Club.objects.bulk_create(Club(name=f'Club {index}') for index in range(501))
+        for url in ('/club/', '/category/', '/team/', '/annual-visa/', '/medical-visa/', '/training-seminar/', '/city/'):
+            page = self.client.get(url).json()
+            self.assertEqual(set(page), {'count', 'next', 'previous', 'results'}, url)
+
+        page = self.client.get('/club/', {'page_size': 1000}).json()
+        self.assertEqual((page['count'], len(page['results'])), (501, 500))
+        self.assertEqual(len(self.client.get('/club/').json()['results']), 20)
+
+    def test_plain_lists(self):
+        Grade.objects.create(name='1 Dan', rank_order=10)
+        Competition.objects.create(name='Cup')
+        for url in ('/grade/', '/competition/'):
+            self.assertEqual(len(self.client.get(url).json()), 1, url)
+
+
+class ClubStatsTests(TestCase):
+    def test_counts(self):
+        club, empty = Club.objects.create(name='CS Iasi'), Club.objects.create(name='CS Vaslui')
+        valid, expired, none = [
+            Athlete.objects.create(first_name=name, last_name='Test', date_of_birth=date(2000, 1, 1), club=club)
+            for name in ('Valid', 'Expired', 'None')
+        ]
+        AnnualVisa.objects.create(athlete=valid, issued_date=date.today())
+        AnnualVisa.objects.create(athlete=expired, issued_date=date(2000, 1, 1))
+        AnnualVisa.objects.create(athlete=expired, issued_date=date(2001, 1, 1))  # Counted once
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/club/stats/')
+        self.assertEqual(response.json(), [
+            {'id': club.pk, 'name': 'CS Iasi', 'athlete_count': 3, 'valid_visa_count': 1, 'expired_visa_count': 1},
+            {'id': empty.pk, 'name': 'CS Vaslui', 'athlete_count': 0, 'valid_visa_count': 0, 'expired_visa_count': 0},
+        ])
+
+
+class CategoryListQueryCountTests(TestCase):
+    """
+    Listing categories must cost a fixed number of queries, whatever the
+    number of enrolled athletes and teams.
+    """
+
+    # count + categories + enrolled athletes + teams (with categories, members,
+    # member athletes) + three placement teams (with categories, members, member athletes)
+    MAX_QUERIES = 16
+
+    def setUp(self):
+        self.city = City.objects.create(name='Iasi')
+        self.club = Club.objects.create(name='CS Iasi', city=self.city)
+        self.grade = Grade.objects.create(name='1 Dan', rank_order=10)
+        self.competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+
+    def enroll(self, athlete_count):
+        solo = Category.objects.create(name=f'Solo {athlete_count}', competition=self.competition, type='solo')
+        teams = Category.objects.create(name=f'Teams {athlete_count}', competition=self.competition, type='teams')
+        athletes = [
+            Athlete.objects.create(
+                first_name=f'Athlete {athlete_count}-{i}', last_name='Test', date_of_birth=date(2000, 1, 1),
+                club=self.club, city=self.city, current_grade=self.grade,
+            )
+            for i in range(athlete_count)
+        ]
+        CategoryAthlete.objects.bulk_create(
+            CategoryAthlete(category=solo, athlete=athlete, weight=70) for athlete in athletes
+        )
+        created_teams = []
+        for first, second in zip(athletes[::2], athletes[1::2]):
+            team = Team.objects.create()
+            TeamMember.objects.create(team=team, athlete=first)
+            TeamMember.objects.create(team=team, athlete=second)
+            CategoryTeam.objects.create(category=teams, team=team)
+            created_teams.append(team)
+        Category.objects.filter(pk=solo.pk).update(
+            first_place=athletes[0], second_place=athletes[1], third_place=athletes[2],
+        )
+        Category.objects.filter(pk=teams.pk).update(
+            first_place_team=created_teams[0], second_place_team=created_teams[1], third_place_team=created_teams[2],
+        )
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/category/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_bounded(self):
+        self.enroll(6)
+        self.assertLessEqual(self.count_list_queries(), self.MAX_QUERIES)
+
+    def test_enrolled_athletes_join_only_the_athlete(self):
+        self.enroll(6)
+        with CaptureQueriesContext(connection) as queries:
+            athlete = self.client.get('/category/').json()['results'][0]['enrolled_athletes'][0]['athlete']
+        self.assertEqual(
+            (athlete['club'], athlete['city'], athlete['current_grade']), (self.club.pk, self.city.pk, self.grade.pk),
+        )
+        enrollments = next(query['sql'] for query in queries if query['sql'].startswith('SELECT "api_categoryathlete"'))
+        self.assertNotIn('"api_club"', enrollments)
+        self.assertNotIn('"api_grade"', enrollments)
+
+    def test_query_count_does_not_grow_with_athletes(self):
+        self.enroll(6)
+        small = self.count_list_queries()
+        self.enroll(40)
+        self.assertEqual(self.count_list_queries(), small)
+
+
+class CompetitionFullDocumentTests(TestCase):
+    """
+    The competition document is built in a fixed number of queries and served
+    from the cache until one of its tables changes.
+    """
+
+    # competition, groups, categories, enrolled athletes, teams, team members, matches, referees
+    MAX_QUERIES = 8
+
+    def setUp(self):
+        cache.clear()
+        club = Club.objects.create(name='CS Iasi')
+        self.competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        Group.objects.create(name='Seniors', competition=self.competition)
+        category = Category.objects.create(name='Fight -70', competition=self.competition, type='fight')
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1), club=club)
+            for i in range(8)
+        ]
+        CategoryAthlete.objects.bulk_create(CategoryAthlete(category=category, athlete=athlete) for athlete in self.athletes)
+        for red, blue in zip(self.athletes[::2], self.athletes[1::2]):
+            Match(category=category, red_corner=red, blue_corner=blue).save()
+        self.url = f'/competition/{self.competition.pk}/full/'
+
+    def test_document_is_cached_until_a_related_row_changes(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertLessEqual(len(queries), self.MAX_QUERIES)
+        self.assertEqual(len(response.json()['categories'][0]['matches']), 4)
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            athlete = self.athletes[0]
+            athlete.first_name = 'Renamed'
+            athlete.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertLessEqual(len(queries), self.MAX_QUERIES)
+        self.assertIn('Renamed', response.content.decode())
+
+
+class AthleteProfileTests(TestCase):
+    """
+    The profile page is one response built from a fixed number of queries.
+    """
+
+    def setUp(self):
+        club = Club.objects.create(name='CS Iasi')
+        grade = Grade.objects.create(name='1 Dan', rank_order=10)
+        self.athlete, self.opponent, self.partner = [
+            Athlete.objects.create(first_name=name, last_name='Test', date_of_birth=date(2000, 1, 1), club=club)
+            for name in ('Ana', 'Bea', 'Cora')
+        ]
+        competition = Competition.objects.create(name='Cup', start_date=date(2025, 5, 1))
+        solo = Category.objects.create(name='Solo', competition=competition, type='solo')
+        fight = Category.objects.create(name='Fight', competition=competition, type='fight')
+        teams = Category.objects.create(name='Teams', competition=competition, type='teams')
+        CategoryAthlete.objects.create(category=solo, athlete=self.athlete)
+        CategoryAthlete.objects.create(category=fight, athlete=self.athlete, weight=68)
+        team = Team.objects.create(name='Iasi')
+        TeamMember.objects.create(team=team, athlete=self.athlete)
+        TeamMember.objects.create(team=team, athlete=self.partner)
+        CategoryTeam.objects.create(category=teams, team=team)
+        Category.objects.filter(pk=solo.pk).update(first_place=self.athlete)
+        Category.objects.filter(pk=teams.pk).update(second_place_team=team)
+        Match.objects.create(category=fight, red_corner=self.opponent, blue_corner=self.athlete, winner=self.athlete)
+        GradeHistory.objects.create(athlete=self.athlete, grade=grade, exam_place='Iasi')
+        AnnualVisa.objects.create(athlete=self.athlete, issued_date=date.today())
+        MedicalVisa.objects.create(athlete=self.athlete, issued_date=date.today())
+        TrainingSeminar.objects.create(name='Summer camp', place='Iasi').athletes.add(self.athlete)
+
+    def test_profile(self):
+        # athlete with its references, grade history, annual visas, medical
+        # visas, seminars, enrollments, memberships, team categories (skipped
+        # for an athlete in no team), matches
+        with self.assertNumQueries(9):
+            response = self.client.get(f'/athlete/{self.athlete.pk}/profile/')
+        profile = response.json()
+
+        self.assertEqual((profile['first_name'], profile['club_name'], profile['city_name']), ('Ana', 'CS Iasi', None))
+        self.assertEqual(
+            [(entry['grade_name'], entry['exam_place']) for entry in profile['grade_history']], [('1 Dan', 'Iasi')],
+        )
+        self.assertEqual(len(profile['annual_visas']), 1)
+        self.assertEqual(len(profile['medical_visas']), 1)
+        self.assertEqual([seminar['name'] for seminar in profile['training_seminars']], ['Summer camp'])
+        self.assertEqual(
+            {kind: [(row['category_name'], row['place']) for row in rows] for kind, rows in profile['results'].items()},
+            {'solo': [('Solo', 1)], 'fight': [('Fight', None)], 'teams': [('Teams', 2)]},
+        )
+        [match] = profile['matches']
+        self.assertEqual(
+            (match['corner'], match['opponent_name'], match['opponent_club'], match['won']),
+            ('blue', 'Bea Test', 'CS Iasi', True),
+        )
+
+    def test_athlete_without_teams(self):
+        with self.assertNumQueries(8):
+            response = self.client.get(f'/athlete/{self.opponent.pk}/profile/')
+        self.assertEqual(response.json()['matches'][0]['won'], False)
+
+    def test_unknown_athlete(self):
+        self.assertEqual(self.client.get('/athlete/0/profile/').status_code, 404)
+
+
+class ReferenceTableTests(TestCase):
+    """
+    Reference tables are served and validated from process memory until a
+    write moves their version.
+    """
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade = Grade.objects.create(name='1 Dan', rank_order=10)
+            self.city = City.objects.create(name='Iasi')
+
+    def test_write_reloads_the_table(self):
+        self.assertEqual([row['name'] for row in self.client.get('/grade/').json()], ['1 Dan'])
+        with self.assertNumQueries(0):
+            self.client.get('/grade/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(name='2 Dan', rank_order=20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/grade/')
+        self.assertEqual([row['name'] for row in response.json()], ['1 Dan', '2 Dan'])
+
+    def test_validation_reads_the_cached_rows(self):
+        data = {
+            'first_name': 'Ana', 'last_name': 'Test', 'date_of_birth': '2000-01-01', 'club': None,
+            'city': self.city.pk, 'current_grade': self.grade.pk, 'title': None, 'federation_role': None,
+        }
+        reference.grades.rows(), reference.cities.rows()  # Warm the tables
+
+        with self.assertNumQueries(0):
+            serializer = AthleteSerializer(data=data)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['current_grade'], self.grade)
+
+        with self.assertNumQueries(0):
+            serializer = AthleteSerializer(data={**data, 'current_grade': self.grade.pk + 1})
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['current_grade'][0].code, 'does_not_exist')
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Revalidating an unchanged list answers 304 without touching the database.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='CS Iasi')
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get('/club/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/club/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_the_validators(self):
+        etag = self.client.get(f'/club/{self.club.pk}/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.club.name = 'CSM Iasi'
+            self.club.save()
+
+        response = self.client.get(f'/club/{self.club.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_last_modified_is_sent_once_its_second_is_over(self):
+        with mock.patch('api.cache.time.time', return_value=1000.2):
+            bump_table_version(Club)
+            # A write later in this second would keep the same date
+            self.assertFalse(self.client.get('/club/').has_header('Last-Modified'))
+
+        with mock.patch('api.cache.time.time', return_value=1001.0):
+            last_modified = self.client.get('/club/')['Last-Modified']
+            with self.assertNumQueries(0):
+                response = self.client.get('/club/', HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304)
+
+            bump_table_version(Club)
+            response = self.client.get('/club/', HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 200)
+
+
+class BulkEnrollmentTests(TestCase):
+    """
+    Bulk enrollment validates the whole batch with set-based queries and
+    writes nothing unless every row is valid.
+    """
+
+    url = '/category/bulk-enroll/'
+
+    def setUp(self):
+        competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        self.solo = Category.objects.create(name='Solo', competition=competition, type='solo')
+        self.teams = Category.objects.create(name='Teams', competition=competition, type='teams')
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1))
+            for i in range(50)
+        ]
+
+    def test_valid_batch_is_created_in_bounded_queries(self):
+        rows = [{'category': self.solo.pk, 'athlete': athlete.pk, 'weight': '70.50'} for athlete in self.athletes]
+        # categories, athletes, existing pairs, savepoint, insert, change log, release
+        with self.assertNumQueries(7):
+            response = self.client.post(self.url, rows, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'created': 50})
+        self.assertEqual(CategoryAthlete.objects.filter(category=self.solo).count(), 50)
+
+    def test_invalid_rows_are_reported_and_nothing_is_written(self):
+        CategoryAthlete.objects.create(category=self.solo, athlete=self.athletes[0])
+        rows = [
+            {'category': self.solo.pk, 'athlete': self.athletes[0].pk},
+            {'category': self.solo.pk, 'athlete': self.athletes[1].pk},
+            {'category': self.solo.pk, 'athlete': self.athletes[1].pk},
+            {'category': self.teams.pk, 'athlete': self.athletes[2].pk},
+            {'category': self.solo.pk, 'athlete': 999999},
+        ]
+        response = self.client.post(self.url, rows, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertIn('non_field_errors', errors[0])
+        self.assertEqual(errors[1], {})
+        self.assertIn('non_field_errors', errors[2])
+        self.assertIn('category', errors[3])
+        self.assertIn('athlete', errors[4])
+        self.assertEqual(CategoryAthlete.objects.count(), 1)
+
+
+class ExportTests(TestCase):
+    """
+    Exports stream one line per row and are reserved for staff.
+    """
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        club = Club.objects.create(name='CS Iasi')
+        for i in range(3):
+            athlete = Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1), club=club)
+        AnnualVisa.objects.create(athlete=athlete, issued_date=date.today())
+        self.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+
+    def test_athlete_export_streams_csv_and_ndjson(self):
+        self.assertEqual(self.client.get('/export/athletes/').status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/export/athletes/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('id,first_name'))
+
+        response = self.client.get('/export/athletes/', {'output': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['club'] for row in rows], ['CS Iasi'] * 3)
+        self.assertEqual([row['annual_visa_valid'] for row in rows], [False, False, True])
+
+
+class CoachSyncTests(TestCase):
+    """
+    Club.coaches and Athlete.is_coach stay in sync with set-based queries.
+    """
+
+    def setUp(self):
+        self.club = Club.objects.create(name='CS Iasi')
+        self.other_club = Club.objects.create(name='CSM Cluj')
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1))
+            for i in range(30)
+        ]
+
+    def coach_ids(self):
+        return set(Athlete.objects.filter(is_coach=True).values_list('id', flat=True))
+
+    def test_adding_coaches_costs_a_constant_number_of_queries(self):
+        # existing rows, insert, new row ids for the change log, change log,
+        # is_coach update, its change log
+        with self.assertNumQueries(6):
+            self.club.coaches.add(*self.athletes)
+        self.assertEqual(self.coach_ids(), {athlete.pk for athlete in self.athletes})
+
+    def test_removing_keeps_coaches_of_other_clubs(self):
+        self.club.coaches.add(*self.athletes[:2])
+        self.other_club.coaches.add(self.athletes[0])
+
+        self.club.coaches.clear()
+        self.assertEqual(self.coach_ids(), {self.athletes[0].pk})
+
+        athlete = self.athletes[0]
+        athlete.coached_clubs.remove(self.other_club)
+        self.assertFalse(athlete.is_coach)
+        self.assertEqual(self.coach_ids(), set())
+
+
+class TeamSignatureTests(TestCase):
+    """
+    Duplicate teams are found through the member signature, not by comparing
+    every team in the database.
+    """
+
+    def setUp(self):
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1))
+            for i in range(3)
+        ]
+
+    def make_team(self, *athletes):
+        team = Team.objects.create()
+        for athlete in athletes:
+            TeamMember.objects.create(team=team, athlete=athlete)
+        team.refresh_from_db()
+        return team
+
+    def test_member_changes_update_name_and_signature(self):
+        team = self.make_team(self.athletes[0], self.athletes[1])
+        self.assertEqual(team.name, 'Athlete 0 Test + Athlete 1 Test')
+        self.assertEqual(team.member_signature, Team.signature_for([self.athletes[1].pk, self.athletes[0].pk]))
+
+        team.members.get(athlete=self.athletes[1]).delete()
+        team.refresh_from_db()
+        self.assertEqual(team.name, 'Athlete 0 Test')
+
+    def test_duplicate_member_set_is_rejected_with_constant_queries(self):
+        team = self.make_team(self.athletes[0], self.athletes[1])
+        other = self.make_team(self.athletes[0])
+        # insert, change log, members read, duplicate lookup
+        with self.assertNumQueries(4), self.assertRaises(ValueError):
+            TeamMember.objects.create(team=other, athlete=self.athletes[1])
+        self.assertEqual(team.members.count(), 2)
+
+    def test_removing_a_member_into_a_duplicate_set_succeeds(self):
+        single = self.make_team(self.athletes[0])
+        pair = self.make_team(self.athletes[1], self.athletes[0])
+        self.athletes[1].delete()
+        pair.refresh_from_db()
+        self.assertEqual((pair.name, pair.member_signature), ('Athlete 0 Test', None))
+        single.refresh_from_db()
+        self.assertEqual(single.member_signature, Team.signature_for([self.athletes[0].pk]))
+
+
+class MatchWinnerTests(TestCase):
+    """
+    Match writes cost a single write (plus its change log entry), and winners
+    can be recomputed per category in one pass.
+    """
+
+    def setUp(self):
+        competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        self.category = Category.objects.create(name='Fight -70', competition=competition, type='fight')
+        self.red, self.blue, self.referee = [
+            Athlete.objects.create(first_name=name, last_name='Test', date_of_birth=date(2000, 1, 1), is_referee=True)
+            for name in ('Red', 'Blue', 'Referee')
+        ]
+
+    def test_create_and_update_cost_one_write(self):
+        # insert, change log
+        with self.assertNumQueries(2):
+            match = Match.objects.create(category=self.category, red_corner=self.red, blue_corner=self.blue)
+        self.assertEqual(match.name, 'Red vs Blue (qualifications) - Fight -70')
+
+        RefereeScore.objects.create(match=match, referee=self.referee, winner='blue')
+        match = Match.objects.get(pk=match.pk)  # Corners and category not loaded
+        # vote tally, update, change log
+        with self.assertNumQueries(3):
+            match.save()
+        self.assertEqual(match.winner_id, self.blue.pk)
+
+        # A new corner rebuilds the name from one read of the names
+        match.blue_corner_id = self.referee.pk
+        # names, vote tally, update, change log
+        with self.assertNumQueries(4):
+            match.save()
+        self.assertEqual(Match.objects.get(pk=match.pk).name, 'Red vs Referee (qualifications) - Fight -70')
+
+    def test_recompute_winners_for_a_category(self):
+        matches = [Match.objects.create(category=self.category, red_corner=self.red, blue_corner=self.blue) for _ in range(5)]
+        RefereeScore.objects.bulk_create(
+            RefereeScore(match=match, referee=self.referee, winner='red') for match in matches
+        )
+        response = self.client.post(f'/category/{self.category.pk}/recompute-winners/')
+        self.assertEqual(response.json(), {'updated': 5})
+        self.assertEqual(Match.objects.filter(winner=self.red).count(), 5)
+
+
+class CategoryStandingsTests(TestCase):
+    """
+    Standings are aggregated by the database in a constant number of queries.
+    """
+
+    def setUp(self):
+        competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        self.category = Category.objects.create(name='Solo', competition=competition, type='solo')
+        self.referees = [
+            Athlete.objects.create(first_name=f'Referee {i}', last_name='Test', date_of_birth=date(1980, 1, 1), is_referee=True)
+            for i in range(4)
+        ]
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1))
+            for i in range(3)
+        ]
+        scores = {
+            self.athletes[0]: [5, 8, 8, 9],   # trimmed 8.0, total 30
+            self.athletes[1]: [7, 8, 8, 10],  # trimmed 8.0, total 33
+            self.athletes[2]: [9, 9, 9, 9],   # trimmed 9.0
+        }
+        CategoryAthleteScore.objects.bulk_create(
+            CategoryAthleteScore(category=self.category, athlete=athlete, referee=referee, score=score)
+            for athlete, athlete_scores in scores.items()
+            for referee, score in zip(self.referees, athlete_scores)
+        )
+
+    def test_standings_rank_by_trimmed_mean_then_total(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/category/{self.category.pk}/standings/')
+        rows = response.json()['standings']
+        self.assertEqual([row['athlete']['id'] for row in rows], [self.athletes[2].pk, self.athletes[1].pk, self.athletes[0].pk])
+        self.assertEqual([row['rank'] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[1]['trimmed_mean'], 8.0)
+        self.assertEqual([row['tie_break'] for row in rows], [None, 'total', 'total'])
+        self.assertFalse(rows[0]['tied'])
+
+    def test_calculate_athlete_scores_keeps_its_shape(self):
+        self.assertEqual(self.category.calculate_athlete_scores()[self.athletes[0]], 30)
+
+
+class BracketTests(TestCase):
+    """
+    Brackets are generated with a fixed number of queries and advance winners
+    round by round.
+    """
+
+    def setUp(self):
+        competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        self.category = Category.objects.create(name='Fight -70', competition=competition, type='fight')
+        clubs = [Club.objects.create(name=f'Club {i}') for i in range(4)]
+        grades = [Grade.objects.create(name=f'{i} Dan', rank_order=i) for i in range(5)]
+        self.athletes = Athlete.objects.bulk_create(
+            Athlete(
+                first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1),
+                club=clubs[i % 4], current_grade=grades[i % 5],
+            )
+            for i in range(100)
+        )
+        CategoryAthlete.objects.bulk_create(
+            CategoryAthlete(category=self.category, athlete=athlete) for athlete in self.athletes
+        )
+
+    def test_generation_is_bounded_and_separates_clubs(self):
+        # existence check, enrollments, clear slots, set slots (batched), insert matches
+        with CaptureQueriesContext(connection) as queries:
+            matches = generate_bracket(self.category)
+        self.assertLessEqual(len(queries), 10)
+
+        # 100 athletes in a 128 bracket: 28 byes, 36 first-round matches
+        self.assertEqual(sum(match.round == 1 for match in matches), 36)
+        clubs = {athlete.pk: athlete.club_id for athlete in self.athletes}
+        self.assertFalse([m for m in matches if clubs[m.red_corner_id] == clubs[m.blue_corner_id]])
+        top_seed = CategoryAthlete.objects.get(category=self.category, bracket_slot=0).athlete
+        self.assertEqual(top_seed.current_grade.rank_order, 4)
+
+    def test_regeneration_is_bounded(self):
+        matches = generate_bracket(self.category)
+        match = Match.objects.get(pk=matches[0].pk)
+        match.winner = match.red_corner
+        with self.captureOnCommitCallbacks(execute=True):
+            match.save()
+        # existence check, old matches, referee links, scores, four deletes, change log,
+        # rating replay request, then the generation itself
+        with CaptureQueriesContext(connection) as queries:
+            matches = generate_bracket(self.category, reset=True)
+        self.assertLessEqual(len(queries), 20)
+        self.assertFalse(Match.objects.filter(pk=match.pk).exists())
+        self.assertFalse(RatingChange.objects.filter(match_id=match.pk).exists())
+        self.assertEqual(Match.objects.filter(category=self.category).count(), len(matches))
+        self.assertTrue(ChangeLogEntry.objects.filter(model='match', object_id=match.pk, action='delete').exists())
+        self.assertIsNotNone(RatingReplay.objects.get().requested)
+
+    def test_winners_advance_to_the_final(self):
+        CategoryAthlete.objects.filter(athlete__in=self.athletes[3:]).delete()
+        generate_bracket(self.category)  # Three athletes: the top seed has a bye
+        first_round = Match.objects.get(category=self.category, round=1)
+        first_round.winner = first_round.red_corner
+        first_round.save()
+
+        final = Match.objects.get(category=self.category, round=2)
+        self.assertEqual(final.match_type, 'finals')
+        final.winner = final.blue_corner
+        final.save()
+
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.first_place_id, first_round.red_corner_id)
+        self.assertEqual(self.category.second_place_id, final.red_corner_id)
+        self.assertEqual(self.category.third_place_id, first_round.blue_corner_id)
+
+
+class SchedulingTests(TestCase):
+    """
+    The scheduler never double-books a mat or an athlete and fits new matches
+    around the existing plan.
+    """
+
+    def setUp(self):
+        self.competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1), mat_count=3)
+        self.category = Category.objects.create(name='Fight -70', competition=self.competition, type='fight')
+        athletes = Athlete.objects.bulk_create(
+            Athlete(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1)) for i in range(32)
+        )
+        CategoryAthlete.objects.bulk_create(CategoryAthlete(category=self.category, athlete=athlete) for athlete in athletes)
+        generate_bracket(self.category)
+
+    def test_plan_respects_mats_and_rest(self):
+        generated = timezone.now()
+        self.client.post(f'/competition/{self.competition.pk}/schedule/', {'rest': 1}, content_type='application/json')
+        matches = self.client.get(f'/competition/{self.competition.pk}/schedule/').json()['matches']
+        self.assertEqual(len(matches), 16)
+        self.assertEqual(len({(match['mat'], match['slot']) for match in matches}), 16)
+        self.assertEqual(max(match['slot'] for match in matches), 5)  # 16 matches on 3 mats
+        # Rescheduled matches are newer for the conditional GETs
+        self.assertFalse(Match.objects.filter(category=self.category, modified__lt=generated).exists())
+
+    def test_new_match_is_fitted_after_its_feeders(self):
+        schedule_competition(self.competition)
+        for match in Match.objects.filter(category=self.category, bracket_position__in=[0, 1]):
+            match.winner_id = match.red_corner_id
+            with self.captureOnCommitCallbacks(execute=True):
+                match.save()
+
+        following = Match.objects.get(category=self.category, round=2, bracket_position=0)
+        feeder_slots = Match.objects.filter(category=self.category, round=1, bracket_position__in=[0, 1]).values_list('slot', flat=True)
+        self.assertGreater(following.slot, max(feeder_slots) + 1)
+
+    def test_competition_needs_a_mat(self):
+        url = f'/competition/{self.competition.pk}/'
+        response = self.client.put(url, {'name': 'National Championship', 'mat_count': 0}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('mat_count', response.json())
+
+        # Saved before the validator existed: the scheduler refuses instead of looping
+        Competition.objects.filter(pk=self.competition.pk).update(mat_count=0)
+        response = self.client.post(f'{url}schedule/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('mat_count', response.json())
+        with self.assertRaises(ValueError):
+            schedule_competition(Competition.objects.get(pk=self.competition.pk))
+
+
+class ScoreIngestionTests(TestCase):
+    """
+    Score batches are upserted, so re-sending one changes nothing, and winners
+    are recomputed for the affected matches.
+    """
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        self.category = Category.objects.create(name='Fight -70', competition=competition, type='fight')
+        self.solo = Category.objects.create(name='Solo', competition=competition, type='solo')
+        self.red, self.blue, *self.referees = [
+            Athlete.objects.create(first_name=name, last_name='Test', date_of_birth=date(2000, 1, 1), is_referee=name.startswith('Referee'))
+            for name in ('Red', 'Blue', 'Referee 1', 'Referee 2', 'Referee 3')
+        ]
+        CategoryAthlete.objects.create(category=self.solo, athlete=self.red)
+        self.matches = [Match.objects.create(category=self.category, red_corner=self.red, blue_corner=self.blue) for _ in range(3)]
+        self.client.force_login(User.objects.create_user('judge', password='secret'))
+
+    def post(self, payload):
+        return self.client.post('/scores/', payload, content_type='application/json')
+
+    def test_batch_is_idempotent(self):
+        payload = {
+            'referee_scores': [
+                {'match': match.pk, 'referee': referee.pk, 'winner': 'blue'}
+                for match in self.matches for referee in self.referees
+            ],
+            'athlete_scores': [
+                {'category': self.solo.pk, 'athlete': self.red.pk, 'referee': referee.pk, 'score': 8}
+                for referee in self.referees
+            ],
+        }
+        first = self.post(payload).json()
+        self.assertEqual(first, {'referee_scores': 9, 'athlete_scores': 3, 'team_scores': 0, 'winners_updated': 3})
+        self.assertEqual(Match.objects.filter(winner=self.blue).count(), 3)
+
+        second = self.post(payload).json()
+        self.assertEqual(second['winners_updated'], 0)
+        self.assertEqual(RefereeScore.objects.count(), 9)
+        self.assertEqual(CategoryAthleteScore.objects.count(), 3)
+
+    def test_invalid_rows_are_reported_per_row(self):
+        response = self.post({
+            'referee_scores': [
+                {'match': self.matches[0].pk, 'referee': self.referees[0].pk, 'winner': 'red'},
+                {'match': self.matches[0].pk, 'referee': self.blue.pk, 'winner': 'red'},
+            ],
+            'athlete_scores': [{'category': self.solo.pk, 'athlete': self.blue.pk, 'referee': self.referees[0].pk}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['referee_scores'][0], {})
+        self.assertIn('referee', response.json()['referee_scores'][1])
+        self.assertIn('athlete', response.json()['athlete_scores'][0])
+        self.assertFalse(RefereeScore.objects.exists())
+
+
+class LiveFeedTests(TestCase):
+    """
+    Committed writes are pushed to the subscribers of their competition, and a
+    slow subscriber gets a resync instead of an unbounded backlog.
+    """
+
+    def setUp(self):
+        self.competition = Competition.objects.create(name='National Championship', start_date=date(2025, 5, 1))
+        self.category = Category.objects.create(name='Fight -70', competition=self.competition, type='fight')
+        self.red, self.blue, self.referee = [
+            Athlete.objects.create(first_name=name, last_name='Test', date_of_birth=date(2000, 1, 1), is_referee=True)
+            for name in ('Red', 'Blue', 'Referee')
+        ]
+        self.subscriber = broker.subscribe(self.competition.pk)
+        self.addCleanup(broker.unsubscribe, self.subscriber)
+
+    def events(self):
+        frames = [frame.decode().split('\n') for frame in self.subscriber.drain()]
+        return [next(line for line in lines if line.startswith('event:')) for lines in frames]
+
+    def test_match_and_score_events(self):
+        other = broker.subscribe(self.competition.pk + 1)
+        self.addCleanup(broker.unsubscribe, other)
+        with self.captureOnCommitCallbacks(execute=True):
+            match = Match.objects.create(category=self.category, red_corner=self.red, blue_corner=self.blue)
+        with self.captureOnCommitCallbacks(execute=True):
+            RefereeScore.objects.create(match=match, referee=self.referee, winner='red')
+        self.assertEqual(self.events(), ['event: match', 'event: scores'])
+        self.assertEqual(other.drain(), [])
+
+    def test_overflow_sends_resync(self):
+        for _ in range(BUFFER_SIZE + 1):
+            broker.publish(self.competition.pk, 'match', {})
+        events = self.events()
+        self.assertEqual(len(events), BUFFER_SIZE + 1)
+        self.assertEqual(events[0], 'event: resync')
+
+    def test_stream_endpoint(self):
+        response = self.client.get(f'/competition/{self.competition.pk}/live/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(next(response.streaming_content), b'retry: 3000\n\n')
+        response.close()
+        self.assertEqual(self.client.get('/competition/999/live/').status_code, 404)
+
+
+class ChangeFeedTests(TestCase):
+    """
+    The change feed replays committed writes after a cursor, collapsed to the
+    latest state of each row, with tombstones for deleted rows.
+    """
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_user('tablet', password='secret'))
+
+    def feed(self, since, **params):
+        return self.client.get('/changes/', {'since': since, **params}).json()
+
+    def test_upserts_and_tombstones_after_a_cursor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            city = City.objects.create(name='Iasi')
+        cursor = self.feed(0)['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            club = Club.objects.create(name='CS Iasi', city=city)
+        with self.captureOnCommitCallbacks(execute=True):
+            club.name = 'CSM Iasi'
+            club.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            coach = Athlete.objects.create(first_name='Coach', last_name='Test', date_of_birth=date(1980, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            club.coaches.add(coach)
+        city_id, club_id = city.pk, club.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            city.delete()  # Cascades to the club and its coach link
+
+        changes = self.feed(cursor)['changes']
+        latest = {(change['model'], change['id']): change for change in changes}
+        self.assertEqual(len(changes), len(latest))
+        self.assertEqual(latest[('club', club_id)]['action'], 'delete')
+        self.assertEqual(latest[('city', city_id)]['action'], 'delete')
+        self.assertEqual(latest[('athlete', coach.pk)]['data']['first_name'], 'Coach')
+        self.assertEqual([change['action'] for change in changes if change['model'] == 'club_coaches'], ['delete'])
+
+    def test_pages_resume_from_the_cursor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.bulk_create(City(name=f'City {i}') for i in range(5))
+            ChangeLogEntry.record(City, City.objects.values_list('pk', flat=True))
+        first = self.feed(0, limit=3)
+        second = self.feed(first['cursor'], limit=3)
+        self.assertEqual((first['more'], second['more']), (True, False))
+        self.assertEqual(len(first['changes']) + len(second['changes']), 5)
+        self.assertEqual(self.client.get('/changes/', {'since': 'x'}).status_code, 400)
+
+    def test_cascaded_deletes_are_logged_in_one_insert(self):
+        athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1))
+            for i in range(4)
+        ]
+
+        def delete_competition(matches):
+            competition = Competition.objects.create(name='Cup', start_date=date(2025, 5, 1))
+            category = Category.objects.create(name='Fight', competition=competition, type='fight')
+            for i in range(matches):
+                red, blue = athletes[i % 4], athletes[(i + 1) % 4]
+                with self.captureOnCommitCallbacks(execute=True):
+                    Match.objects.create(category=category, red_corner=red, blue_corner=blue, winner=red)
+            match_ids = set(category.matches.values_list('pk', flat=True))
+            cursor = self.feed(0)['cursor']
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                competition.delete()
+            statements = [query['sql'] for query in queries]  # Read before the feed request resets the query log
+            changes = self.feed(cursor)['changes']
+            self.assertEqual({change['id'] for change in changes if change['model'] == 'match'}, match_ids)
+            self.assertEqual({change['action'] for change in changes}, {'delete'})
+            return statements
+
+        small, large = delete_competition(2), delete_competition(20)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len([sql for sql in large if 'INSERT INTO "api_changelogentry"' in sql]), 1)
+
+    def test_cursor_waits_for_an_earlier_transaction(self):
+        """
+        Transaction A logs its change first but commits after transaction B:
+        the feed holds at A's missing id instead of moving past it.
+        """
+        cursor = self.feed(0)['cursor']
+        first, second = City.objects.bulk_create([City(name='Iasi'), City(name='Cluj')])
+        # B commits; A's entry, with the lower id, is not visible yet
+        ChangeLogEntry.objects.create(pk=cursor + 2, model='city', object_id=second.pk, action='upsert')
+        page = self.feed(cursor)
+        self.assertEqual((page['changes'], page['cursor'], page['more']), ([], cursor, False))
+
+        ChangeLogEntry.objects.create(pk=cursor + 1, model='city', object_id=first.pk, action='upsert')
+        page = self.feed(cursor)
+        self.assertEqual([change['id'] for change in page['changes']], [first.pk, second.pk])
+        self.assertEqual(page['cursor'], cursor + 2)
+
+        # A gap older than the settle time was a rolled back transaction
+        ChangeLogEntry.objects.create(pk=cursor + 4, model='city', object_id=first.pk, action='upsert')
+        ChangeLogEntry.objects.filter(pk=cursor + 4).update(changed=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(self.feed(cursor + 2)['cursor'], cursor + 4)
+
+
+class SparseFieldsTests(TestCase):
+    """
+    ?fields= and ?expand= select what is serialized and what is read.
+    """
+
+    def setUp(self):
+        city = City.objects.create(name='Iasi')
+        self.club = Club.objects.create(name='CS Iasi', city=city)
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1), club=self.club, city=city)
+            for i in range(3)
+        ]
+        self.club.coaches.add(self.athletes[0])
+
+    def test_fields_read_only_the_selected_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/athlete/', {'fields': 'id,first_name'})
+        self.assertEqual(response.json()['results'][0], {'id': self.athletes[0].pk, 'first_name': 'Athlete 0'})
+        self.assertNotIn('last_name', queries.captured_queries[0]['sql'])
+        self.assertEqual(self.client.get('/athlete/', {'fields': 'id,unknown'}).status_code, 400)
+
+    def test_expand_nests_relations_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/athlete/', {'fields': 'id,club', 'expand': 'club'})
+        self.assertEqual(response.json()['results'][0]['club'], {'id': self.club.pk, 'name': 'CS Iasi'})
+
+    def test_club_default_stays_expanded(self):
+        club = self.client.get('/club/').json()['results'][0]
+        self.assertEqual(club['city']['name'], 'Iasi')
+        self.assertEqual(club['coaches'][0]['first_name'], 'Athlete 0')
+        # count, clubs; coaches are not read when not asked for
+        with self.assertNumQueries(2):
+            self.client.get('/club/', {'fields': 'id,name'})
+
+
+class BenchmarkCommandTests(TestCase):
+    """
+    The data generator and the endpoint benchmark run end to end at a small scale.
+    """
+
+    def test_generate_and_benchmark(self):
+        import os
+        import tempfile
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        call_command(
+            'generate_federation', athletes=300, clubs=10, seasons=2, competitions_per_season=1,
+            categories_per_competition=3, category_size=8, stdout=StringIO(),
+        )
+        self.assertEqual(Athlete.objects.count(), 300)
+        self.assertTrue(Match.objects.filter(winner__isnull=False).exists())
+        self.assertTrue(RefereeScore.objects.exists())
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'benchmark.json')
+            call_command('benchmark_api', repeat=2, only='/athlete/', output=output, stderr=StringIO())
+            with open(output) as file:
+                report = json.load(file)
+        urls = {row['url']: row for row in report['endpoints']}
+        self.assertEqual(urls['/athlete/']['status'], 200)
+        self.assertIn('p99_ms', urls['/athlete/'])
+
+
+class ProfilingTests(TestCase):
+    """
+    Sampled requests are recorded with their view, query and timing breakdown.
+    """
+
+    def test_sampled_request_is_recorded(self):
+        from django.contrib.auth.models import User
+        from django.test import override_settings
+
+        from rest_framework.serializers import ListSerializer, Serializer
+
+        from .profiling import samples
+
+        serializer_data, list_serializer_data = Serializer.__dict__['data'], ListSerializer.__dict__['data']
+        Category.objects.create(name='Kata', competition=Competition.objects.create(name='Cup'))
+        samples.clear()
+        with override_settings(PROFILING_SAMPLE_RATE=1), self.assertLogs('api.profiling', 'INFO'):
+            self.client.get('/category/')
+        sample = samples[-1]
+        self.assertEqual(sample['view'], 'CategoryViewSet.list')
+        self.assertEqual(sample['status'], 200)
+        self.assertGreater(sample['queries'], 0)
+        self.assertGreater(sample['serializer_ms'], 0)
+        self.assertGreater(sample['bytes'], 0)
+        # The serializer timing is only installed while a sampled request runs
+        self.assertIs(Serializer.__dict__['data'], serializer_data)
+        self.assertIs(ListSerializer.__dict__['data'], list_serializer_data)
+
+        with override_settings(PROFILING_SAMPLE_RATE=0):
+            self.assertEqual(self.client.get('/profiling/').status_code, 302)  # Staff only
+            self.client.force_login(User.objects.create_user('staff', is_staff=True))
+            body = self.client.get('/profiling/', {'view': 'CategoryViewSet.list'}).json()
+        self.assertEqual(body['samples'][0]['path'], '/category/')
+        self.assertEqual(body['summary'][0]['samples'], 1)
+
+
+class MetricsTests(TestCase):
+    """
+    The /metrics exposition and the per-thread sharded metrics behind it.
+    """
+
+    def test_sharded_counter_sums_threads(self):
+        import threading
+
+        from .metrics import Counter, Histogram, registry
+
+        counter = Counter('test_events_total', "Test events.", ('kind',))
+        histogram = Histogram('test_seconds', "Test timings.", buckets=(0.1, 1))
+        registry.remove(counter)
+        registry.remove(histogram)
+
+        def work():
+            for _ in range(1000):
+                counter.inc('a')
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(dict(counter.collect()), {('a',): 4000})
+        self.assertEqual((counter._shards, histogram._shards), ([], []))  # Folded in as the threads exited
+        lines = histogram.expose()
+        self.assertIn('test_seconds_bucket{le="0.1"} 0', lines)
+        self.assertIn('test_seconds_bucket{le="1"} 4000', lines)
+        self.assertIn('test_seconds_count 4000', lines)
+
+    def test_exposition(self):
+        from django.test import override_settings
+
+        Category.objects.create(name='Kata', competition=Competition.objects.create(name='Cup'))
+        self.client.get('/category/')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)  # No scraper is allowed by default
+        with override_settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="CategoryViewSet.list",method="GET",status="200"}', body)
+        self.assertIn('http_request_queries_count{view="CategoryViewSet.list"}', body)
+        self.assertIn('signal_handler_duration_seconds_count{handler="bump_api_table_version"}', body)
+
+        with override_settings(METRICS_TOKEN='scrape'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer other').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+
+class PlacementTests(TestCase):
+    """
+    Placements are materialized from the category place fields and feed the medal tables.
+    """
+
+    def setUp(self):
+        self.competition = Competition.objects.create(name='Cup', start_date=date(2025, 5, 1))
+        self.red, self.blue = Club.objects.create(name='Red'), Club.objects.create(name='Blue')
+        self.athletes = [
+            Athlete.objects.create(
+                first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1),
+                club=self.red if i < 3 else self.blue,
+            )
+            for i in range(5)
+        ]
+        self.solo = Category.objects.create(name='Solo', competition=self.competition, type='solo')
+        for athlete in self.athletes[2:]:
+            CategoryAthlete.objects.create(category=self.solo, athlete=athlete)
+        self.solo.first_place, self.solo.second_place, self.solo.third_place = self.athletes[3], self.athletes[2], self.athletes[4]
+        self.solo.save()
+
+        self.team = Team.objects.create()
+        for athlete in self.athletes[:2]:
+            TeamMember.objects.create(team=self.team, athlete=athlete)
+        self.teams = Category.objects.create(name='Teams', competition=self.competition, type='teams')
+        CategoryTeam.objects.create(category=self.teams, team=self.team)
+        self.teams.first_place_team = self.team
+        self.teams.save()
+
+    def test_medal_tables(self):
+        self.assertEqual(self.competition.placements.count(), 5)  # Both team members get a row
+
+        medals = self.client.get(f'/competition/{self.competition.pk}/medals/').json()['medals']
+        self.assertEqual(
+            [(row['club']['name'], row['gold'], row['silver'], row['bronze'], row['rank']) for row in medals],
+            [('Red', 1, 1, 0, 1), ('Blue', 1, 0, 1, 2)],  # The team gold counts once for Red
+        )
+        self.assertEqual(self.client.get('/medals/', {'season': 2025}).json()['medals'][0]['club']['name'], 'Red')
+        self.assertEqual(self.client.get('/medals/', {'season': 2024}).json()['medals'], [])
+        self.assertEqual(self.client.get('/medals/', {'season': 'next'}).status_code, 400)
+
+        rankings = self.client.get('/club/rankings/').json()['rankings']
+        self.assertEqual([(row['club']['name'], row['points']) for row in rankings], [('Red', 5), ('Blue', 4)])
+
+        body = self.client.get(f'/athlete/{self.athletes[0].pk}/medals/').json()
+        self.assertEqual((body['gold'], body['silver'], body['bronze'], body['total']), (1, 0, 0, 1))
+        self.assertEqual(body['placements'][0]['team'], self.team.pk)
+
+    def test_placements_follow_changes(self):
+        # A transfer keeps past medals with the old club
+        self.athletes[3].club = self.red
+        self.athletes[3].save()
+        self.solo.save()
+        self.assertEqual(self.solo.placements.get(place=1).club, self.blue)
+
+        self.solo.first_place = None
+        self.solo.save()
+        self.assertFalse(self.solo.placements.filter(place=1).exists())
+
+        TeamMember.objects.create(team=self.team, athlete=self.athletes[3])
+        self.assertEqual(self.teams.placements.count(), 3)
+
+        self.competition.start_date = date(2024, 9, 1)
+        self.competition.save()
+        self.assertEqual(set(self.competition.placements.values_list('season', flat=True)), {2024})
+
+
+class RatingTests(TestCase):
+    """
+    Ratings follow decided matches incrementally and match a full replay.
+    """
+
+    def setUp(self):
+        competition = Competition.objects.create(name='Cup', start_date=date(2025, 5, 1))
+        self.category = Category.objects.create(name='Fight -70', competition=competition, type='fight', gender='male')
+        self.athletes = [
+            Athlete.objects.create(first_name=f'Athlete {i}', last_name='Test', date_of_birth=date(2000, 1, 1))
+            for i in range(3)
+        ]
+        for athlete in self.athletes:
+            CategoryAthlete.objects.create(category=self.category, athlete=athlete, weight=68)
+
+    def fight(self, red, blue, winner):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Match.objects.create(category=self.category, red_corner=red, blue_corner=blue, winner=winner)
+
+    def ratings(self):
+        return dict(AthleteRating.objects.values_list('athlete_id', 'rating'))
+
+    def test_incremental_updates_match_the_replay(self):
+        from .ratings import recompute_ratings
+
+        first, second, third = self.athletes
+        match = self.fight(first, second, first)
+        self.assertEqual(self.ratings(), {first.pk: 1520, second.pk: 1480})
+        self.fight(second, third, third)
+        self.fight(third, first, third)
+        incremental = self.ratings()
+        self.assertEqual(recompute_ratings(), 3)
+        self.assertEqual(self.ratings(), incremental)
+        rating = AthleteRating.objects.get(athlete=third)
+        self.assertEqual((rating.matches, rating.wins, rating.gender, rating.weight_class), (2, 2, 'male', '-70'))
+
+        # A corrected result requests a replay of the history, run out of band
+        match.winner = second
+        with self.captureOnCommitCallbacks(execute=True):
+            match.save()
+        self.assertEqual(self.ratings(), incremental)
+        self.assertIsNotNone(RatingReplay.objects.get().requested)
+        call_command('recompute_ratings', pending=True, stdout=StringIO())
+        self.assertEqual(RatingChange.objects.get(match=match).winner, second)
+        self.assertLess(self.ratings()[first.pk], 1480)  # Lost both of its matches now
+        self.assertIsNone(RatingReplay.objects.get().requested)
+        output = StringIO()
+        call_command('recompute_ratings', pending=True, stdout=output)
+        self.assertEqual(output.getvalue(), "Ratings are up to date.\n")
+
+    def test_leaderboard_and_seeding(self):
+        first, second, third = self.athletes
+        self.fight(first, second, first)
+        self.fight(third, second, third)
+
+        leaderboard = self.client.get('/ratings/', {'gender': 'male', 'weight_class': '-70'}).json()['leaderboard']
+        self.assertEqual([row['athlete'] for row in leaderboard], [first.pk, third.pk, second.pk])
+        self.assertEqual(leaderboard[0]['rank'], 1)
+        self.assertEqual(self.client.get('/ratings/', {'gender': 'female'}).json()['leaderboard'], [])
+        self.assertEqual(self.client.get('/ratings/', {'grade': 'black'}).status_code, 400)
+
+        generate_bracket(self.category, seeding='rating')
+        self.assertEqual(CategoryAthlete.objects.get(category=self.category, bracket_slot=0).athlete, first)
+
+    def test_edits_that_keep_the_winner_are_not_rated(self):
+        first, second, _ = self.athletes
+        match = Match.objects.get(pk=self.fight(first, second, first).pk)
+        match.mat = 2
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            match.save()
+        self.assertFalse([query for query in queries if 'rating' in query['sql']])
+        # Reading the matches to rate takes no lock when they are all rated
+        with CaptureQueriesContext(connection) as queries:
+            rate_matches([match.pk])
+        self.assertEqual(len(queries), 1)
+
+    def test_leaderboard_heavyweights(self):
+        first, second, third = self.athletes
+        CategoryAthlete.objects.filter(athlete=third).update(weight=95)
+        self.fight(first, third, third)
+        self.fight(second, first, second)
+        body = self.client.get('/ratings/', {'weight_class': '+90'}).json()  # Sent URL-encoded as %2B90
+        self.assertEqual(body['weight_class'], '+90')
+        self.assertEqual([row['athlete'] for row in body['leaderboard']], [third.pk])
+
+    def test_every_leaderboard_reads_an_index(self):
+        from itertools import combinations
 
-# Create your tests here.
+        filters = {'gender': 'male', 'weight_class': '-70', 'grade': 1}
+        for count in range(len(filters) + 1):
+            for fields in combinations(filters, count):
+                query = AthleteRating.objects.filter(**{field: filters[field] for field in fields})
+                plan = query.order_by('-rating', 'athlete_id')[:10].explain()
+                self.assertIn('USING INDEX', plan, fields)
+                self.assertNotIn('TEMP B-TREE', plan, fields)  # Ordered by the index, not sorted
+                for field in fields:  # Every filter is a lookup in the index, not a check of the rows it scans
+                    self.assertIn(f'{AthleteRating._meta.get_field(field).column}=?', plan, fields)
@@ -2,6 +2,10 @@ from django.contrib import admin
 from django.urls import path, include
 from .views import *
 from . import views
+from . import exports
+from . import live
+from . import metrics
+from . import profiling
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -24,5 +28,15 @@ router.register('group', GroupViewSet, basename='group')
 
 
 urlpatterns = [
+    path('export/athletes/', exports.export_athletes, name='export-athletes'),
+    path('export/grade-history/', exports.export_grade_history, name='export-grade-history'),
+    path('export/results/', exports.export_results, name='export-results'),
+    path('scores/', views.ingest_scores, name='ingest-scores'),
+    path('changes/', views.changes, name='changes'),
+    path('medals/', views.medals, name='medals'),
+    path('ratings/', views.rating_leaderboard, name='rating-leaderboard'),
+    path('competition/<int:pk>/live/', live.competition_live, name='competition-live'),
+    path('metrics', metrics.metrics_view, name='metrics'),
+    path('profiling/', profiling.profiling_samples, name='profiling'),
     path('', include(router.urls)),  # This will handle the actual endpoints
 ]
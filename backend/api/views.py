@@ -1,23 +1,62 @@
+from datetime import date, timedelta
+
 from django.shortcuts import render
-from rest_framework.decorators import api_view
-from rest_framework import viewsets, permissions
+from rest_framework.decorators import api_view, action, permission_classes
+from rest_framework import viewsets, permissions, serializers
+from django.apps import apps
+from django.db.models import Count, Prefetch, Q
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.utils import timezone
 from .serializers import *
 from .models import *
+from .filters import AthleteFilter, TeamFilter, MatchFilter
+from .pagination import StandardResultsSetPagination, KeysetPagination
+from .brackets import generate_bracket
+from .cache import PAYLOAD_TIMEOUT, versioned_cache_key
+from .metrics import record_cache
+from .conditional import ConditionalGetMixin
+from .scheduling import DEFAULT_REST_SLOTS, schedule_competition
+from . import reference
 from rest_framework.response import Response
 # Create your views here.
 
-class CityViewSet(viewsets.ViewSet):
+class ReferenceTableMixin(ConditionalGetMixin):
+    """
+    Serve list() and retrieve() from a cached reference table (see api.reference).
+    Conditional GETs are validated against the same table versions.
+    """
+    reference_table = None
+
+    def get_conditional_models(self):
+        return (self.reference_table.model, *self.reference_table.depends_on)
+
+    def list(self, request):
+        rows = self.reference_table.rows()
+        page = self.paginate_queryset(list(rows.values()))
+        if page is not None:
+            return self.get_paginated_response(self.serializer_class(page, many=True).data)
+        return Response(self.serializer_class(rows.values(), many=True).data)
+
+    def retrieve(self, request, pk=None):
+        try:
+            instance = self.reference_table.rows()[int(pk)]
+        except (KeyError, ValueError):
+            raise Http404
+        return Response(self.serializer_class(instance).data)
+
+
+class CityViewSet(ReferenceTableMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = City.objects.all()
     serializer_class = CitySerializer
-
-    def list(self, request):
-        queryset = City.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+    pagination_class = StandardResultsSetPagination
+    reference_table = reference.cities
     
-class CompetitionViewSet(viewsets.ViewSet):
+class CompetitionViewSet(ConditionalGetMixin, viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (Competition,)
     queryset = Competition.objects.all()
     serializer_class = CompetitionSerializer
     def list(self, request):
@@ -45,17 +84,149 @@ class CompetitionViewSet(viewsets.ViewSet):
         instance = self.queryset.get(pk=pk)
         instance.delete()
         return Response(status=204)
-    
 
-class ClubViewSet(viewsets.ViewSet):
+    # Tables the full competition document is built from
+    full_document_models = (
+        Competition, Group, Category, CategoryAthlete, CategoryTeam, Team, TeamMember,
+        Match, Match.referees.through, Athlete, Club,
+    )
+
+    @action(detail=True, methods=['get'])
+    def full(self, request, pk=None):
+        """
+        Return the competition with its groups, categories, enrolled athletes,
+        teams, matches and placements, built in a fixed number of queries and
+        cached until one of the underlying tables changes.
+        """
+        cache_key = versioned_cache_key('competition-full', self.full_document_models, pk)
+        data = cache.get(cache_key)
+        record_cache('competition-full', data is not None)
+        if data is None:
+            competition = get_object_or_404(self.get_full_queryset(), pk=pk)
+            data = CompetitionFullSerializer(competition).data
+            cache.set(cache_key, data, PAYLOAD_TIMEOUT)
+        return Response(data)
+
+    def get_full_queryset(self):
+        athletes = CategoryAthlete.objects.select_related('athlete__club').order_by('athlete__last_name', 'athlete__first_name')
+        teams = Team.objects.prefetch_related(
+            Prefetch('members', queryset=TeamMember.objects.select_related('athlete__club'))
+        )
+        matches = Match.objects.select_related(
+            'red_corner__club', 'blue_corner__club'
+        ).prefetch_related('referees').order_by('id')
+        categories = Category.objects.select_related(
+            'group',
+            'first_place', 'second_place', 'third_place',
+            'first_place_team', 'second_place_team', 'third_place_team',
+        ).prefetch_related(
+            Prefetch('enrolled_athletes', queryset=athletes),
+            Prefetch('teams', queryset=teams),
+            Prefetch('matches', queryset=matches),
+        ).order_by('id')
+        return Competition.objects.prefetch_related(
+            Prefetch('groups', queryset=Group.objects.order_by('name')),
+            Prefetch('categories', queryset=categories),
+        )
+
+    @action(detail=True, methods=['get'])
+    def medals(self, request, pk=None):
+        """
+        Medal table of the competition's clubs, read from the materialized placements.
+        """
+        competition = get_object_or_404(Competition, pk=pk)
+        serializer = MedalTableRowSerializer(Placement.medal_table(competition=competition), many=True)
+        return Response({'competition': competition.pk, 'medals': serializer.data})
+
+    @action(detail=True, methods=['get', 'post'])
+    def schedule(self, request, pk=None):
+        """
+        GET the mat schedule of the competition, or POST to place the pending
+        matches (body: optional `rest` in slots and `replan` to place every
+        pending match again instead of only the unscheduled ones).
+        """
+        competition = get_object_or_404(Competition, pk=pk)
+        if request.method == 'POST':
+            try:
+                rest = int(request.data.get('rest', DEFAULT_REST_SLOTS))
+            except (TypeError, ValueError):
+                return Response({'rest': ['A valid integer is required.']}, status=400)
+            if rest < 0:
+                return Response({'rest': ['Ensure this value is greater than or equal to 0.']}, status=400)
+            try:
+                schedule_competition(competition, rest=rest, replan=bool(request.data.get('replan')))
+            except ValueError as error:
+                return Response({'mat_count': [str(error)]}, status=400)
+        matches = (
+            Match.objects.filter(category__competition=competition, slot__isnull=False)
+            .select_related('category', 'red_corner__club', 'blue_corner__club')
+            .prefetch_related('referees')
+            .order_by('slot', 'mat')
+        )
+        return Response({'mat_count': competition.mat_count, 'matches': MatchSerializer(matches, many=True).data})
+
+
+class ClubViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (Club, City, Athlete, Club.coaches.through)
     queryset = Club.objects.all()
     serializer_class = ClubSerializer
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        return Club.objects.order_by('name')
+
+    @action(detail=False, methods=['get'])
+    def rankings(self, request):
+        """
+        Clubs ranked by medal points (3 per gold, 2 per silver, 1 per bronze),
+        over all seasons or the one given as `?season=`.
+        """
+        season = season_from_query(request.query_params)
+        filters = {} if season is None else {'season': season}
+        serializer = MedalTableRowSerializer(Placement.medal_table(by_points=True, **filters), many=True)
+        return Response({'season': season, 'rankings': serializer.data})
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Every club with its number of athletes and of athletes holding a
+        valid or an expired annual visa, counted in one query so the
+        dashboard does not download the athlete and visa tables.
+        """
+        valid_since = date.today() - timedelta(days=365)  # AnnualVisa.is_valid
+        valid = Q(athletes__annual_visas__visa_status='available', athletes__annual_visas__issued_date__gte=valid_since)
+        expired = Q(athletes__annual_visas__visa_status='expired') & (
+            Q(athletes__annual_visas__issued_date__isnull=True) | Q(athletes__annual_visas__issued_date__lt=valid_since)
+        )
+        clubs = self.get_queryset().annotate(
+            athlete_count=Count('athletes', distinct=True),
+            valid_visa_count=Count('athletes', filter=valid, distinct=True),
+            expired_visa_count=Count('athletes', filter=expired, distinct=True),
+        )
+        return Response(ClubStatsSerializer(clubs, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def medals(self, request, pk=None):
+        """
+        The podium places won by the club's athletes and teams.
+        """
+        club = get_object_or_404(Club, pk=pk)
+        placements = club.placements.select_related('competition', 'category', 'team', 'athlete').order_by('-season', 'place', 'id')
+        counts = placements.aggregate(**Placement.medal_counts())
+        return Response({
+            'club': club.pk,
+            **counts,
+            'total': sum(counts.values()),
+            'placements': ClubPlacementSerializer(placements, many=True).data,
+        })
 
     def list(self, request):
-        queryset = Club.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        context = self.serializer_class.context_from_query(request.query_params)
+        queryset = self.serializer_class(context=context).optimize_queryset(self.get_queryset())
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.serializer_class(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -65,8 +236,9 @@ class ClubViewSet(viewsets.ViewSet):
         return Response(serializer.errors, status=400)
 
     def retrieve(self, request, pk=None):
-        queryset = self.queryset.get(pk=pk)
-        serializer = self.serializer_class(queryset)
+        context = self.serializer_class.context_from_query(request.query_params)
+        queryset = self.serializer_class(context=context).optimize_queryset(self.get_queryset())
+        serializer = self.serializer_class(queryset.get(pk=pk), context=context)
         return Response(serializer.data)
 
     def update(self, request, pk=None):
@@ -82,16 +254,71 @@ class ClubViewSet(viewsets.ViewSet):
         instance.delete()
         return Response(status=204)
 
-class AthleteViewSet(viewsets.ViewSet):
+class AthleteViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (Athlete,)
     queryset = Athlete.objects.all()
     serializer_class = AthleteSerializer
+    pagination_class = KeysetPagination
+    filterset_class = AthleteFilter
+    search_fields = ['first_name', 'last_name']
+    ordering_fields = ['id']  # The cursor needs a unique ordering
 
-    def list(self, request):
-        queryset = Athlete.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
+    def get_queryset(self):
+        return Athlete.objects.all()
+
+    def get_conditional_models(self):
+        # Nested relations are part of the representation, so their tables count too
+        return (Athlete, *self.serializer_class.expanded_models(self.request.GET))
+
+    def get_profile_queryset(self):
+        enrollments = CategoryAthlete.objects.select_related('category__competition').order_by('category__competition__start_date', 'id')
+        memberships = TeamMember.objects.select_related('team').prefetch_related(
+            Prefetch('team__categories', queryset=Category.objects.select_related('competition'))
+        )
+        return Athlete.objects.select_related(
+            'club', 'city', 'current_grade', 'federation_role', 'title'
+        ).prefetch_related(
+            Prefetch('grade_history', queryset=GradeHistory.objects.select_related('grade').order_by('-grade__rank_order', 'id')),
+            Prefetch('annual_visas', queryset=AnnualVisa.objects.order_by('-issued_date')),
+            Prefetch('medical_visas', queryset=MedicalVisa.objects.order_by('-issued_date')),
+            Prefetch('training_seminars', queryset=TrainingSeminar.objects.order_by('-start_date')),
+            Prefetch('categoryathlete_set', queryset=enrollments),
+            Prefetch('team_members', queryset=memberships),
+        )
+
+    @action(detail=True, methods=['get'])
+    def medals(self, request, pk=None):
+        """
+        The athlete's medal count and podium places, team medals included.
+        """
+        athlete = get_object_or_404(Athlete, pk=pk)
+        placements = athlete.placements.select_related('competition', 'category', 'team').order_by('-season', 'place', 'id')
+        counts = placements.aggregate(**Placement.medal_counts())
+        return Response({
+            'athlete': athlete.pk,
+            **counts,
+            'total': sum(counts.values()),
+            'placements': PlacementSerializer(placements, many=True).data,
+        })
+
+    @action(detail=True, methods=['get'])
+    def profile(self, request, pk=None):
+        """
+        Return the athlete with grade history, visas, seminars, results and
+        matches in one response, built from a bounded set of queries.
+        """
+        athlete = get_object_or_404(self.get_profile_queryset(), pk=pk)
+        serializer = AthleteProfileSerializer(athlete)
         return Response(serializer.data)
 
+    def list(self, request):
+        context = self.serializer_class.context_from_query(request.query_params)
+        queryset = self.serializer_class(context=context).optimize_queryset(self.get_queryset())
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.serializer_class(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
@@ -100,8 +327,9 @@ class AthleteViewSet(viewsets.ViewSet):
         return Response(serializer.errors, status=400)
 
     def retrieve(self, request, pk=None):
-        queryset = self.queryset.get(pk=pk)
-        serializer = self.serializer_class(queryset)
+        context = self.serializer_class.context_from_query(request.query_params)
+        queryset = self.serializer_class(context=context).optimize_queryset(self.get_queryset())
+        serializer = self.serializer_class(queryset.get(pk=pk), context=context)
         return Response(serializer.data)
 
     def update(self, request, pk=None):
@@ -117,15 +345,12 @@ class AthleteViewSet(viewsets.ViewSet):
         instance.delete()
         return Response(status=204)
     
-class TitleViewSet(viewsets.ViewSet):
+class TitleViewSet(ReferenceTableMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Title.objects.all()
     serializer_class = TitleSerializer
-
-    def list(self, request):
-        queryset = Title.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+    pagination_class = None
+    reference_table = reference.titles
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -134,11 +359,6 @@ class TitleViewSet(viewsets.ViewSet):
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
 
-    def retrieve(self, request, pk=None):
-        queryset = self.queryset.get(pk=pk)
-        serializer = self.serializer_class(queryset)
-        return Response(serializer.data)
-
     def update(self, request, pk=None):
         instance = self.queryset.get(pk=pk)
         serializer = self.serializer_class(instance, data=request.data)
@@ -153,24 +373,19 @@ class TitleViewSet(viewsets.ViewSet):
         return Response(status=204)
     
 
-class FederationRoleViewSet(viewsets.ViewSet):
+class FederationRoleViewSet(ReferenceTableMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = FederationRole.objects.all()
     serializer_class = FederationRoleSerializer
-    def list(self, request):
-        queryset = FederationRole.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+    pagination_class = None
+    reference_table = reference.federation_roles
+
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
-    def retrieve(self, request, pk=None):
-        queryset = self.queryset.get(pk=pk)
-        serializer = self.serializer_class(queryset)
-        return Response(serializer.data)
     def update(self, request, pk=None):
         instance = self.queryset.get(pk=pk)
         serializer = self.serializer_class(instance, data=request.data)
@@ -182,24 +397,19 @@ class FederationRoleViewSet(viewsets.ViewSet):
         instance = self.queryset.get(pk=pk)
         instance.delete()
         return Response(status=204)
-class GradeViewSet(viewsets.ViewSet):
+class GradeViewSet(ReferenceTableMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Grade.objects.all()
     serializer_class = GradeSerializer
-    def list(self, request):
-        queryset = Grade.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+    pagination_class = None
+    reference_table = reference.grades
+
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
-    def retrieve(self, request, pk=None):
-        queryset = self.queryset.get(pk=pk)
-        serializer = self.serializer_class(queryset)
-        return Response(serializer.data)
     def update(self, request, pk=None):
         instance = self.queryset.get(pk=pk)
         serializer = self.serializer_class(instance, data=request.data)
@@ -211,52 +421,22 @@ class GradeViewSet(viewsets.ViewSet):
         instance = self.queryset.get(pk=pk)
         instance.delete()
         return Response(status=204)
-class GradeHistoryViewSet(viewsets.ViewSet):
-    permission_classes = [permissions.AllowAny]
-    serializer_class = GradeHistorySerializer
-
-    def get_queryset(self):
-        return GradeHistory.objects.all()
-
-    def list(self, request):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
-
-    def create(self, request):
-        serializer = self.serializer_class(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=201)
-        return Response(serializer.errors, status=400)
-
-    def retrieve(self, request, pk=None):
-        instance = self.get_queryset().get(pk=pk)
-        serializer = self.serializer_class(instance)
-        return Response(serializer.data)
-
-    def update(self, request, pk=None):
-        instance = self.get_queryset().get(pk=pk)
-        serializer = self.serializer_class(instance, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        instance = self.get_queryset().get(pk=pk)
-        instance.delete()
-        return Response(status=204)
-    
-class TeamViewSet(viewsets.ViewSet):
+class TeamViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (Team, Category, CategoryTeam, TeamMember, Athlete)
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
+    filterset_class = TeamFilter
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        return Team.objects.prefetch_related('categories', 'members__athlete').order_by('id')
 
     def list(self, request):
-        queryset = Team.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -284,15 +464,25 @@ class TeamViewSet(viewsets.ViewSet):
         return Response(status=204)
     
 
-class MatchViewSet(viewsets.ViewSet):
+class MatchViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (Match, Category, Athlete, Club, Match.referees.through)
     queryset = Match.objects.all()
     serializer_class = MatchSerializer
+    filterset_class = MatchFilter
+    pagination_class = KeysetPagination
+    ordering_fields = ['id']  # The cursor needs a unique ordering
+
+    def get_queryset(self):
+        return Match.objects.select_related(
+            'category', 'red_corner__club', 'blue_corner__club'
+        ).prefetch_related('referees')
 
     def list(self, request):
-        queryset = Match.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -319,17 +509,24 @@ class MatchViewSet(viewsets.ViewSet):
         instance.delete()
         return Response(status=204)
     
-class AnnualVisaViewSet(viewsets.ViewSet):
+class AnnualVisaViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (AnnualVisa,)
     serializer_class = AnnualVisaSerializer
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        return AnnualVisa.objects.all()
+        return AnnualVisa.objects.order_by('id')
+
+    def get_conditional_variant(self, request):
+        # is_valid depends on today's date, not only on the table
+        return date.today().isoformat()
 
     def list(self, request):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -357,18 +554,39 @@ class AnnualVisaViewSet(viewsets.ViewSet):
         return Response(status=204)
 
 
-class CategoryViewSet(viewsets.ViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
+    MAX_BULK_ENROLLMENTS = 5000
+
     permission_classes = [permissions.AllowAny]
-    queryset = Category.objects.prefetch_related('enrolled_athletes__athlete').all()  # Prefetch athletes for optimization
+    conditional_models = (Category, Competition, Group, CategoryAthlete, CategoryTeam, Team, TeamMember, Athlete)
+    queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        return Category.objects.all()
+        """
+        Load everything CategorySerializer nests in a fixed number of queries,
+        whatever the number of enrolled athletes and teams.
+        """
+        teams = Team.objects.prefetch_related('categories', 'members__athlete')
+        enrolled_athletes = CategoryAthlete.objects.select_related('athlete')  # The athlete's relations are ids
+        return Category.objects.select_related(
+            'competition', 'group',
+            'first_place', 'second_place', 'third_place',
+            'first_place_team', 'second_place_team', 'third_place_team',
+        ).prefetch_related(
+            Prefetch('enrolled_athletes', queryset=enrolled_athletes),
+            Prefetch('teams', queryset=teams),
+            'first_place_team__categories', 'first_place_team__members__athlete',
+            'second_place_team__categories', 'second_place_team__members__athlete',
+            'third_place_team__categories', 'third_place_team__members__athlete',
+        ).order_by('id')
 
     def list(self, request):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -394,20 +612,78 @@ class CategoryViewSet(viewsets.ViewSet):
         instance = self.get_queryset().get(pk=pk)
         instance.delete()
         return Response(status=204)
+
+    @action(detail=False, methods=['post'], url_path='bulk-enroll')
+    def bulk_enroll(self, request):
+        """
+        Enroll many athletes at once from a list of {category, athlete, weight}
+        rows. Nothing is written unless every row is valid.
+        """
+        serializer = CategoryAthleteEnrollmentSerializer(
+            data=request.data, many=True, max_length=self.MAX_BULK_ENROLLMENTS,
+        )
+        if serializer.is_valid():
+            serializer.save()
+            return Response({'created': len(serializer.data)}, status=201)
+        return Response(serializer.errors, status=400)
+
+    @action(detail=True, methods=['get', 'post'])
+    def bracket(self, request, pk=None):
+        """
+        GET the bracket matches of a fight category, or POST to generate them
+        (body: optional `seeding` and `reset`).
+        """
+        category = get_object_or_404(Category, pk=pk)
+        if request.method == 'POST':
+            try:
+                generate_bracket(
+                    category, seeding=request.data.get('seeding', 'grade'), reset=bool(request.data.get('reset')),
+                )
+            except ValueError as exc:
+                return Response({'detail': str(exc)}, status=400)
+        matches = (
+            Match.objects.filter(category=category, round__isnull=False)
+            .select_related('category', 'red_corner__club', 'blue_corner__club')
+            .prefetch_related('referees')
+            .order_by('round', 'bracket_position')
+        )
+        serializer = MatchSerializer(matches, many=True)
+        return Response(serializer.data, status=201 if request.method == 'POST' else 200)
+
+    @action(detail=True)
+    def standings(self, request, pk=None):
+        """
+        Ranked athletes or teams of the category, aggregated by the database.
+        """
+        category = get_object_or_404(Category, pk=pk)
+        serializer = CategoryStandingSerializer(category.standings(), many=True)
+        return Response({'category': category.pk, 'type': category.type, 'standings': serializer.data})
+
+    @action(detail=True, methods=['post'], url_path='recompute-winners')
+    def recompute_winners(self, request, pk=None):
+        """
+        Recompute the winner of every scored match of the category in one pass.
+        """
+        category = get_object_or_404(Category, pk=pk)
+        return Response({'updated': Match.recompute_winners(category)})
     
 
 
-class GradeHistoryViewSet(viewsets.ViewSet):
+class GradeHistoryViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (GradeHistory, Athlete, Grade)
     serializer_class = GradeHistorySerializer
+    pagination_class = KeysetPagination
+    ordering_fields = ['id']  # The cursor needs a unique ordering
 
     def get_queryset(self):
-        return GradeHistory.objects.all()
+        return GradeHistory.objects.select_related('athlete', 'grade')
 
     def list(self, request):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -435,17 +711,24 @@ class GradeHistoryViewSet(viewsets.ViewSet):
         return Response(status=204)
 
 
-class MedicalVisaViewSet(viewsets.ViewSet):
+class MedicalVisaViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (MedicalVisa,)
     serializer_class = MedicalVisaSerializer
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        return MedicalVisa.objects.all()
+        return MedicalVisa.objects.order_by('id')
+
+    def get_conditional_variant(self, request):
+        # is_valid depends on today's date, not only on the table
+        return date.today().isoformat()
 
     def list(self, request):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -473,15 +756,21 @@ class MedicalVisaViewSet(viewsets.ViewSet):
         return Response(status=204)
 
 
-class TrainingSeminarViewSet(viewsets.ViewSet):
+class TrainingSeminarViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
+    conditional_models = (TrainingSeminar, TrainingSeminar.athletes.through, Athlete)
     queryset = TrainingSeminar.objects.all()
     serializer_class = TrainingSeminarSerializer
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        return TrainingSeminar.objects.prefetch_related('athletes').order_by('id')
 
     def list(self, request):
-        queryset = self.queryset
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -508,15 +797,12 @@ class TrainingSeminarViewSet(viewsets.ViewSet):
         instance.delete()
         return Response(status=204)
 
-class GroupViewSet(viewsets.ViewSet):
+class GroupViewSet(ReferenceTableMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
-
-    def list(self, request):
-        queryset = self.queryset
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+    pagination_class = StandardResultsSetPagination
+    reference_table = reference.groups
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -525,11 +811,6 @@ class GroupViewSet(viewsets.ViewSet):
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
 
-    def retrieve(self, request, pk=None):
-        instance = self.queryset.get(pk=pk)
-        serializer = self.serializer_class(instance)
-        return Response(serializer.data)
-
     def update(self, request, pk=None):
         instance = self.queryset.get(pk=pk)
         serializer = self.serializer_class(instance, data=request.data)
@@ -543,6 +824,156 @@ class GroupViewSet(viewsets.ViewSet):
         instance.delete()
         return Response(status=204)
 
+@api_view(['POST'])
+def ingest_scores(request):
+    """
+    Upsert a batch of referee, athlete and team score cards in one request.
+    Re-sending a batch is safe: cards are keyed by match/category and referee.
+    """
+    serializer = ScoreBatchSerializer(data=request.data)
+    if serializer.is_valid():
+        return Response(serializer.save(), status=200)
+    return Response(serializer.errors, status=400)
+
+CHANGES_PAGE_SIZE = 1000
+MAX_CHANGES_PAGE_SIZE = 5000
+# How long a transaction may stay open after writing a change log entry; a
+# gap in the ids older than this is taken as a rolled back transaction
+CHANGES_SETTLE_TIME = timedelta(seconds=60)
+
+
+def settled_entries(entries, since):
+    """
+    Return the leading `(id, ..., changed)` entries that no transaction still
+    open can come before, and whether a gap cut them short.
+
+    Ids are handed out when an entry is written and become visible when its
+    transaction commits, so a missing id may belong to a transaction still
+    running. Serving past it would move the client's cursor beyond a change
+    it never saw; the feed waits until the gap is older than the settle time.
+    """
+    settled_before = timezone.now() - CHANGES_SETTLE_TIME
+    previous = since
+    for index, entry in enumerate(entries):
+        if entry[0] != previous + 1 and entry[-1] > settled_before:
+            return entries[:index], True
+        previous = entry[0]
+    return entries, False
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def changes(request):
+    """
+    Delta sync feed: the rows written after `?since=<cursor>`, in write order.
+
+    Each change is an upsert carrying the current row, or a tombstone for a
+    deleted one. Several writes to the same row in a page collapse into its
+    latest state. Start from `since=0` for a full copy, then keep the returned
+    cursor and call again while `more` is true. A page stops short of
+    changes whose transaction may not have committed yet (see
+    settled_entries), so the cursor never skips one.
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = min(int(request.GET.get('limit', CHANGES_PAGE_SIZE)), MAX_CHANGES_PAGE_SIZE)
+    except ValueError:
+        return Response({'detail': 'since and limit must be integers.'}, status=400)
+    if since < 0 or limit < 1:
+        return Response({'detail': 'since must be positive and limit at least 1.'}, status=400)
+
+    entries = list(
+        ChangeLogEntry.objects.filter(pk__gt=since).order_by('pk')
+        .values_list('pk', 'model', 'object_id', 'action', 'changed')[:limit + 1]
+    )
+    entries, unsettled = settled_entries(entries, since)
+    more = len(entries) > limit and not unsettled
+    entries = entries[:limit]
+
+    latest = {}  # (model, id) -> (cursor, action), in order of the latest write
+    for cursor, model, object_id, action, _ in entries:
+        latest.pop((model, object_id), None)
+        latest[(model, object_id)] = (cursor, action)
+
+    # One query per table for the current rows of the upserts
+    upserted = {}
+    for (model, object_id), (_, action) in latest.items():
+        if action == ChangeLogEntry.UPSERT:
+            upserted.setdefault(model, set()).add(object_id)
+    rows = {}
+    for model, ids in upserted.items():
+        for row in apps.get_model('api', model).objects.filter(pk__in=ids).values():
+            rows[(model, row['id'])] = row
+
+    changes = []
+    for (model, object_id), (cursor, action) in latest.items():
+        row = rows.get((model, object_id)) if action == ChangeLogEntry.UPSERT else None
+        # An upserted row missing now was deleted later, its tombstone is on a later page
+        changes.append({
+            'cursor': cursor, 'model': model, 'id': object_id,
+            'action': ChangeLogEntry.UPSERT if row is not None else ChangeLogEntry.DELETE, 'data': row,
+        })
+    return Response({
+        'cursor': entries[-1][0] if entries else since,
+        'more': more,
+        'changes': changes,
+    })
+
+def season_from_query(query_params):
+    """
+    Return the `?season=` year, or None when it is not given.
+    """
+    season = query_params.get('season')
+    if season in (None, ''):
+        return None
+    try:
+        return int(season)
+    except ValueError:
+        raise serializers.ValidationError({'season': 'Must be a year.'})
+
+
+@api_view(['GET'])
+def medals(request):
+    """
+    Club medal table, golds first, over all seasons or the one given as `?season=`.
+    """
+    season = season_from_query(request.query_params)
+    filters = {} if season is None else {'season': season}
+    serializer = MedalTableRowSerializer(Placement.medal_table(**filters), many=True)
+    return Response({'season': season, 'medals': serializer.data})
+
+
+LEADERBOARD_PAGE_SIZE = 100
+MAX_LEADERBOARD_PAGE_SIZE = 1000
+
+
+@api_view(['GET'])
+def rating_leaderboard(request):
+    """
+    Athletes by rating, best first, narrowed down by any of `?gender=`,
+    `?weight_class=` (e.g. -70, or +90 sent URL-encoded as %2B90) and
+    `?grade=<id>`; page with `?offset=` and `?limit=`. Every combination of
+    filters reads one AthleteRating index.
+    """
+    try:
+        offset = int(request.GET.get('offset', 0))
+        limit = min(int(request.GET.get('limit', LEADERBOARD_PAGE_SIZE)), MAX_LEADERBOARD_PAGE_SIZE)
+    except ValueError:
+        return Response({'detail': 'offset and limit must be integers.'}, status=400)
+    if offset < 0 or limit < 1:
+        return Response({'detail': 'offset must be positive and limit at least 1.'}, status=400)
+
+    ratings = AthleteRating.objects.select_related('athlete__club', 'grade')
+    filters = {field: request.GET[field] for field in ('gender', 'weight_class', 'grade') if request.GET.get(field)}
+    if 'grade' in filters and not filters['grade'].isdigit():
+        return Response({'detail': 'grade must be a grade id.'}, status=400)
+    page = ratings.filter(**filters).order_by('-rating', 'athlete_id')[offset:offset + limit]
+    rows = RatingLeaderboardSerializer(page, many=True).data
+    for rank, row in enumerate(rows, start=offset + 1):
+        row['rank'] = rank
+    return Response({**filters, 'leaderboard': rows})
+
+
 @api_view(['GET'])
 def api_root(request, format=None):
     """
@@ -155,6 +155,8 @@ CKEDITOR_5_UPLOAD_PATH = "uploads/"
 CKEDITOR_5_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -166,6 +168,28 @@ MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Share of requests profiled by api.profiling.ProfilingMiddleware, off unless the
+# PROFILING_SAMPLE_RATE environment variable sets it (e.g. 0.01 for 1%).
+# Samples are served to staff at /profiling/ and logged on the api.profiling logger.
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+
+# Scrapers allowed to read /metrics without logging in (staff always can): by
+# address, which must be the scraper's own and not a proxy's, or by sending
+# `Authorization: Bearer <METRICS_TOKEN>`. Neither is set by default.
+METRICS_ALLOWED_IPS = []
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173'
 ]
@@ -201,6 +225,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Cached API payloads are keyed by table versions (see api/cache.py). When running
+# several worker processes, point this at a shared backend (Redis, Memcached) so
+# every worker sees the same versions.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,3 +1,36 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Event, NewsPost
+
+
+class LandingPageDataCacheTests(TestCase):
+    """
+    The landing page payload is served from the cache until a landing table changes.
+    """
+
+    url = '/landing/landing-page-data/'
+
+    def setUp(self):
+        cache.clear()
+        NewsPost.objects.create(title='Season opener', slug='season-opener', content='<p>Hello</p>', published=True, featured=True)
+        Event.objects.create(
+            title='Nationals', slug='nationals', description='<p>Finals</p>', location='Iasi',
+            start_date=timezone.now() + timedelta(days=3), is_featured=True,
+        )
+
+    def test_warm_request_costs_no_queries(self):
+        self.assertEqual(len(self.client.get(self.url).json()['upcoming_events']), 1)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['featured_news'][0]['title'], 'Season opener')
 
-# Create your tests here.
+    def test_write_invalidates_payload(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            NewsPost.objects.create(title='Second post', slug='second-post', content='<p>Hi</p>', published=True, featured=True)
+        titles = [post['title'] for post in self.client.get(self.url).json()['featured_news']]
+        self.assertIn('Second post', titles)
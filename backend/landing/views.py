@@ -1,9 +1,17 @@
+import math
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
+from django.core.cache import cache
+from django.http import HttpResponse
 from django.utils import timezone
+from api.cache import PAYLOAD_TIMEOUT, versioned_cache_key
+from api.conditional import ConditionalGetMixin
+from api.metrics import record_cache
 from .models import NewsPost, Event, AboutSection, ContactMessage, ContactInfo
 from .serializers import (
     NewsPostSerializer, NewsPostListSerializer,
@@ -12,7 +20,7 @@ from .serializers import (
     ContactMessageCreateSerializer, ContactInfoSerializer
 )
 
-class NewsPostViewSet(viewsets.ModelViewSet):
+class NewsPostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = NewsPost.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -26,6 +34,10 @@ class NewsPostViewSet(viewsets.ModelViewSet):
             return NewsPostListSerializer
         return NewsPostSerializer
 
+    def get_conditional_variant(self, request):
+        # Unpublished posts are only listed for authenticated users
+        return 'staff' if request.user.is_authenticated else 'public'
+
     def get_queryset(self):
         queryset = NewsPost.objects.all()
         
@@ -49,7 +61,7 @@ class NewsPostViewSet(viewsets.ModelViewSet):
         serializer = NewsPostListSerializer(recent_posts, many=True)
         return Response(serializer.data)
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -63,6 +75,10 @@ class EventViewSet(viewsets.ModelViewSet):
             return EventListSerializer
         return EventSerializer
 
+    def get_conditional_variant(self, request):
+        # is_upcoming / is_past follow the clock, so validators expire every minute
+        return timezone.now().strftime('%Y%m%d%H%M')
+
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get upcoming events"""
@@ -84,13 +100,13 @@ class EventViewSet(viewsets.ModelViewSet):
         serializer = EventListSerializer(featured_events, many=True)
         return Response(serializer.data)
 
-class AboutSectionViewSet(viewsets.ModelViewSet):
+class AboutSectionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = AboutSection.objects.filter(is_active=True)
     serializer_class = AboutSectionSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     ordering = ['order', 'section_title']
 
-class ContactMessageViewSet(viewsets.ModelViewSet):
+class ContactMessageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ContactMessage.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -106,32 +122,52 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         # Save the contact message (frontend form submission)
         serializer.save()
 
-class ContactInfoViewSet(viewsets.ReadOnlyModelViewSet):
+class ContactInfoViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ContactInfo.objects.filter(is_active=True)
     serializer_class = ContactInfoSerializer
 
 # Simple API views for common use cases
-@api_view(['GET'])
-def landing_page_data(request):
-    """Get all data needed for landing page in one API call"""
+LANDING_PAGE_MODELS = (NewsPost, Event, AboutSection, ContactInfo)
+
+
+def build_landing_page_data():
+    """
+    Render the landing page payload to JSON bytes and return it with the number
+    of seconds it stays valid: until the next featured event starts, at which
+    point it drops out of `upcoming_events`.
+    """
+    upcoming_events = list(Event.objects.filter(start_date__gt=timezone.now(), is_featured=True)[:3])
+    contact_info = ContactInfo.objects.filter(is_active=True).first()
     data = {
         'featured_news': NewsPostListSerializer(
             NewsPost.objects.filter(featured=True, published=True)[:3], 
             many=True
         ).data,
-        'upcoming_events': EventListSerializer(
-            Event.objects.filter(start_date__gt=timezone.now(), is_featured=True)[:3],
-            many=True
-        ).data,
+        'upcoming_events': EventListSerializer(upcoming_events, many=True).data,
         'about_sections': AboutSectionSerializer(
             AboutSection.objects.filter(is_active=True),
             many=True
         ).data,
-        'contact_info': ContactInfoSerializer(
-            ContactInfo.objects.filter(is_active=True).first()
-        ).data if ContactInfo.objects.filter(is_active=True).exists() else None
+        'contact_info': ContactInfoSerializer(contact_info).data if contact_info else None
     }
-    return Response(data)
+    timeout = PAYLOAD_TIMEOUT
+    if upcoming_events:
+        until_start = (upcoming_events[0].start_date - timezone.now()).total_seconds()
+        timeout = max(1, min(timeout, math.ceil(until_start)))
+    return JSONRenderer().render(data), timeout
+
+
+@api_view(['GET'])
+def landing_page_data(request):
+    """Get all data needed for landing page in one API call"""
+    # Writes to any landing table change the key (see api.signals)
+    key = versioned_cache_key('landing-page-data', LANDING_PAGE_MODELS)
+    content = cache.get(key)
+    record_cache('landing-page-data', content is not None)
+    if content is None:
+        content, timeout = build_landing_page_data()
+        cache.set(key, content, timeout)
+    return HttpResponse(content, content_type='application/json')
 
 @api_view(['POST'])
 def submit_contact_form(request):
@@ -7,55 +7,53 @@ import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import DeleteDialog from "./DeleteDialog"; // Import the global DeleteDialog component
 
+// One page of the athlete list, with the club and grade names nested by the API
+const ATHLETE_LIST_URL =
+  "athlete/?fields=id,first_name,last_name,profile_image,club,current_grade&expand=club,current_grade";
+
 const Athletes = () => {
   const [myData, setMyData] = useState([]);
-  const [clubs, setClubs] = useState({});
-  const [grades, setGrades] = useState({});
+  const [pageUrl, setPageUrl] = useState(ATHLETE_LIST_URL);
+  const [nextPage, setNextPage] = useState(null);
+  const [previousPage, setPreviousPage] = useState(null);
+  const [search, setSearch] = useState("");
+  const [loading, setLoading] = useState(true);
   const [openDialog, setOpenDialog] = useState(false);
   const [selectedAthlete, setSelectedAthlete] = useState(null);
   const navigate = useNavigate(); // For navigation
 
-  const GetData = async () => {
+  const GetData = async (url) => {
+    setLoading(true);
     try {
-      // Fetch athletes
-      const response = await AxiosInstance.get("athlete/");
-      console.log("Athletes API Response:", response.data);
-
-      // Fetch clubs and grades
-      const clubsResponse = await AxiosInstance.get("club/");
-      const gradesResponse = await AxiosInstance.get("grade/");
-      console.log("Clubs API Response:", clubsResponse.data);
-      console.log("Grades API Response:", gradesResponse.data);
-
-      // Map club and grade IDs to their names
-      const clubsMap = clubsResponse.data.reduce((acc, club) => {
-        acc[club.id] = club.name;
-        return acc;
-      }, {});
-      const gradesMap = gradesResponse.data.reduce((acc, grade) => {
-        acc[grade.id] = grade.name;
-        return acc;
-      }, {});
-
-      setClubs(clubsMap);
-      setGrades(gradesMap);
+      // Fetch one cursor page; the table pages through the `next`/`previous` links
+      const response = await AxiosInstance.get(url);
 
       // Transform athlete data
-      const transformedData = response.data.map((athlete) => ({
+      const transformedData = response.data.results.map((athlete) => ({
         ...athlete,
-        club: clubsMap[athlete.club] || "N/A", // Map club ID to name
-        grade: gradesMap[athlete.current_grade] || "N/A", // Map grade ID to name
+        club: athlete.club?.name || "N/A", // Nested club to name
+        grade: athlete.current_grade?.name || "N/A", // Nested grade to name
       }));
 
       setMyData(transformedData);
+      setNextPage(response.data.next);
+      setPreviousPage(response.data.previous);
     } catch (error) {
       console.error("Error fetching data:", error);
+    } finally {
+      setLoading(false);
     }
   };
 
   useEffect(() => {
-    GetData();
-  }, []);
+    GetData(pageUrl);
+  }, [pageUrl]);
+
+  const handleSearch = (value) => {
+    setSearch(value ?? "");
+    // Searching starts again from the first page
+    setPageUrl(value ? `${ATHLETE_LIST_URL}&search=${encodeURIComponent(value)}` : ATHLETE_LIST_URL);
+  };
 
   const handleDelete = async () => {
     try {
@@ -111,41 +109,52 @@ const Athletes = () => {
   return (
     <div>
       <Box>
-        {myData.length > 0 ? (
-          <MaterialReactTable
-            columns={columns}
-            data={myData}
-            enableRowActions
-            positionActionsColumn="last"
-            renderTopToolbarCustomActions={() => (
-              <Button
-                variant="contained"
-                size="medium"
-                color="primary"
-                onClick={() => navigate("/create-athlete")} // Navigate to the Create Athlete page
-              >
-                Create Athlete
+        <MaterialReactTable
+          columns={columns}
+          data={myData}
+          manualFiltering // Searched by the API, `?search=` on first and last name
+          enableColumnFilters={false}
+          enablePagination={false}
+          onGlobalFilterChange={handleSearch}
+          state={{ globalFilter: search, isLoading: loading }}
+          enableRowActions
+          positionActionsColumn="last"
+          renderTopToolbarCustomActions={() => (
+            <Button
+              variant="contained"
+              size="medium"
+              color="primary"
+              onClick={() => navigate("/create-athlete")} // Navigate to the Create Athlete page
+            >
+              Create Athlete
+            </Button>
+          )}
+          renderBottomToolbarCustomActions={() => (
+            <Box sx={{ display: "flex", gap: 1, padding: 1 }}>
+              <Button disabled={!previousPage} onClick={() => setPageUrl(previousPage)}>
+                Previous
               </Button>
-            )}
-            renderRowActions={({ row }) => (
-              <Box sx={{ display: "flex", flexWrap: "nowrap", gap: "0rem" }}>
-                <IconButton component={Link} to={`edit/${row.original.id}`}>
-                  <EditIcon />
-                </IconButton>
-                <IconButton
-                  onClick={() => {
-                    setSelectedAthlete(row.original); // Set the selected athlete
-                    setOpenDialog(true); // Open the dialog
-                  }}
-                >
-                  <DeleteIcon />
-                </IconButton>
-              </Box>
-            )}
-          />
-        ) : (
-          <p>Loading data or no data available...</p>
-        )}
+              <Button disabled={!nextPage} onClick={() => setPageUrl(nextPage)}>
+                Next
+              </Button>
+            </Box>
+          )}
+          renderRowActions={({ row }) => (
+            <Box sx={{ display: "flex", flexWrap: "nowrap", gap: "0rem" }}>
+              <IconButton component={Link} to={`edit/${row.original.id}`}>
+                <EditIcon />
+              </IconButton>
+              <IconButton
+                onClick={() => {
+                  setSelectedAthlete(row.original); // Set the selected athlete
+                  setOpenDialog(true); // Open the dialog
+                }}
+              >
+                <DeleteIcon />
+              </IconButton>
+            </Box>
+          )}
+        />
       </Box>
 
       {/* Confirmation Dialog */}
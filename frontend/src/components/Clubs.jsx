@@ -3,6 +3,7 @@ import { Box, IconButton, Button, Avatar } from "@mui/material";
 import { Link, useNavigate } from "react-router-dom";
 import { MaterialReactTable } from "material-react-table";
 import AxiosInstance from "./Axios";
+import { fetchAllPages } from "../utils/helpers";
 import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import DeleteDialog from "./DeleteDialog"; // Import the global DeleteDialog component
@@ -15,7 +16,7 @@ const Clubs = () => {
 
   const GetData = async () => {
     try {
-      const response = await AxiosInstance.get("club/");
+      const response = await fetchAllPages("club/");
       console.log("API Response:", response.data);
 
       const transformedData = response.data.map((club) => ({
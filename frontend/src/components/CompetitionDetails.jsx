@@ -79,14 +79,32 @@ export const D3BracketTree = ({ rounds }) => {
   return <svg ref={svgRef} width="800" height="600"></svg>;
 };
 
+// Give a category of the competition document the place fields and team
+// member shape the tabs below read
+const normalizeCategory = (category) => {
+  const { first, second, third } = category.placements;
+  const isTeams = category.type === "teams";
+  return {
+    ...category,
+    first_place: isTeams ? null : first?.id ?? null,
+    second_place: isTeams ? null : second?.id ?? null,
+    third_place: isTeams ? null : third?.id ?? null,
+    first_place_team: isTeams ? first : null,
+    second_place_team: isTeams ? second : null,
+    third_place_team: isTeams ? third : null,
+    first_place_team_name: isTeams ? first?.name ?? null : null,
+    second_place_team_name: isTeams ? second?.name ?? null : null,
+    third_place_team_name: isTeams ? third?.name ?? null : null,
+    teams: category.teams.map((team) => ({ ...team, members: team.members.map((athlete) => ({ athlete })) })),
+  };
+};
+
 const CompetitionDetails = () => {
   const { competitionId } = useParams();
   const [competitionName, setCompetitionName] = useState("");
   const [competitionPlace, setCompetitionPlace] = useState("");
   const [competitionDate, setCompetitionDate] = useState("");
   const [categoriesData, setCategoriesData] = useState([]);
-  const [teamsData, setTeamsData] = useState([]);
-  const [clubsData, setClubsData] = useState([]);
   const [resolvedData, setResolvedData] = useState({});
   const [selectedTab, setSelectedTab] = useState(0); // State for active tab
   const [loading, setLoading] = useState(true);
@@ -99,27 +117,20 @@ const CompetitionDetails = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const competitionsResponse = await AxiosInstance.get("/competition/");
-        const categoriesResponse = await AxiosInstance.get("/category/");
-        const teamsResponse = await AxiosInstance.get("/team/");
-        const clubsResponse = await AxiosInstance.get("/club/");
-        const matchesResponse = await AxiosInstance.get("/match/");
-
-        const competition = competitionsResponse.data.find(
-          (comp) => comp.id === parseInt(competitionId)
+        // Categories with their athletes, teams, matches and placements, in one response
+        const competitionResponse = await AxiosInstance.get(`/competition/${competitionId}/full/`);
+        const competition = competitionResponse.data;
+        setCompetitionName(competition.name || "Competition Details");
+        setCompetitionPlace(competition.place || "Unknown Place");
+        setCompetitionDate(competition.start_date || "Unknown Date");
+
+        const categories = competition.categories.map(normalizeCategory);
+        setCategoriesData(categories);
+        setMatchesData(
+          categories.flatMap((category) =>
+            category.matches.map((match) => ({ ...match, category: category.id, category_name: category.name }))
+          )
         );
-        setCompetitionName(competition?.name || "Competition Details");
-        setCompetitionPlace(competition?.place || "Unknown Place");
-        setCompetitionDate(competition?.date || "Unknown Date");
-
-        const filteredCategories = categoriesResponse.data.filter(
-          (category) => category.competition === parseInt(competitionId)
-        );
-
-        setCategoriesData(filteredCategories);
-        setTeamsData(teamsResponse.data);
-        setClubsData(clubsResponse.data);
-        setMatchesData(matchesResponse.data.filter((match) => match.category_name));
       } catch (error) {
         console.error("Error fetching data:", error);
         setErrorMessage("Failed to fetch data. Please try again.");
@@ -131,121 +142,50 @@ const CompetitionDetails = () => {
     fetchData();
   }, [competitionId]);
 
-  const resolveData = async () => {
+  const resolveData = () => {
     const dataMap = {};
     for (const category of categoriesData) {
       const data =
         category.type === "teams"
-          ? await Promise.all(
-              category.teams.map(async (team) => {
-                const teamData = await AxiosInstance.get(`/team/${team.id}`)
-                  .then((res) => res.data)
-                  .catch((error) => {
-                    console.error("Error fetching team data:", error);
-                    return null;
-                  });
-
-                if (!teamData || !teamData.members) {
-                  console.error("No team data or members found for:", team.name);
-                  return {
-                    id: team.id,
-                    athleteOrTeamName: "No members",
-                    placement: "Participant",
-                    teamMembers: [],
-                    team: {
-                      id: team.id, // Ensure the team ID is included
-                      name: team.name,
-                      group_name: category.group_name || "Unknown Group",
-                      category_name: category.name || "Unknown Category",
-                      gender: category.gender || "Unknown Gender",
-                    },
-                  };
-                }
-
-                const teamMembers = await Promise.all(
-                  teamData.members.map(async (member) => {
-                    const athlete = member.athlete;
-
-                    if (!athlete || !athlete.id) {
-                      console.error("Invalid athlete data:", athlete);
-                      return {
-                        athlete: {
-                          first_name: "Unknown",
-                          last_name: "Athlete",
-                        },
-                        clubName: "Unknown Club",
-                      };
-                    }
-
-                    // Fetch the athlete data to get the club ID
-                    const athleteData = await AxiosInstance.get(`/athlete/${athlete.id}`)
-                      .then((res) => res.data)
-                      .catch((error) => {
-                        console.error(`Error fetching athlete data for ID ${athlete.id}:`, error);
-                        return null;
-                      });
-
-                    if (!athleteData || !athleteData.club) {
-                      console.error(`No club data found for athlete ID ${athlete.id}`);
-                      return {
-                        athlete: {
-                          first_name: athlete.first_name,
-                          last_name: athlete.last_name,
-                        },
-                        clubName: "Unknown Club",
-                      };
-                    }
-
-                    // Fetch the club data using the club ID
-                    const clubData = await AxiosInstance.get(`/club/${athleteData.club}`)
-                      .then((res) => res.data)
-                      .catch((error) => {
-                        console.error(`Error fetching club data for ID ${athleteData.club}:`, error);
-                        return null;
-                      });
-
-                    const clubName = clubData?.name || "Unknown Club";
-                    return {
-                      athlete: {
-                        first_name: athlete.first_name,
-                        last_name: athlete.last_name,
-                      },
-                      clubName,
-                    };
-                  })
-                );
+          ? category.teams.map((team) => {
+              const teamMembers = team.members.map(({ athlete }) => ({
+                athlete: {
+                  first_name: athlete.first_name,
+                  last_name: athlete.last_name,
+                },
+                clubName: athlete.club_name || "Unknown Club",
+              }));
 
-                const placement =
-                  category.first_place_team?.id === team.id
-                    ? "🥇 1st Place"
-                    : category.second_place_team?.id === team.id
-                    ? "🥈 2nd Place"
-                    : category.third_place_team?.id === team.id
-                    ? "🥉 3rd Place"
-                    : "Participant";
-
-                return {
-                  id: team.id,
-                  athleteOrTeamName: teamMembers.map(
-                    (member) => `${member.athlete.first_name} ${member.athlete.last_name} (${member.clubName})`
-                  ).join(" + "), // Combine team members into a single string with "+" between them
-                  placement,
-                  teamMembers, // Include team members for rendering buttons
-                  team: {
-                    id: team.id, // Ensure the team ID is included
-                    name: team.name,
-                    group_name: category.group_name || "Unknown Group",
-                    category_name: category.name || "Unknown Category",
-                    gender: category.gender || "Unknown Gender",
-                  },
-                };
-              })
-            )
+              const placement =
+                category.first_place_team?.id === team.id
+                  ? "🥇 1st Place"
+                  : category.second_place_team?.id === team.id
+                  ? "🥈 2nd Place"
+                  : category.third_place_team?.id === team.id
+                  ? "🥉 3rd Place"
+                  : "Participant";
+
+              return {
+                id: team.id,
+                athleteOrTeamName: teamMembers.length
+                  ? teamMembers.map(
+                      (member) => `${member.athlete.first_name} ${member.athlete.last_name} (${member.clubName})`
+                    ).join(" + ") // Combine team members into a single string with "+" between them
+                  : "No members",
+                placement,
+                teamMembers, // Include team members for rendering buttons
+                team: {
+                  id: team.id, // Ensure the team ID is included
+                  name: team.name,
+                  group_name: category.group_name || "Unknown Group",
+                  category_name: category.name || "Unknown Category",
+                  gender: category.gender || "Unknown Gender",
+                },
+              };
+            })
           : category.enrolled_athletes.map((enrollment) => {
               const athlete = enrollment.athlete;
-              const clubId = athlete.club; // Get the club ID from the athlete object
-              const club = clubsData.find((club) => club.id === clubId); // Find the club using the club ID
-              const clubName = club?.name || "Unknown Club";
+              const clubName = athlete.club_name || "Unknown Club";
 
               return {
                 athleteOrTeamName: `${athlete.first_name} ${athlete.last_name} (${clubName})`,
@@ -267,7 +207,7 @@ const CompetitionDetails = () => {
 
   useEffect(() => {
     resolveData();
-  }, [categoriesData, teamsData, clubsData]);
+  }, [categoriesData]);
 
   const exportToCSV = () => {
     const csvRows = [];
@@ -548,13 +488,6 @@ const CompetitionDetails = () => {
   };
   
 
-  async function fetchData() {
-    const data = await fetch('/api/data');
-    console.log(data);
-  }
-
-  fetchData();
-
   const calculateTotalEnrolledAthletes = () => {
     const athleteIds = new Set();
 
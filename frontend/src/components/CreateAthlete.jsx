@@ -3,6 +3,7 @@ import { Box, Button, Typography, FormControl } from "@mui/material";
 import { useFormik } from "formik";
 import * as Yup from "yup";
 import AxiosInstance from "./Axios";
+import { fetchAllPages } from "../utils/helpers";
 import { useNavigate } from "react-router-dom";
 import TextForm from "./forms/TextForm";
 import SelectForm from "./forms/SelectForm";
@@ -21,7 +22,7 @@ const CreateAthlete = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const clubsResponse = await AxiosInstance.get("club/");
+        const clubsResponse = await fetchAllPages("club/");
         setClubs(clubsResponse.data.map((club) => ({ id: club.id, name: club.name })));
       } catch (error) {
         console.error("Error fetching clubs:", error);
@@ -29,7 +30,7 @@ const CreateAthlete = () => {
       }
 
       try {
-        const citiesResponse = await AxiosInstance.get("city/");
+        const citiesResponse = await fetchAllPages("city/");
         setCities(citiesResponse.data.map((city) => ({ id: city.id, name: city.name })));
       } catch (error) {
         console.error("Error fetching cities:", error);
@@ -1,5 +1,6 @@
 import { React, useState, useEffect } from "react";
 import AxiosInstance from "./Axios";
+import { fetchAllPages } from "../utils/helpers";
 import { Box, FormControl } from "@mui/material";
 import Button from "@mui/material/Button";
 import AddIcon from "@mui/icons-material/Add";
@@ -21,11 +22,11 @@ const CreateClub = () => {
   console.log("Club", club);
 
   const GetData = async () => {
-    AxiosInstance.get("city/").then((res) => {
+    fetchAllPages("city/").then((res) => {
       setCity(res.data);
     });
 
-    AxiosInstance.get("club/").then((res) => {
+    fetchAllPages("club/").then((res) => {
       setClub(res.data);
     });
   };
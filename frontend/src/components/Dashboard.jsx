@@ -6,62 +6,26 @@ import { MaterialReactTable } from "material-react-table";
 import AxiosInstance from "./Axios";
 import "chart.js/auto"; // Automatically register Chart.js components
 import ChartDataLabels from "chartjs-plugin-datalabels"; // Import the datalabels plugin
-import { getClubNameForAthlete } from "../utils/helpers"; // Import utility function to get club name for athlete
 
 // Register required Chart.js components
 ChartJS.register(BarElement, CategoryScale, LinearScale, Tooltip, Legend, ChartDataLabels, ArcElement);
 
 const Dashboard = () => {
   const [clubsData, setClubsData] = useState([]);
-  const [athletesData, setAthletesData] = useState([]);
-  const [annualVisaData, setAnnualVisaData] = useState([]);
   const [competitionsData, setCompetitionsData] = useState([]);
-  const [categoriesData, setCategoriesData] = useState([]);
   const [selectedCompetition, setSelectedCompetition] = useState("");
-  const [teamsData, setTeamsData] = useState([]);
+  const [competitionDocument, setCompetitionDocument] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const clubsResponse = await AxiosInstance.get("/club/");
-        const athletesResponse = await AxiosInstance.get("/athlete/");
-        const annualVisaResponse = await AxiosInstance.get("/annual-visa/");
+        // Athlete and visa counts are aggregated by the API, one row per club
+        const clubsResponse = await AxiosInstance.get("/club/stats/");
         const competitionsResponse = await AxiosInstance.get("/competition/");
-        const categoriesResponse = await AxiosInstance.get("/category/");
-        const teamsResponse = await AxiosInstance.get("/team/");
 
-        // Aggregate data for clubs
-        const clubsWithAggregatedData = clubsResponse.data.map((club) => {
-          const clubAthletes = athletesResponse.data.filter((athlete) => athlete.club === club.id);
-
-          // Filter valid and expired visas based on the API structure
-          const validVisas = clubAthletes.filter((athlete) =>
-            annualVisaResponse.data.some(
-              (visa) => visa.athlete === athlete.id && visa.is_valid === true && visa.visa_status === "available"
-            )
-          );
-
-          const expiredVisas = clubAthletes.filter((athlete) =>
-            annualVisaResponse.data.some(
-              (visa) => visa.athlete === athlete.id && visa.is_valid === false && visa.visa_status === "expired"
-            )
-          );
-
-          return {
-            ...club,
-            athlete_count: clubAthletes.length,
-            valid_visa_count: validVisas.length,
-            expired_visa_count: expiredVisas.length,
-          };
-        });
-
-        setClubsData(clubsWithAggregatedData);
-        setAthletesData(athletesResponse.data);
-        setAnnualVisaData(annualVisaResponse.data);
+        setClubsData(clubsResponse.data);
         setCompetitionsData(competitionsResponse.data);
-        setCategoriesData(categoriesResponse.data);
-        setTeamsData(teamsResponse.data);
 
         setLoading(false);
       } catch (error) {
@@ -74,88 +38,57 @@ const Dashboard = () => {
   }, []);
 
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const clubsResponse = await AxiosInstance.get("/club/");
-        const athletesResponse = await AxiosInstance.get("/athlete/");
-
-        console.log("Clubs Data:", clubsResponse.data);
-        console.log("Athletes Data:", athletesResponse.data);
-
-        setClubsData(clubsResponse.data);
-        setAthletesData(athletesResponse.data);
-      } catch (error) {
-        console.error("Error fetching data:", error);
-      }
-    };
-
-    fetchData();
-  }, []);
+    if (!selectedCompetition) return;
+    // Categories, enrollments, teams and placements of the selected competition only
+    AxiosInstance.get(`/competition/${selectedCompetition}/full/`)
+      .then((response) => setCompetitionDocument(response.data))
+      .catch((error) => console.error("Error fetching competition data:", error));
+  }, [selectedCompetition]);
 
   // Ensure hooks are always called, even if data is not yet available
   const filteredData = useMemo(() => {
-    if (!selectedCompetition || !competitionsData.length || !categoriesData.length) return [];
-    const competition = competitionsData.find((comp) => comp.id === parseInt(selectedCompetition));
-    if (!competition) return [];
-
-    const assignedCategories = categoriesData.filter((category) => category.competition === competition.id);
+    if (!competitionDocument || competitionDocument.id !== parseInt(selectedCompetition)) return [];
 
-    return assignedCategories.map((category) => {
+    return competitionDocument.categories.map((category) => {
+      const { first, second, third } = category.placements;
       if (category.type === "solo") {
+        const clubOf = (placed) =>
+          category.enrolled_athletes.find((enrollment) => enrollment.athlete.id === placed?.id)?.athlete.club_name ||
+          "Unknown Club";
         return {
           categoryName: category.name,
           awards: {
-            firstPlace: category.first_place_name || "N/A",
-            firstPlaceClub: getClubNameForAthlete(category.first_place_athlete_id, athletesData, clubsData),
-            secondPlace: category.second_place_name || "N/A",
-            secondPlaceClub: getClubNameForAthlete(category.second_place_athlete_id, athletesData, clubsData),
-            thirdPlace: category.third_place_name || "N/A",
-            thirdPlaceClub: getClubNameForAthlete(category.third_place_athlete_id, athletesData, clubsData),
+            firstPlace: first?.name || "N/A",
+            firstPlaceClub: clubOf(first),
+            secondPlace: second?.name || "N/A",
+            secondPlaceClub: clubOf(second),
+            thirdPlace: third?.name || "N/A",
+            thirdPlaceClub: clubOf(third),
           },
-          athletes: category.enrolled_athletes?.map((enrollment) => {
-            const athlete = athletesData.find((a) => a.id === enrollment.athlete);
-            const clubName = athlete?.clubDetails?.name || "Unknown Club";
-            return athlete ? `${athlete.first_name} ${athlete.last_name} (${clubName})` : "Unknown";
-          }) || [],
+          athletes: category.enrolled_athletes.map(
+            ({ athlete }) => `${athlete.first_name} ${athlete.last_name} (${athlete.club_name || "Unknown Club"})`
+          ),
         };
       } else if (category.type === "teams") {
+        // A team is shown with the club of its first member
+        const clubOf = (team) => team?.members?.[0]?.club_name || "Unknown Club";
+        const teamById = (placed) => category.teams.find((team) => team.id === placed?.id);
         return {
           categoryName: category.name,
           awards: {
-            firstPlace: category.first_place_team_name || "N/A",
-            firstPlaceClub: (() => {
-              const firstTeam = teamsData.find((team) => team.id === category.first_place_team_id);
-              const firstAthleteId = firstTeam?.members?.[0]?.athlete?.id;
-              const athlete = athletesData.find((a) => a.id === firstAthleteId);
-              return athlete?.clubDetails?.name || "Unknown Club";
-            })(),
-            secondPlace: category.second_place_team_name || "N/A",
-            secondPlaceClub: (() => {
-              const secondTeam = teamsData.find((team) => team.id === category.second_place_team_id);
-              const firstAthleteId = secondTeam?.members?.[0]?.athlete?.id;
-              const athlete = athletesData.find((a) => a.id === firstAthleteId);
-              return athlete?.clubDetails?.name || "Unknown Club";
-            })(),
-            thirdPlace: category.third_place_team_name || "N/A",
-            thirdPlaceClub: (() => {
-              const thirdTeam = teamsData.find((team) => team.id === category.third_place_team_id);
-              const firstAthleteId = thirdTeam?.members?.[0]?.athlete?.id;
-              const athlete = athletesData.find((a) => a.id === firstAthleteId);
-              return athlete?.clubDetails?.name || "Unknown Club";
-            })(),
+            firstPlace: first?.name || "N/A",
+            firstPlaceClub: clubOf(teamById(first)),
+            secondPlace: second?.name || "N/A",
+            secondPlaceClub: clubOf(teamById(second)),
+            thirdPlace: third?.name || "N/A",
+            thirdPlaceClub: clubOf(teamById(third)),
           },
-          teams: category.teams?.map((teamId) => {
-            const team = teamsData.find((team) => team.id === teamId);
-            const firstAthleteId = team?.members?.[0]?.athlete?.id;
-            const athlete = athletesData.find((a) => a.id === firstAthleteId);
-            const firstAthleteClub = athlete?.clubDetails?.name || "Unknown Club";
-            return `${team?.name || "Unknown Team"} (${firstAthleteClub})`;
-          }) || [],
+          teams: category.teams.map((team) => `${team.name || "Unknown Team"} (${clubOf(team)})`),
         };
       }
       return null; // Fallback for unknown category types
     }).filter((category) => category !== null); // Remove null entries
-  }, [selectedCompetition, competitionsData, categoriesData, athletesData, clubsData, teamsData]);
+  }, [selectedCompetition, competitionDocument]);
 
   const totalCategories = useMemo(() => filteredData.length, [filteredData]);
   const totalUniqueAthletes = useMemo(() => {
@@ -357,7 +290,7 @@ const Dashboard = () => {
     return <div>Loading...</div>;
   }
 
-  if (!clubsData.length || !athletesData.length) {
+  if (!clubsData.length) {
     return <div>No data available to display.</div>;
   }
 
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from "react";
 import { Box, FormControl, Button } from "@mui/material";
 import { useNavigate, useParams } from "react-router-dom";
 import AxiosInstance from "./Axios";
+import { fetchAllPages } from "../utils/helpers";
 import DeleteDialog from "./DeleteDialog"; // Import the global DeleteDialog component
 import TextForm from "./forms/TextForm";
 import SelectForm from "./forms/SelectForm";
@@ -19,7 +20,7 @@ const Edit = () => {
   const [myData, setMyData] = useState([]);
 
   const GetData = async () => {
-    AxiosInstance.get("city/").then((res) => {
+    fetchAllPages("city/").then((res) => {
       setCity(res.data);
     });
 
@@ -4,6 +4,7 @@ import { useFormik } from "formik";
 import * as Yup from "yup";
 import { useNavigate, useParams } from "react-router-dom";
 import AxiosInstance from "./Axios";
+import { fetchAllPages } from "../utils/helpers";
 import TextForm from "./forms/TextForm";
 import SelectForm from "./forms/SelectForm";
 import { DatePicker, LocalizationProvider } from "@mui/x-date-pickers";
@@ -31,8 +32,8 @@ const EditAthlete = () => {
         const athleteData = athleteResponse.data;
 
         // Fetch clubs, cities, grades, roles, and titles
-        const clubsResponse = await AxiosInstance.get("club/");
-        const citiesResponse = await AxiosInstance.get("city/");
+        const clubsResponse = await fetchAllPages("club/");
+        const citiesResponse = await fetchAllPages("city/");
         const gradesResponse = await AxiosInstance.get("grade/");
         const rolesResponse = await AxiosInstance.get("federation-role/");
         const titlesResponse = await AxiosInstance.get("title/");
@@ -41,164 +41,40 @@ const ViewAthlete = () => {
   const [errorMessage, setErrorMessage] = useState(""); // State for error message
   const [loading, setLoading] = useState(true); // State for loading indicator
   const [activeTab, setActiveTab] = useState(0); // State for active tab
-  const [athleteIds, setAthleteIds] = useState([]); // List of athlete IDs
-  const [currentAthleteIndex, setCurrentAthleteIndex] = useState(-1); // Current athlete index
+  const [neighbours, setNeighbours] = useState(null); // Previous and next athlete IDs
 
   useEffect(() => {
     const fetchAthleteData = async () => {
       try {
-        const athleteResponse = await AxiosInstance.get(`athlete/${id}/`);
-        const relatedData = {};
-
-        // Fetch related data
-        if (athleteResponse.data.city) {
-          try {
-            // Fetch all cities and find the city by ID
-            const citiesResponse = await AxiosInstance.get(`city/`);
-            const city = citiesResponse.data.find(
-              (city) => city.id === athleteResponse.data.city
-            );
-
-            if (city) {
-              relatedData.city = city;
-              console.log("City data fetched:", city); // Debug log
-            } else {
-              console.warn(`City with ID ${athleteResponse.data.city} not found.`);
-              relatedData.city = { name: "Unknown City" }; // Fallback for missing city
-            }
-          } catch (error) {
-            console.error("Error fetching city data:", error);
-            relatedData.city = { name: "Unknown City" }; // Fallback for errors
-          }
-        } else {
-          relatedData.city = { name: "Unknown City" }; // Fallback for null city
-        }
-
-        if (athleteResponse.data.club) {
-          const clubResponse = await AxiosInstance.get(
-            `club/${athleteResponse.data.club}/`
-          );
+        // Grade history, visas, seminars, results and matches in one response
+        const profileResponse = await AxiosInstance.get(`athlete/${id}/profile/`);
+        const profile = profileResponse.data;
+        const relatedData = {
+          city: { name: profile.city_name || "Unknown City" },
+          title: profile.title_name ? { name: profile.title_name } : null,
+          federationRole: profile.federation_role_name ? { name: profile.federation_role_name } : null,
+          grade: profile.current_grade_name ? { name: profile.current_grade_name } : null,
+          results: profile.results,
+        };
+
+        // Address, contact and logo of the club
+        if (profile.club) {
+          const clubResponse = await AxiosInstance.get(`club/${profile.club}/`);
           relatedData.club = clubResponse.data;
         }
 
-        if (athleteResponse.data.title) {
-          const titleResponse = await AxiosInstance.get(
-            `title/${athleteResponse.data.title}/`
-          );
-          relatedData.title = titleResponse.data;
-        }
-
-        if (athleteResponse.data.federation_role) {
-          const federationRoleResponse = await AxiosInstance.get(
-            `federation-role/${athleteResponse.data.federation_role}/`
-          );
-          relatedData.federationRole = federationRoleResponse.data;
-        }
-
-        if (athleteResponse.data.current_grade) {
-          const gradeResponse = await AxiosInstance.get(
-            `grade/${athleteResponse.data.current_grade}/`
-          );
-          relatedData.grade = gradeResponse.data;
-        }
-
-        const teamResponse = await AxiosInstance.get(`team/?athlete_id=${id}`);
-        relatedData.teams = teamResponse.data;
-
-        const categoryResponse = await AxiosInstance.get(
-          `category/?athlete_id=${id}`
-        );
-        relatedData.categories = categoryResponse.data;
-
-        // Fetch grade history
-        const gradeHistoryResponse = await AxiosInstance.get(
-          `grade-history/?athlete_id=${id}`
-        );
-        setGradeHistory(gradeHistoryResponse.data);
-
-        // Fetch annual visa
-        const annualVisaResponse = await AxiosInstance.get(`annual-visa/`);
-        const filteredAnnualVisa = annualVisaResponse.data.filter(
-          (visa) => visa.athlete === parseInt(id)
-        );
-        setAnnualVisa(filteredAnnualVisa);
-
-        // Fetch medical visa
-        const medicalVisaResponse = await AxiosInstance.get(`medical-visa/`);
-        const filteredMedicalVisa = medicalVisaResponse.data.filter(
-          (visa) => visa.athlete === parseInt(id)
-        );
-        setMedicalVisa(filteredMedicalVisa);
-
-        // Fetch training seminars
-        const trainingSeminarsResponse = await AxiosInstance.get(
-          `training-seminar/?athlete_id=${id}`
-        );
-        setTrainingSeminars(trainingSeminarsResponse.data);
-
-        // Fetch matches
-        const matchesResponse = await AxiosInstance.get(`match/?athlete_id=${id}`);
-        const matches = matchesResponse.data;
-
-        // Fetch categories and competitions for matches
-        const categoryIds = [...new Set(matches.map((match) => match.category))];
-        const categoriesResponse = await Promise.all(
-          categoryIds.map((categoryId) =>
-            AxiosInstance.get(`category/${categoryId}/`)
-          )
-        );
-        const categories = categoriesResponse.map((res) => res.data);
-
-        const competitionIds = [
-          ...new Set(categories.map((category) => category.competition)),
-        ];
-        const competitionsResponse = await Promise.all(
-          competitionIds.map((competitionId) =>
-            AxiosInstance.get(`competition/${competitionId}/`)
-          )
-        );
-        const competitions = competitionsResponse.map((res) => res.data);
-
-        // Fetch opponent details
-        const opponentIds = [
-          ...new Set(
-            matches.flatMap((match) => [match.red_corner, match.blue_corner])
-          ),
-        ].filter((opponentId) => opponentId !== parseInt(id));
-        const opponentsResponse = await Promise.all(
-          opponentIds.map((opponentId) =>
-            AxiosInstance.get(`athlete/${opponentId}/`)
-          )
-        );
-        const opponents = opponentsResponse.map((res) => res.data);
-
-        // Map competition names, categories, and opponents to matches
-        const matchesWithDetails = matches.map((match) => {
-          const category = categories.find(
-            (category) => category.id === match.category
-          );
-          const competition = competitions.find(
-            (competition) => competition.id === category?.competition
-          );
-          const opponentId =
-            match.red_corner === parseInt(id) ? match.blue_corner : match.red_corner;
-          const opponent = opponents.find((athlete) => athlete.id === opponentId);
-
-          return {
-            ...match,
-            competition_name: competition?.name || "N/A",
-            category_name: category?.name || "N/A",
-            opponent_name: `${opponent?.first_name || "N/A"} ${
-              opponent?.last_name || ""
-            }`,
-            opponent_club: opponent?.club_name || "N/A",
-          };
-        });
+        setGradeHistory(profile.grade_history);
+        setAnnualVisa(profile.annual_visas);
+        setMedicalVisa(profile.medical_visas);
+        setTrainingSeminars(profile.training_seminars);
 
-        relatedData.matches = matchesWithDetails;
+        relatedData.matches = profile.matches.map((match) => ({
+          ...match,
+          opponent_club: match.opponent_club || "N/A",
+        }));
 
         // Set data
-        setAthleteData(athleteResponse.data);
+        setAthleteData(profile);
         setRelatedData(relatedData);
       } catch (error) {
         console.error("Error fetching athlete data:", error);
@@ -212,75 +88,53 @@ const ViewAthlete = () => {
   }, [id]);
 
   useEffect(() => {
-    const fetchAthleteIds = async () => {
+    const fetchNeighbours = async () => {
       try {
-        const response = await AxiosInstance.get("athlete/");
-        const ids = response.data.map((athlete) => athlete.id);
-        setAthleteIds(ids);
-
-        // Find the current athlete's index
-        const index = ids.indexOf(parseInt(id));
-        setCurrentAthleteIndex(index);
+        // The athletes just before and after this one, in id order
+        const [previousResponse, nextResponse] = await Promise.all([
+          AxiosInstance.get(`athlete/?fields=id&page_size=1&ordering=-id&id__lt=${id}`),
+          AxiosInstance.get(`athlete/?fields=id&page_size=1&id__gt=${id}`),
+        ]);
+        setNeighbours({
+          previous: previousResponse.data.results[0]?.id ?? null,
+          next: nextResponse.data.results[0]?.id ?? null,
+        });
       } catch (error) {
         console.error("Error fetching athlete IDs:", error);
       }
     };
 
-    fetchAthleteIds();
+    fetchNeighbours();
   }, [id]);
 
   const navigateToPreviousAthlete = () => {
-    if (currentAthleteIndex > 0) {
-      navigate(`/athletes/${athleteIds[currentAthleteIndex - 1]}`);
+    if (neighbours?.previous) {
+      navigate(`/athletes/${neighbours.previous}`);
     } else {
       navigate("/athletes"); // Go back to the athletes list if it's the first athlete
     }
   };
 
   const navigateToNextAthlete = () => {
-    if (currentAthleteIndex < athleteIds.length - 1) {
-      navigate(`/athletes/${athleteIds[currentAthleteIndex + 1]}`);
+    if (neighbours?.next) {
+      navigate(`/athletes/${neighbours.next}`);
     }
   };
 
-  const calculateAwards = () => {
-    let firstPlace = 0;
-    let secondPlace = 0;
-    let thirdPlace = 0;
-
-    if (relatedData?.categories?.length > 0) {
-      relatedData.categories.forEach((category) => {
-        // Individual awards
-        if (category?.first_place_name === athleteData?.first_name) {
-          firstPlace++;
-        }
-        if (category?.second_place_name === athleteData?.first_name) {
-          secondPlace++;
-        }
-        if (category?.third_place_name === athleteData?.first_name) {
-          thirdPlace++;
-        }
-
-        // Team awards
-        if (
-          category?.first_place_team_name?.includes(athleteData?.first_name)
-        ) {
-          firstPlace++;
-        }
-        if (
-          category?.second_place_team_name?.includes(athleteData?.first_name)
-        ) {
-          secondPlace++;
-        }
-        if (
-          category?.third_place_team_name?.includes(athleteData?.first_name)
-        ) {
-          thirdPlace++;
-        }
-      });
-    }
+  // Solo, fight and team results in one list
+  const athleteResults = () => {
+    const results = relatedData?.results;
+    if (!results) return [];
+    return [...results.solo, ...results.fight, ...results.teams];
+  };
 
-    return { firstPlace, secondPlace, thirdPlace };
+  const calculateAwards = () => {
+    const placed = athleteResults();
+    return {
+      firstPlace: placed.filter((result) => result.place === 1).length,
+      secondPlace: placed.filter((result) => result.place === 2).length,
+      thirdPlace: placed.filter((result) => result.place === 3).length,
+    };
   };
 
   if (loading) {
@@ -332,8 +186,8 @@ const ViewAthlete = () => {
         {/* ArrowLeft Icon */}
         <IconButton
           onClick={navigateToPreviousAthlete}
-          disabled={currentAthleteIndex === -1} // Disable if athlete IDs are not loaded
-          sx={{ color: currentAthleteIndex > 0 ? "primary.main" : "grey.500" }}
+          disabled={!neighbours} // Disable if athlete IDs are not loaded
+          sx={{ color: neighbours?.previous ? "primary.main" : "grey.500" }}
         >
           <ArrowBackIcon />
         </IconButton>
@@ -420,10 +274,10 @@ const ViewAthlete = () => {
 
           
         {/* ArrowRight or Close Icon */}
-        {currentAthleteIndex < athleteIds.length - 1 ? (
+        {!neighbours || neighbours.next ? (
           <IconButton
             onClick={navigateToNextAthlete}
-            disabled={currentAthleteIndex === -1} // Disable if athlete IDs are not loaded
+            disabled={!neighbours} // Disable if athlete IDs are not loaded
             sx={{ color: "primary.main" }}
           >
             <ArrowForwardIcon />
@@ -629,52 +483,17 @@ const ViewAthlete = () => {
                     },
                   },
                 ]}
-                data={
-                  relatedData?.categories?.length > 0
-                    ? relatedData.categories
-                        .filter((category) => {
-                          // Filter out categories where the athlete didn't obtain any result
-                          return (
-                            category?.first_place_name === athleteData?.first_name ||
-                            category?.second_place_name === athleteData?.first_name ||
-                            category?.third_place_name === athleteData?.first_name ||
-                            category?.first_place_team_name?.includes(athleteData?.first_name) ||
-                            category?.second_place_team_name?.includes(athleteData?.first_name) ||
-                            category?.third_place_team_name?.includes(athleteData?.first_name)
-                          );
-                        })
-                        .map((category) => {
-                          // Determine the athlete's place
-                          let place = null;
-                          if (category?.first_place_name === athleteData?.first_name) {
-                            place = "🥇 1st Place";
-                          } else if (category?.second_place_name === athleteData?.first_name) {
-                            place = "🥈 2nd Place";
-                          } else if (category?.third_place_name === athleteData?.first_name) {
-                            place = "🥉 3rd Place";
-                          } else if (
-                            category?.first_place_team_name?.includes(athleteData?.first_name)
-                          ) {
-                            place = `🥇 1st Place (${category.first_place_team_name})`;
-                          } else if (
-                            category?.second_place_team_name?.includes(athleteData?.first_name)
-                          ) {
-                            place = `🥈 2nd Place (${category.second_place_team_name})`;
-                          } else if (
-                            category?.third_place_team_name?.includes(athleteData?.first_name)
-                          ) {
-                            place = `🥉 3rd Place (${category.third_place_team_name})`;
-                          }
-
-                          return {
-                            competition_name: category?.competition_name || "N/A",
-                            category_name: category?.name || "N/A",
-                            enrolled_athletes_count: category?.enrolled_athletes?.length || 0,
-                            place,
-                          };
-                        })
-                    : []
-                }
+                data={athleteResults()
+                  // Only the categories where the athlete obtained a place
+                  .filter((result) => result.place)
+                  .map((result) => {
+                    const medal = { 1: "🥇 1st Place", 2: "🥈 2nd Place", 3: "🥉 3rd Place" }[result.place];
+                    return {
+                      competition_name: result.competition_name || "N/A",
+                      category_name: result.category_name || "N/A",
+                      place: result.team_name ? `${medal} (${result.team_name})` : medal,
+                    };
+                  })}
                 enableColumnResizing
                 enablePagination
                 enableSorting
@@ -942,7 +761,7 @@ const ViewAthlete = () => {
                     accessorKey: 'result',
                     header: 'Result',
                     Cell: ({ row }) => {
-                      const isWinner = row.original.winner_name === athleteData?.first_name;
+                      const isWinner = row.original.won;
                       return (
                         <Typography
                           sx={{
@@ -14,6 +14,7 @@ import {
 } from "@mui/material";
 import { useParams, useNavigate } from "react-router-dom";
 import AxiosInstance from "./Axios";
+import { fetchAllPages } from "../utils/helpers";
 import ArrowBackIcon from "@mui/icons-material/ArrowBack";
 import CloseIcon from "@mui/icons-material/Close";
 import ArrowForwardIcon from "@mui/icons-material/ArrowForward";
@@ -35,7 +36,7 @@ const ViewClub = () => {
     const fetchClubData = async () => {
       try {
         console.log("Fetching all clubs...");
-        const clubsResponse = await AxiosInstance.get("club/");
+        const clubsResponse = await fetchAllPages("club/?fields=id");
         const allClubs = clubsResponse.data;
         setClubs(allClubs);
 
@@ -46,23 +47,14 @@ const ViewClub = () => {
         const clubResponse = await AxiosInstance.get(`club/${id}/`);
         setClubData(clubResponse.data);
 
-        console.log("Fetching grades...");
-        const gradesResponse = await AxiosInstance.get("grade/");
-        const grades = gradesResponse.data.reduce((acc, grade) => {
-          acc[grade.id] = grade.name;
-          return acc;
-        }, {});
-
         console.log("Fetching athletes...");
-        const athletesResponse = await AxiosInstance.get("athlete/");
-        const clubAthletes = athletesResponse.data.filter(
-          (athlete) => athlete.club === parseInt(id)
-        );
+        // Only the club's athletes, with the grade name nested
+        const athletesResponse = await fetchAllPages(`athlete/?club=${id}&expand=current_grade`);
 
-        const mappedAthletes = clubAthletes.map((athlete) => ({
+        const mappedAthletes = athletesResponse.data.map((athlete) => ({
           id: athlete.id,
           name: `${athlete.first_name} ${athlete.last_name}`,
-          grade: grades[athlete.current_grade] || "N/A",
+          grade: athlete.current_grade?.name || "N/A",
           joined_date: athlete.registered_date || "N/A",
           annual_visa: athlete.annual_visa || "N/A",
           medical_visa: athlete.medical_visa || "N/A",
@@ -70,49 +62,24 @@ const ViewClub = () => {
         }));
         setClubAthletes(mappedAthletes);
 
-        console.log("Fetching categories...");
-        const categoriesResponse = await AxiosInstance.get("category/");
-        const categories = categoriesResponse.data;
-
-        console.log("Categories Data:", categories);
-
-        const clubAthleteResults = categories.flatMap((category) => {
-          console.log("Processing Category:", category);
-
-          const athleteResults = (category.athletes || [])
-            .filter((athlete) => athlete.club === parseInt(id))
-            .map((athlete) => ({
-              name: `${athlete.first_name} ${athlete.last_name}`,
-              competition_name: category.competition_name,
-              category_name: category.name,
-              place: category.first_place === athlete.id
-                ? "1st"
-                : category.second_place === athlete.id
-                ? "2nd"
-                : category.third_place === athlete.id
-                ? "3rd"
-                : "N/A",
-            }));
-
-          const teamResults = (category.teams || [])
-            .filter((team) =>
-              [category.first_place_team, category.second_place_team, category.third_place_team].includes(team.id)
-            )
-            .map((team) => ({
-              name: `Team ${team.name}`,
-              competition_name: category.competition_name,
-              category_name: category.name,
-              place: category.first_place_team === team.id
-                ? "1st"
-                : category.second_place_team === team.id
-                ? "2nd"
-                : category.third_place_team === team.id
-                ? "3rd"
-                : "N/A",
-            }));
-
-          return [...athleteResults, ...teamResults];
-        });
+        console.log("Fetching results...");
+        // Podium places of the club's athletes and teams; a team placement
+        // comes once per member of the club, so keep one row per team
+        const medalsResponse = await AxiosInstance.get(`club/${id}/medals/`);
+        const places = { 1: "1st", 2: "2nd", 3: "3rd" };
+        const seenTeams = new Set();
+        const clubAthleteResults = medalsResponse.data.placements.filter((placement) => {
+          if (!placement.team) return true;
+          const key = `${placement.category}-${placement.team}`;
+          if (seenTeams.has(key)) return false;
+          seenTeams.add(key);
+          return true;
+        }).map((placement) => ({
+          name: placement.team ? `Team ${placement.team_name}` : placement.athlete_name,
+          competition_name: placement.competition_name,
+          category_name: placement.category_name,
+          place: places[placement.place] || "N/A",
+        }));
 
         setAthleteResults(clubAthleteResults);
       } catch (error) {
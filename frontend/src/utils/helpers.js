@@ -1,13 +1,22 @@
-export const getClubNameForAthlete = (athleteId, athletesData, clubsData) => {
-  if (!athleteId) {
-    console.warn("Athlete ID is undefined");
-    return "Unknown Club";
-  }
+import AxiosInstance from "../components/Axios";
+
+// Largest page the API serves (see backend/api/pagination.py)
+export const MAX_PAGE_SIZE = 500;
 
-  const athlete = athletesData.find((athlete) => athlete.id === athleteId);
-  if (!athlete || !athlete.club) {
-    return "Unknown Club";
+// Fetch every page of a paginated list endpoint by following the `next` links.
+// Returns an axios-like `{ data }` object so callers can keep reading `.data`.
+// Only for small tables (clubs, cities) or lists already narrowed by a filter:
+// pages are requested at the maximum size, so these take a single request.
+export const fetchAllPages = async (url) => {
+  const results = [];
+  let next = `${url}${url.includes("?") ? "&" : "?"}page_size=${MAX_PAGE_SIZE}`;
+  while (next) {
+    const response = await AxiosInstance.get(next);
+    if (!Array.isArray(response.data?.results)) {
+      return response; // Endpoint is not paginated
+    }
+    results.push(...response.data.results);
+    next = response.data.next;
   }
-  const club = clubsData.find((club) => club.id === athlete.club);
-  return club ? club.name : "Unknown Club";
-};
\ No newline at end of file
+  return { data: results };
+};